@@ -0,0 +1,138 @@
+"""Synthetic camera datasets and cameras.db fixtures for the benchmarks.
+
+Cameras are clustered like a real deployment: most sit in a few large
+cities, concentrated around district hotspots, with a thin rural background.
+Statuses, types, directions and fields of view follow fixed weights, and the
+same seed always yields the same data. Usage (from backend/):
+
+    python benchmarks/generate_cameras.py --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+# Rows per import transaction while building a fixture
+FIXTURE_CHUNK_ROWS = 100000
+
+# (name, latitude, longitude, share of cameras, city radius in km, districts)
+CITIES = [
+    ("Kyiv", 50.4501, 30.5234, 0.30, 9.0, 40),
+    ("Kharkiv", 49.9935, 36.2304, 0.11, 7.0, 20),
+    ("Odesa", 46.4825, 30.7233, 0.09, 6.0, 18),
+    ("Dnipro", 48.4647, 35.0462, 0.09, 7.0, 18),
+    ("Lviv", 49.8397, 24.0297, 0.09, 5.0, 16),
+    ("Zaporizhzhia", 47.8388, 35.1396, 0.06, 6.0, 12),
+    ("Vinnytsia", 49.2331, 28.4682, 0.04, 4.0, 8),
+    ("Poltava", 49.5883, 34.5514, 0.03, 3.5, 6),
+    ("Chernihiv", 51.4982, 31.2893, 0.03, 3.5, 6),
+    ("Uzhhorod", 48.6208, 22.2879, 0.02, 2.5, 4),
+]
+# The rest is spread uniformly over this (min_lon, min_lat, max_lon, max_lat)
+RURAL_BOUNDS = (22.2, 44.4, 40.2, 52.4)
+# Spread of cameras around their district centre, in km
+DISTRICT_RADIUS_KM = 0.6
+
+STATUSES = (["Active", "Inactive", "Maintenance"], [0.82, 0.11, 0.07])
+TYPES = (["Fixed", "Dome", "PTZ"], [0.6, 0.28, 0.12])
+KM_PER_DEGREE = 111.32
+
+def generate_camera_frame(count: int, seed: int = 1) -> pd.DataFrame:
+    """count cameras with the columns of an upload file (name, latitude, ..., field_of_view)"""
+    rng = np.random.default_rng(seed)
+    shares = np.array([city[3] for city in CITIES])
+    # Last bucket is the rural background
+    bucket = rng.choice(len(CITIES) + 1, size=count, p=np.append(shares, 1 - shares.sum()))
+
+    latitude = np.empty(count)
+    longitude = np.empty(count)
+    for index, (_, lat, lon, _, radius_km, districts) in enumerate(CITIES):
+        rows = np.flatnonzero(bucket == index)
+        if not len(rows):
+            continue
+        lon_km = KM_PER_DEGREE * np.cos(np.radians(lat))
+        centres = rng.normal(0.0, radius_km / 2, size=(districts, 2))
+        # Central districts are denser than the outskirts
+        weights = np.exp(-np.hypot(centres[:, 0], centres[:, 1]) / radius_km)
+        district = rng.choice(districts, size=len(rows), p=weights / weights.sum())
+        offsets = centres[district] + rng.normal(0.0, DISTRICT_RADIUS_KM, size=(len(rows), 2))
+        latitude[rows] = lat + offsets[:, 0] / KM_PER_DEGREE
+        longitude[rows] = lon + offsets[:, 1] / lon_km
+
+    rural = np.flatnonzero(bucket == len(CITIES))
+    min_lon, min_lat, max_lon, max_lat = RURAL_BOUNDS
+    latitude[rural] = rng.uniform(min_lat, max_lat, size=len(rural))
+    longitude[rural] = rng.uniform(min_lon, max_lon, size=len(rural))
+
+    camera_type = rng.choice(TYPES[0], size=count, p=TYPES[1])
+    field_of_view = np.select(
+        [camera_type == "PTZ", camera_type == "Dome"],
+        [np.full(count, 360.0), rng.uniform(90, 180, size=count)],
+        rng.uniform(30, 90, size=count)
+    )
+    return pd.DataFrame({
+        "name": [f"Camera {i}" for i in range(count)],
+        "latitude": latitude.round(6),
+        "longitude": longitude.round(6),
+        "status": rng.choice(STATUSES[0], size=count, p=STATUSES[1]),
+        "type": camera_type,
+        "description": "",
+        "direction": rng.uniform(0, 360, size=count).round(1),
+        "field_of_view": field_of_view.round(1),
+    })
+
+def sheet_rows(frame: pd.DataFrame, prefix: str):
+    """The frame as read_sheet_data returns it: string cells and g_sheet_row_id"""
+    rows = frame.astype(str).to_dict('records')
+    for idx, row in enumerate(rows, start=2):
+        row['g_sheet_row_id'] = f"{prefix}{idx}"
+    return rows
+
+def fixture_path(count: int, seed: int = 1, directory: str = FIXTURE_DIR) -> str:
+    return os.path.join(directory, f"cameras_{count}_s{seed}.db")
+
+def build_fixture(count: int, seed: int = 1, directory: str = FIXTURE_DIR, force: bool = False) -> str:
+    """Create (or reuse) a cameras.db with count generated cameras; returns its path"""
+    path = fixture_path(count, seed, directory)
+    if os.path.exists(path) and not force:
+        return path
+    os.makedirs(directory, exist_ok=True)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    from services.camera_service import import_cameras_from_file
+
+    database.close_connections()
+    database.DATABASE_PATH = path
+    database.init_database()
+    frame = generate_camera_frame(count, seed)
+    started = time.perf_counter()
+    for start in range(0, count, FIXTURE_CHUNK_ROWS):
+        import_cameras_from_file(frame.iloc[start:start + FIXTURE_CHUNK_ROWS], row_offset=start)
+    with database.get_db_writer() as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    database.close_connections()
+    print(f"Built {path} ({count} cameras) in {time.perf_counter() - started:.1f}s")
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default=FIXTURE_DIR)
+    parser.add_argument("--force", action="store_true", help="rebuild existing fixtures")
+    args = parser.parse_args()
+    for count in args.sizes:
+        build_fixture(count, args.seed, args.out, args.force)
+
+if __name__ == "__main__":
+    main()
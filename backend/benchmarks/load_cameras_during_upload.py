@@ -0,0 +1,176 @@
+"""Load test: /api/v1/cameras latency with and without a concurrent upload.
+
+Runs the FastAPI app in-process against a throwaway database, so any handler
+that blocks the event loop shows up directly as camera latency during the
+upload. Usage (from backend/):
+
+    python benchmarks/load_cameras_during_upload.py --cameras 20000 --upload-rows 200000
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import secrets
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def _summary(latencies):
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2),
+    }
+
+def _camera_rows(count, rng):
+    return [
+        {
+            "name": f"Camera {i}",
+            "latitude": 50.45 + rng.uniform(-0.2, 0.2),
+            "longitude": 30.52 + rng.uniform(-0.3, 0.3),
+            "status": rng.choice(["Active", "Inactive", "Maintenance"]),
+            "type": rng.choice(["Fixed", "PTZ", "Dome"]),
+            "direction": rng.uniform(0, 360),
+            "field_of_view": rng.uniform(30, 120),
+        }
+        for i in range(count)
+    ]
+
+def _create_session():
+    token = secrets.token_urlsafe(32)
+    with database.get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO users (username, email, password_hash, totp_secret)
+            VALUES ('loadtest', 'loadtest@example.com', '-', NULL)
+        """)
+        cursor.execute("""
+            INSERT INTO sessions (session_token, user_id, expires_at, is_2fa_validated)
+            VALUES (?, ?, ?, 1)
+        """, (token, cursor.lastrowid, datetime.now() + timedelta(hours=1)))
+        conn.commit()
+    return token
+
+async def _camera_load(client, token, bbox, concurrency, stop):
+    latencies = []
+
+    async def worker():
+        while not stop():
+            started = time.perf_counter()
+            response = await client.get(
+                "/api/v1/cameras",
+                params={"bbox": bbox},
+                headers={"Authorization": f"Bearer {token}"}
+            )
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+async def run(args):
+    import httpx
+    from main import app
+    from services.jobs import job_runner
+
+    rng = random.Random(args.seed)
+    database.init_database()
+    # ASGITransport does not run startup events
+    job_runner.start()
+
+    from services.camera_service import import_cameras_from_file
+    import_cameras_from_file(_camera_rows(args.cameras, rng))
+    token = _create_session()
+
+    import pandas as pd
+    upload = io.BytesIO()
+    pd.DataFrame(_camera_rows(args.upload_rows, rng)).to_csv(upload, index=False)
+    upload_bytes = upload.getvalue()
+
+    bbox = "30.42,50.40,30.62,50.50"
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=600) as client:
+        deadline = time.perf_counter() + args.baseline_seconds
+        baseline = await _camera_load(
+            client, token, bbox, args.concurrency, lambda: time.perf_counter() > deadline
+        )
+
+        upload_done = asyncio.Event()
+
+        async def do_upload():
+            started = time.perf_counter()
+            response = await client.post(
+                "/api/data/upload-file",
+                files={"file": ("cameras.csv", upload_bytes, "text/csv")},
+                headers={"Authorization": f"Bearer {token}"}
+            )
+            response.raise_for_status()
+            # The upload runs as a background job; wait until it has finished
+            job_id = response.json()["job_id"]
+            while True:
+                job = (await client.get(
+                    f"/api/jobs/{job_id}", headers={"Authorization": f"Bearer {token}"}
+                )).json()
+                if job["status"] not in ("queued", "running"):
+                    break
+                await asyncio.sleep(0.1)
+            upload_done.set()
+            if job["status"] != "succeeded":
+                raise RuntimeError(f"Upload job {job['status']}: {job.get('error')}")
+            return time.perf_counter() - started
+
+        upload_task = asyncio.create_task(do_upload())
+        during = await _camera_load(client, token, bbox, args.concurrency, upload_done.is_set)
+        upload_seconds = await upload_task
+    job_runner.shutdown()
+
+    report = {
+        "cameras": args.cameras,
+        "upload_rows": args.upload_rows,
+        "concurrency": args.concurrency,
+        "upload_seconds": round(upload_seconds, 3),
+        "baseline": _summary(baseline),
+        "during_upload": _summary(during),
+    }
+    report["p95_ratio"] = round(
+        report["during_upload"]["p95_ms"] / max(report["baseline"]["p95_ms"], 1e-6), 2
+    )
+    print(json.dumps(report, indent=2))
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cameras", type=int, default=20000)
+    parser.add_argument("--upload-rows", type=int, default=100000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--baseline-seconds", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-p95-ratio", type=float, default=3.0,
+                        help="fail if p95 during the upload exceeds baseline p95 by this factor")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DATABASE_PATH = os.path.join(tmp, "cameras.db")
+        os.environ["JOB_SPOOL_DIR"] = os.path.join(tmp, "job_uploads")
+        report = asyncio.run(run(args))
+        database.close_connections()
+
+    if report["p95_ratio"] > args.max_p95_ratio:
+        sys.exit(f"camera p95 grew {report['p95_ratio']}x during the upload")
+
+if __name__ == "__main__":
+    main()
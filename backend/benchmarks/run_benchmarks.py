@@ -0,0 +1,270 @@
+"""Benchmarks of the camera read, import, sync and auth paths.
+
+Runs against generated fixtures (see generate_cameras.py) and writes the
+timings as JSON; --compare prints the median change against an earlier run.
+Every size is benchmarked on a scratch copy of its fixture, so the fixtures
+themselves stay untouched. Usage (from backend/):
+
+    python benchmarks/run_benchmarks.py --sizes 10000 100000 --output before.json
+    python benchmarks/run_benchmarks.py --sizes 10000 100000 --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import secrets
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from generate_cameras import CITIES, FIXTURE_DIR, build_fixture, generate_camera_frame, sheet_rows
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+# Square viewports (side in km) around the busiest city; None is everything
+BBOX_SIZES = [("block", 0.5), ("district", 2), ("city", 10), ("metro", 50), ("region", 500), ("all", None)]
+AUTH_CALLS = 2000
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def _summary(seconds, **extra):
+    summary = {
+        "runs": len(seconds),
+        "min_ms": round(min(seconds) * 1000, 3),
+        "median_ms": round(statistics.median(seconds) * 1000, 3),
+        "p95_ms": round(_percentile(seconds, 95) * 1000, 3),
+        "mean_ms": round(statistics.mean(seconds) * 1000, 3),
+    }
+    summary.update(extra)
+    return summary
+
+def _timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+def _bbox(side_km):
+    if side_km is None:
+        return None
+    _, lat, lon, _, _, _ = CITIES[0]
+    half_lat = side_km / 2 / 111.32
+    half_lon = half_lat / np.cos(np.radians(lat))
+    return f"{lon - half_lon},{lat - half_lat},{lon + half_lon},{lat + half_lat}"
+
+def check_query_plan():
+    """Fail the run when bbox queries no longer go through idx_cameras_geometry"""
+    from services.camera_service import check_spatial_index_used, explain_cameras_query
+
+    bbox = _bbox(BBOX_SIZES[0][1])
+    if not check_spatial_index_used(bbox):
+        plan = "\n".join(explain_cameras_query(bbox=bbox))
+        raise SystemExit(f"bbox query does not use idx_cameras_geometry:\n{plan}")
+
+def bench_geojson(repeat):
+    from services.camera_service import get_cameras_geojson
+
+    results = {}
+    for label, side_km in BBOX_SIZES:
+        bbox = _bbox(side_km)
+        # Warm-up run: page cache and pooled connection
+        get_cameras_geojson(bbox=bbox)
+        runs = [_timed(get_cameras_geojson, bbox=bbox) for _ in range(repeat)]
+        results[label] = _summary(
+            [seconds for seconds, _ in runs], bbox=bbox, features=len(runs[0][1]["features"])
+        )
+    return results
+
+def bench_geojson_snapshot(repeat):
+    """bench_geojson served from the columnar snapshot (CAMERA_SNAPSHOT_ENABLED)"""
+    from services import camera_service
+    from services.camera_snapshot import snapshot_manager
+    from services.dataset_version import get_dataset_version
+
+    version = get_dataset_version()
+    while snapshot_manager.current(version) is None:
+        time.sleep(0.05)
+    original = camera_service.SNAPSHOT_ENABLED
+    camera_service.SNAPSHOT_ENABLED = True
+    try:
+        return bench_geojson(repeat)
+    finally:
+        camera_service.SNAPSHOT_ENABLED = original
+
+def bench_import(repeat, rows, seed):
+    from services.camera_service import import_cameras_from_file
+
+    seconds = []
+    for run in range(repeat):
+        frame = generate_camera_frame(rows, seed + 1000 + run)
+        elapsed, _ = _timed(import_cameras_from_file, frame)
+        seconds.append(elapsed)
+    return {"rows": _summary(seconds, rows=rows, rows_per_second=round(rows / statistics.median(seconds)))}
+
+def bench_sync(repeat, rows, seed):
+    """sync_cameras_from_sheets with read_sheet_data stubbed out.
+
+    Per run: a first sync of a new sheet (all inserts), an unchanged resync,
+    and a resync with 1% of the rows edited.
+    """
+    from services import camera_service
+    from services.google_sheets import sheet_row_prefix
+
+    sheet = {}
+    original = camera_service.read_sheet_data
+    camera_service.read_sheet_data = lambda spreadsheet_id, range_name=None: sheet[spreadsheet_id]
+    cases = {"initial": [], "unchanged": [], "changed_1pct": []}
+    try:
+        for run in range(repeat):
+            spreadsheet_id = f"bench{seed}-{run}"
+            frame = generate_camera_frame(rows, seed + 2000 + run)
+            sheet[spreadsheet_id] = sheet_rows(frame, sheet_row_prefix(spreadsheet_id))
+            cases["initial"].append(_timed(camera_service.sync_cameras_from_sheets, spreadsheet_id)[0])
+            cases["unchanged"].append(_timed(camera_service.sync_cameras_from_sheets, spreadsheet_id)[0])
+            for row in sheet[spreadsheet_id][::100]:
+                row['status'] = 'Maintenance' if row['status'] != 'Maintenance' else 'Active'
+            cases["changed_1pct"].append(_timed(camera_service.sync_cameras_from_sheets, spreadsheet_id)[0])
+    finally:
+        camera_service.read_sheet_data = original
+    return {case: _summary(seconds, rows=rows) for case, seconds in cases.items()}
+
+def _create_session():
+    token = secrets.token_urlsafe(32)
+    with database.get_db_writer() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO users (username, email, password_hash, totp_secret)
+            VALUES (?, ?, '-', NULL)
+        """, (f"bench-{token[:8]}", f"bench-{token[:8]}@example.com"))
+        cursor.execute("""
+            INSERT INTO sessions (session_token, user_id, expires_at, is_2fa_validated)
+            VALUES (?, ?, ?, 1)
+        """, (token, cursor.lastrowid, datetime.now() + timedelta(hours=1)))
+        conn.commit()
+    return token
+
+def bench_auth(calls):
+    """get_current_user per request: session lookups (cold) and cache hits (warm)"""
+    from main import get_current_user
+    from utils.session_cache import session_cache
+
+    authorization = f"Bearer {_create_session()}"
+
+    async def measure(cold):
+        seconds = []
+        for _ in range(calls):
+            if cold:
+                session_cache.clear()
+            started = time.perf_counter()
+            await get_current_user(authorization)
+            seconds.append(time.perf_counter() - started)
+        return seconds
+
+    return {
+        "cold": _summary(asyncio.run(measure(True))),
+        "warm": _summary(asyncio.run(measure(False))),
+    }
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(args):
+    report = {
+        "meta": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "sqlite": sqlite3.sqlite_version,
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+    for size in args.sizes:
+        fixture = build_fixture(size, args.seed, args.fixtures)
+        with tempfile.TemporaryDirectory() as tmp:
+            database.close_connections()
+            database.DATABASE_PATH = os.path.join(tmp, "cameras.db")
+            shutil.copy(fixture, database.DATABASE_PATH)
+            database.init_database()
+            check_query_plan()
+
+            results = {}
+            print(f"[{size}] get_cameras_geojson")
+            results["get_cameras_geojson"] = bench_geojson(args.repeat)
+            print(f"[{size}] get_cameras_geojson (snapshot)")
+            results["get_cameras_geojson_snapshot"] = bench_geojson_snapshot(args.repeat)
+            print(f"[{size}] get_current_user")
+            results["get_current_user"] = bench_auth(args.auth_calls)
+            print(f"[{size}] import_cameras_from_file")
+            results["import_cameras_from_file"] = bench_import(args.repeat, args.import_rows, args.seed)
+            print(f"[{size}] sync_cameras_from_sheets")
+            results["sync_cameras_from_sheets"] = bench_sync(args.repeat, args.sync_rows, args.seed)
+            report["results"][str(size)] = results
+            database.close_connections()
+    return report
+
+def compare(old, new):
+    """Print median_ms of every benchmark present in both reports"""
+    print(f"{'benchmark':<58} {'old ms':>10} {'new ms':>10} {'ratio':>7}")
+    for size, benchmarks in new["results"].items():
+        for name, cases in benchmarks.items():
+            for case, summary in cases.items():
+                before = old.get("results", {}).get(size, {}).get(name, {}).get(case)
+                # Only like for like: same row counts and viewports
+                if before is None or any(before.get(key) != summary.get(key) for key in ("rows", "bbox")):
+                    continue
+                ratio = summary["median_ms"] / max(before["median_ms"], 1e-9)
+                print(f"{size + ' ' + name + ' ' + case:<58} {before['median_ms']:>10.3f} "
+                      f"{summary['median_ms']:>10.3f} {ratio:>7.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--import-rows", type=int, default=10000)
+    parser.add_argument("--sync-rows", type=int, default=10000)
+    parser.add_argument("--auth-calls", type=int, default=AUTH_CALLS)
+    parser.add_argument("--fixtures", default=FIXTURE_DIR)
+    parser.add_argument("--output", help="result file (default: results/bench-<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    args = parser.parse_args()
+
+    report = run(args)
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"bench-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Worker start-up budget: import time, schema check and first request.
+
+Each measurement runs in a fresh interpreter, the way a new worker starts,
+against a database that is already migrated. It also checks that the heavy
+optional dependencies (pandas, googleapiclient, qrcode, passlib, jose) are
+still unloaded after serving a camera request. It exits non-zero when a
+median exceeds its budget. Usage (from backend/):
+
+    python benchmarks/startup_budget.py --runs 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+LAZY_MODULES = ("pandas", "googleapiclient", "qrcode", "passlib", "jose")
+
+def measure(database_path):
+    """Runs inside the fresh interpreter; prints one JSON line"""
+    started = time.perf_counter()
+    import database
+    database.DATABASE_PATH = database_path
+    import main
+    imported = time.perf_counter()
+
+    database.init_database()
+    from services.camera_fov import ensure_fov_sectors
+    from services.camera_stats import ensure_camera_stats
+    ensure_fov_sectors()
+    ensure_camera_stats()
+    ready = time.perf_counter()
+
+    from fastapi.testclient import TestClient
+    from utils.session_cache import session_cache
+    with database.get_db_connection() as conn:
+        token = conn.execute("SELECT session_token FROM sessions LIMIT 1").fetchone()[0]
+    session_cache.clear()
+    client = TestClient(main.app)
+    first_started = time.perf_counter()
+    response = client.get("/api/v1/cameras", headers={"Authorization": f"Bearer {token}"})
+    response.raise_for_status()
+    done = time.perf_counter()
+
+    print(json.dumps({
+        "import_s": imported - started,
+        "startup_s": ready - imported,
+        "first_request_s": done - first_started,
+        "loaded_lazy_modules": [name for name in LAZY_MODULES if name in sys.modules],
+    }))
+
+def _prepare(database_path):
+    """Migrate a fresh database and add a session, in a separate interpreter"""
+    script = f"""
+import sys; sys.path.insert(0, {BACKEND_DIR!r})
+import database
+database.DATABASE_PATH = {database_path!r}
+database.init_database()
+with database.get_db_writer() as conn:
+    conn.execute("INSERT INTO users (username, email, password_hash) VALUES ('budget', 'budget@example.com', '-')")
+    conn.execute("INSERT INTO sessions (session_token, user_id, expires_at, is_2fa_validated) VALUES ('budget', 1, '2999-01-01 00:00:00', 1)")
+    conn.commit()
+"""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", script], check=True, cwd=BACKEND_DIR, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget", type=float, default=1.0, help="seconds to import main")
+    parser.add_argument("--startup-budget", type=float, default=0.2, help="seconds for init_database + ensure_fov_sectors + ensure_camera_stats")
+    parser.add_argument("--first-request-budget", type=float, default=0.5, help="seconds for the first /api/v1/cameras")
+    parser.add_argument("--output", help="write the report as JSON")
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.measure)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, "cameras.db")
+        migrate_s = _prepare(database_path)
+        runs = []
+        for _ in range(args.runs):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--measure", database_path],
+                check=True, capture_output=True, text=True, cwd=BACKEND_DIR,
+                env={**os.environ, "JOB_SPOOL_DIR": os.path.join(tmp, "job_uploads")}
+            ).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    budgets = {
+        "import_s": args.import_budget,
+        "startup_s": args.startup_budget,
+        "first_request_s": args.first_request_budget,
+    }
+    report = {"runs": args.runs, "fresh_migration_s": round(migrate_s, 3), "phases": {}}
+    failures = []
+    for phase, budget in budgets.items():
+        median = statistics.median(run[phase] for run in runs)
+        report["phases"][phase] = {"median_s": round(median, 4), "budget_s": budget}
+        if median > budget:
+            failures.append(f"{phase} {median:.3f}s > {budget}s")
+    loaded = sorted({name for run in runs for name in run["loaded_lazy_modules"]})
+    report["loaded_lazy_modules"] = loaded
+    if loaded:
+        failures.append(f"loaded eagerly: {', '.join(loaded)}")
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if failures:
+        sys.exit("Start-up budget exceeded: " + "; ".join(failures))
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
 import sqlite3
+import queue
+import threading
 from contextlib import contextmanager
-from typing import Generator
+from typing import Generator, Optional
 import os
 
+from utils.metrics import METRICS_ENABLED, TimedConnection
+
 # --- ПОЧАТОК ВИПРАВЛЕННЯ ---
 # Напряму додаємо шлях до папки з бібліотеками SpatiaLite
 # Це гарантує, що Python їх знайде
@@ -12,10 +16,26 @@ if hasattr(os, 'add_dll_directory'):
 
 DATABASE_PATH = "cameras.db"
 
-@contextmanager
-def get_db_connection() -> Generator[sqlite3.Connection, None, None]:
-    """Get database connection with SpatiaLite loaded"""
-    conn = sqlite3.connect(DATABASE_PATH)
+# Connection pool and per-connection pragmas, overridable from the environment
+POOL_SIZE = int(os.getenv("CAMERA_DB_POOL_SIZE", "8"))
+POOL_TIMEOUT = float(os.getenv("CAMERA_DB_POOL_TIMEOUT", "30"))
+PRAGMAS = {
+    "journal_mode": os.getenv("CAMERA_DB_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("CAMERA_DB_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.getenv("CAMERA_DB_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Negative values are KiB: 64 MiB of page cache per connection
+    "cache_size": int(os.getenv("CAMERA_DB_CACHE_SIZE", "-65536")),
+    "busy_timeout": int(os.getenv("CAMERA_DB_BUSY_TIMEOUT", "5000")),
+    "temp_store": "MEMORY",
+}
+
+def _open_connection(isolation_level: str = "") -> sqlite3.Connection:
+    """Open a connection with SpatiaLite loaded and the configured pragmas applied"""
+    # Pooled connections (and streaming responses) move between threads
+    conn = sqlite3.connect(
+        DATABASE_PATH, check_same_thread=False, isolation_level=isolation_level,
+        factory=TimedConnection if METRICS_ENABLED else sqlite3.Connection
+    )
     conn.row_factory = sqlite3.Row
     conn.enable_load_extension(True)
     try:
@@ -23,85 +43,380 @@ def get_db_connection() -> Generator[sqlite3.Connection, None, None]:
     except Exception as e:
         print(f"CRITICAL ERROR: Could not load SpatiaLite extension: {e}")
     conn.enable_load_extension(False)
+    for name, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+class ConnectionPool:
+    """Bounded pool of ready-to-use SQLite/SpatiaLite connections"""
+
+    def __init__(self, size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT):
+        self.size = size
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return _open_connection()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise RuntimeError(f"No database connection available after {self.timeout}s")
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        if isinstance(conn, TimedConnection):
+            conn.flush_metrics()
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # A broken connection is dropped and replaced on demand
+            conn.close()
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(conn)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._created -= 1
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+_writer: Optional[sqlite3.Connection] = None
+_writer_lock = threading.Lock()
+
+def _get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+def close_connections() -> None:
+    """Close pooled and writer connections (e.g. after changing DATABASE_PATH)"""
+    global _pool, _writer
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
+            _writer = None
+
+@contextmanager
+def get_db_connection() -> Generator[sqlite3.Connection, None, None]:
+    """Get a pooled database connection with SpatiaLite loaded"""
+    pool = _get_pool()
+    conn = pool.acquire()
     try:
         yield conn
     finally:
-        conn.close()
+        pool.release(conn)
+
+@contextmanager
+def get_db_writer() -> Generator[sqlite3.Connection, None, None]:
+    """Get the single writer connection used by imports and syncs.
+
+    Bulk writers queue up on a process-wide lock instead of competing for
+    SQLite's write lock, and WAL mode lets pooled readers keep going while a
+    write transaction is open. Transactions start with BEGIN IMMEDIATE.
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = _open_connection(isolation_level="IMMEDIATE")
+        try:
+            yield _writer
+        finally:
+            if isinstance(_writer, TimedConnection):
+                _writer.flush_metrics()
+            if _writer.in_transaction:
+                _writer.rollback()
+
+def _add_column_if_missing(cursor: sqlite3.Cursor, table: str, column: str, declaration: str):
+    """Add a column to a table created by an older version of the schema"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+def _table_exists(cursor: sqlite3.Cursor, name: str) -> bool:
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+    return cursor.fetchone() is not None
+
+def _add_geometry_column(cursor: sqlite3.Cursor, table: str, geometry_type: str):
+    """Register a 4326 geometry column with its R*Tree index unless already there"""
+    cursor.execute("""
+        SELECT 1 FROM geometry_columns
+        WHERE lower(f_table_name) = lower(?) AND lower(f_geometry_column) = 'geometry'
+    """, (table,))
+    if cursor.fetchone() is None:
+        cursor.execute(f"SELECT AddGeometryColumn('{table}', 'geometry', 4326, '{geometry_type}', 'XY')")
+    if not _table_exists(cursor, f"idx_{table}_geometry"):
+        cursor.execute(f"SELECT CreateSpatialIndex('{table}', 'geometry')")
+
+def _migrate_base_schema(cursor: sqlite3.Cursor):
+    """Users, sessions and cameras with their geometry and filter indexes"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            totp_secret TEXT,
+            is_active BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_token TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            expires_at TIMESTAMP NOT NULL,
+            is_2fa_validated BOOLEAN DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS cameras (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            g_sheet_row_id TEXT UNIQUE,
+            name TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'Active',
+            camera_type TEXT NOT NULL DEFAULT 'Fixed',
+            description TEXT,
+            direction REAL,
+            field_of_view REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    _add_geometry_column(cursor, "cameras", "POINT")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_camera_status ON cameras(status)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_camera_type ON cameras(camera_type)")
+
+def _migrate_dataset_version(cursor: sqlite3.Cursor):
+    """Dataset version, bumped by every write to the cameras table"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS dataset_meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("INSERT OR IGNORE INTO dataset_meta (key, value) VALUES ('version', 0)")
+
+def _migrate_sheet_hashes(cursor: sqlite3.Cursor):
+    """Row hashes and a covering index for the incremental sheet sync"""
+    _add_column_if_missing(cursor, "cameras", "content_hash", "TEXT")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_camera_sheet_hash ON cameras(g_sheet_row_id, content_hash)")
+
+def _migrate_jobs(cursor: sqlite3.Cursor):
+    """Background sync/import jobs, see services/jobs.py"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            params TEXT NOT NULL,
+            user_id INTEGER,
+            rows_processed INTEGER NOT NULL DEFAULT 0,
+            rows_added INTEGER NOT NULL DEFAULT 0,
+            errors INTEGER NOT NULL DEFAULT 0,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            cancel_requested BOOLEAN NOT NULL DEFAULT 0,
+            result TEXT,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
+
+def _migrate_camera_fov(cursor: sqlite3.Cursor):
+    """Field-of-view sector of every camera, kept in step by the write paths
+    (services/camera_fov.py); rowid is the camera id"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS camera_fov (
+            camera_id INTEGER PRIMARY KEY,
+            longitude REAL NOT NULL,
+            latitude REAL NOT NULL,
+            direction REAL NOT NULL,
+            field_of_view REAL NOT NULL,
+            range_m REAL NOT NULL
+        )
+    """)
+    _add_geometry_column(cursor, "camera_fov", "POLYGON")
+
+def _migrate_delta_tracking(cursor: sqlite3.Cursor):
+    """Per-camera versions and the tombstone log behind ?since= (services/camera_delta.py)"""
+    _add_column_if_missing(cursor, "cameras", "version", "INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_camera_version ON cameras(version)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_camera_updated_at ON cameras(updated_at)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS camera_tombstones (
+            camera_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL,
+            deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_camera_tombstones_version ON camera_tombstones(version)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_camera_tombstones_deleted_at ON camera_tombstones(deleted_at)")
+    # Deletions before the log existed (or older than its retention) are
+    # unknown: deltas from before this version/time get a full reset
+    cursor.execute("""
+        INSERT OR IGNORE INTO dataset_meta (key, value)
+        SELECT 'tombstone_floor', value FROM dataset_meta WHERE key = 'version'
+    """)
+    cursor.execute("""
+        INSERT OR IGNORE INTO dataset_meta (key, value)
+        VALUES ('tombstone_floor_at', CAST(strftime('%s', 'now') AS INTEGER))
+    """)
+
+def _migrate_camera_stats(cursor: sqlite3.Cursor):
+    """Camera counts per grid cell, status and type (services/camera_stats.py);
+    filled for existing cameras by ensure_camera_stats at startup"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS camera_grid_stats (
+            level INTEGER NOT NULL,
+            cell_x INTEGER NOT NULL,
+            cell_y INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            camera_type TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (level, cell_x, cell_y, status, camera_type)
+        ) WITHOUT ROWID
+    """)
+
+def _migrate_job_leases(cursor: sqlite3.Cursor):
+    """Owner and heartbeat of running jobs; only expired leases are recovered"""
+    _add_column_if_missing(cursor, "jobs", "owner_pid", "INTEGER")
+    _add_column_if_missing(cursor, "jobs", "heartbeat_at", "REAL")
+
+def _migrate_stream_tokens(cursor: sqlite3.Cursor):
+    """Short-lived tokens that open the SSE change feed, see main.create_stream_token"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stream_tokens (
+            token TEXT PRIMARY KEY,
+            session_token TEXT NOT NULL,
+            expires_at TIMESTAMP NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_stream_tokens_expires_at ON stream_tokens(expires_at)")
+
+def _migrate_previous_states(cursor: sqlite3.Cursor):
+    """State of updated and deleted cameras before their latest change, which
+    filtered deltas need (services/camera_delta.py)"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS camera_previous_states (
+            camera_id INTEGER PRIMARY KEY,
+            replaced_version INTEGER NOT NULL,
+            state_version INTEGER NOT NULL,
+            state_updated_at TIMESTAMP,
+            longitude REAL,
+            latitude REAL,
+            status TEXT,
+            camera_type TEXT,
+            replaced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_camera_previous_states_replaced_at
+        ON camera_previous_states(replaced_at)
+    """)
+    # Changes made before the log existed are unknown: older deltas get a reset
+    cursor.execute("""
+        UPDATE dataset_meta SET value = MAX(value, (SELECT value FROM dataset_meta WHERE key = 'version'))
+        WHERE key = 'tombstone_floor'
+    """)
+    cursor.execute("""
+        UPDATE dataset_meta SET value = MAX(value, CAST(strftime('%s', 'now') AS INTEGER))
+        WHERE key = 'tombstone_floor_at'
+    """)
+
+def _migrate_job_owner_tokens(cursor: sqlite3.Cursor):
+    """Leases held by a per-runner token instead of a PID, which a restarted
+    container usually reuses; owner_pid is no longer read"""
+    _add_column_if_missing(cursor, "jobs", "owner", "TEXT")
+
+# Applied in order; PRAGMA user_version records how many have run. Append
+# new steps, never reorder or edit applied ones. Every step is idempotent,
+# because databases created before schema versioning start at 0 whatever
+# they already contain.
+MIGRATIONS = [
+    _migrate_base_schema,
+    _migrate_dataset_version,
+    _migrate_sheet_hashes,
+    _migrate_jobs,
+    _migrate_camera_fov,
+    _migrate_delta_tracking,
+    _migrate_camera_stats,
+    _migrate_job_leases,
+    _migrate_stream_tokens,
+    _migrate_previous_states,
+    _migrate_job_owner_tokens,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def get_schema_version(cursor: sqlite3.Cursor) -> int:
+    cursor.execute("PRAGMA user_version")
+    return cursor.fetchone()[0]
 
 def init_database():
-    """Initialize database with spatial support and create tables"""
-    with get_db_connection() as conn:
+    """Bring the database schema up to SCHEMA_VERSION.
+
+    An up-to-date database costs one PRAGMA read and takes no write lock, so
+    every worker can call this at startup. Pending migrations run in a
+    single IMMEDIATE transaction together with the version bump; concurrent
+    starters wait for it and then find nothing left to do.
+    """
+    with get_db_writer() as conn:
         cursor = conn.cursor()
-        
-        # Initialize spatial metadata
-        try:
+        if get_schema_version(cursor) == SCHEMA_VERSION:
+            return
+
+        if not _table_exists(cursor, "spatial_ref_sys"):
+            # Runs its own transaction, so it cannot join the one below
             cursor.execute("SELECT InitSpatialMetadata(1)")
-        except:
-            pass
-        
-        # Create users table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                totp_secret TEXT,
-                is_active BOOLEAN DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Create sessions table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS sessions (
-                session_token TEXT PRIMARY KEY,
-                user_id INTEGER NOT NULL,
-                expires_at TIMESTAMP NOT NULL,
-                is_2fa_validated BOOLEAN DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        """)
-        
-        # Create cameras table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS cameras (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                g_sheet_row_id TEXT UNIQUE,
-                name TEXT NOT NULL,
-                status TEXT NOT NULL DEFAULT 'Active',
-                camera_type TEXT NOT NULL DEFAULT 'Fixed',
-                description TEXT,
-                direction REAL,
-                field_of_view REAL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+
+        cursor.execute("BEGIN IMMEDIATE")
+        version = get_schema_version(cursor)
+        if version > SCHEMA_VERSION:
+            conn.rollback()
+            raise RuntimeError(
+                f"Database schema version {version} is newer than this code's {SCHEMA_VERSION}"
             )
-        """)
-        
-        # Add geometry column for camera location
-        try:
-            cursor.execute("""
-                SELECT AddGeometryColumn('cameras', 'geometry', 4326, 'POINT', 'XY')
-            """)
-        except:
-            pass
-        
-        # Create spatial index
-        try:
-            cursor.execute("""
-                SELECT CreateSpatialIndex('cameras', 'geometry')
-            """)
-        except:
-            pass
-        
-        # Create indexes for filtering
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_camera_status ON cameras(status)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_camera_type ON cameras(camera_type)")
-        
+        for migration in MIGRATIONS[version:]:
+            migration(cursor)
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
         conn.commit()
-        print("Database initialized successfully")
+        print(f"Database schema migrated from version {version} to {SCHEMA_VERSION}")
 
 if __name__ == "__main__":
     init_database()
\ No newline at end of file
@@ -1,23 +1,39 @@
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Header
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from database import get_db_connection, init_database
 from models import (
     UserCreate, UserLogin, TOTPVerify, TokenResponse,
-    TOTPSetup, CameraCreate, CameraGeoJSON
+    TOTPSetup, CameraCreate, CameraGeoJSON, NearestBatchRequest, RouteCoverageRequest
 )
 from utils.auth import (
-    hash_password, verify_password, create_access_token,
-    generate_totp_secret, verify_totp, generate_qr_code, verify_token
+    hash_password_async, verify_password_async, create_access_token,
+    generate_totp_secret, verify_totp, generate_qr_code, verify_token,
+    AuthPoolBusy, password_pool
 )
 from services.camera_service import (
-    sync_cameras_from_sheets, get_cameras_geojson, import_cameras_from_file
+    get_cameras_geojson, get_cameras_delta, get_covering_cameras, get_nearest_cameras, get_nearest_cameras_batch,
+    get_camera_tile, get_camera_clusters, get_camera_stats, get_cameras_columnar,
+    get_camera_ids, encode_camera_features, STREAM_BATCH_SIZE
 )
+from services.file_ingest import SUPPORTED_EXTENSIONS, spool_upload
+from services.jobs import JOB_SPOOL_DIR, job_runner
+from services.route_coverage import analyze_route_coverage
+from services.columnar import MEDIA_TYPE as COLUMNAR_MEDIA_TYPE
+from services.dataset_version import etag_matches, get_dataset_version, make_etag, peek_dataset_version
+from services.change_feed import change_feed, iter_sse
+from services.camera_fov import ensure_fov_sectors, fov_config_key
+from services.camera_stats import ensure_camera_stats
+from services.camera_snapshot import snapshot_manager
+from services.cluster_index import MAX_CLUSTER_ZOOM
+from services.vector_tiles import MAX_ZOOM
+from utils.executors import encode_json, run_cpu, run_db, run_import
+from utils.metrics import METRICS_ENABLED, METRICS_TOKEN, MetricsMiddleware, register_gauge, render_metrics, span
+from utils.session_cache import session_cache
 from datetime import datetime, timedelta
 import secrets
-import pandas as pd
-import io
-from typing import Optional
+import sqlite3
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 app = FastAPI(title="Camera GIS API")
 
@@ -39,105 +55,186 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost, so the latency histograms include every other middleware
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
     init_database()
+    ensure_fov_sectors()
+    ensure_camera_stats()
+    job_runner.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Waits for running jobs to reach their next chunk
+    await run_import(job_runner.shutdown)
+    password_pool.shutdown()
+
+@app.exception_handler(AuthPoolBusy)
+async def auth_pool_busy_handler(request, exc):
+    # Shed load fast during login storms instead of queueing without bound
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Authentication service busy, retry shortly"},
+        headers={"Retry-After": "1"}
+    )
+
+# Lifetime of the tokens that open the SSE change feed; they travel in the
+# URL (EventSource cannot send headers), so they expire quickly
+STREAM_TOKEN_SECONDS = int(os.getenv("STREAM_TOKEN_SECONDS", "60"))
 
 # Authentication dependency
 async def get_current_user(authorization: Optional[str] = Header(None)):
+    with span("auth"):
+        return await _authenticate(authorization)
+
+async def get_stream_user(
+    token: Optional[str] = Query(None),
+    authorization: Optional[str] = Header(None)
+):
+    """Authenticate by ?token= from create_stream_token, or like get_current_user"""
+    if token is None:
+        return await get_current_user(authorization)
+
+    def load_stream_token():
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT session_token, expires_at FROM stream_tokens WHERE token = ?", (token,)
+            )
+            return cursor.fetchone()
+
+    with span("auth"):
+        row = await run_db(load_stream_token)
+        if not row or datetime.fromisoformat(row['expires_at']) < datetime.now():
+            raise HTTPException(status_code=401, detail="Invalid or expired stream token")
+        # Only as good as the session it was issued for
+        return await _session_user(row['session_token'])
+
+async def _authenticate(authorization: Optional[str]):
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Not authenticated")
 
-    token = authorization.replace("Bearer ", "")
+    return await _session_user(authorization.replace("Bearer ", ""))
 
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT s.user_id, s.is_2fa_validated, s.expires_at, u.username
-            FROM sessions s
-            JOIN users u ON s.user_id = u.id
-            WHERE s.session_token = ?
-        """, (token,))
-        session = cursor.fetchone()
+async def _session_user(token: str):
+    cached_user = session_cache.get(token)
+    if cached_user is not None:
+        return cached_user
 
-        if not session:
-            raise HTTPException(status_code=401, detail="Invalid session")
+    def load_session():
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT s.user_id, s.is_2fa_validated, s.expires_at, u.username
+                FROM sessions s
+                JOIN users u ON s.user_id = u.id
+                WHERE s.session_token = ?
+            """, (token,))
+            return cursor.fetchone()
 
-        if datetime.fromisoformat(session['expires_at']) < datetime.now():
-            raise HTTPException(status_code=401, detail="Session expired")
+    session = await run_db(load_session)
 
-        if not session['is_2fa_validated']:
-            raise HTTPException(status_code=401, detail="2FA required")
+    if not session:
+        raise HTTPException(status_code=401, detail="Invalid session")
 
-        return {
-            "user_id": session['user_id'],
-            "username": session['username']
-        }
+    expires_at = datetime.fromisoformat(session['expires_at'])
+    if expires_at < datetime.now():
+        raise HTTPException(status_code=401, detail="Session expired")
+
+    if not session['is_2fa_validated']:
+        raise HTTPException(status_code=401, detail="2FA required")
+
+    user = {
+        "user_id": session['user_id'],
+        "username": session['username']
+    }
+    session_cache.put(token, user, expires_at)
+    return user
 
 # Auth endpoints
 @app.post("/api/auth/register", response_model=TOTPSetup)
 async def register(user: UserCreate):
     """Register new user and setup 2FA"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-
-        # Check if user exists
-        cursor.execute("SELECT id FROM users WHERE username = ? OR email = ?", 
-                      (user.username, user.email))
-        if cursor.fetchone():
-            raise HTTPException(status_code=400, detail="User already exists")
-
-        # Create user
-        totp_secret = generate_totp_secret()
-        password_hash = hash_password(user.password)
-
-        cursor.execute("""
-            INSERT INTO users (username, email, password_hash, totp_secret)
-            VALUES (?, ?, ?, ?)
-        """, (user.username, user.email, password_hash, totp_secret))
-        conn.commit()
-
-        # Generate QR code
-        qr_code_url = generate_qr_code(totp_secret, user.username)
-
-        return TOTPSetup(
-            secret=totp_secret,
-            qr_code_url=qr_code_url,
-            manual_entry_key=totp_secret
-        )
+    def user_exists():
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id FROM users WHERE username = ? OR email = ?", 
+                          (user.username, user.email))
+            return cursor.fetchone() is not None
+
+    # Check if user exists
+    if await run_db(user_exists):
+        raise HTTPException(status_code=400, detail="User already exists")
+
+    # Create user
+    totp_secret = generate_totp_secret()
+    password_hash = await hash_password_async(user.password)
+
+    def create_user():
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO users (username, email, password_hash, totp_secret)
+                VALUES (?, ?, ?, ?)
+            """, (user.username, user.email, password_hash, totp_secret))
+            conn.commit()
+
+    try:
+        await run_db(create_user)
+    except sqlite3.IntegrityError:
+        # Registered concurrently between the check and the insert
+        raise HTTPException(status_code=400, detail="User already exists")
+
+    # Generate QR code
+    qr_code_url = await run_cpu(generate_qr_code, totp_secret, user.username)
+
+    return TOTPSetup(
+        secret=totp_secret,
+        qr_code_url=qr_code_url,
+        manual_entry_key=totp_secret
+    )
 
 @app.post("/api/auth/login", response_model=TokenResponse)
 async def login(credentials: UserLogin):
     """Login and create session"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT id, password_hash, totp_secret 
-            FROM users 
-            WHERE username = ? AND is_active = 1
-        """, (credentials.username,))
-        user = cursor.fetchone()
-
-        if not user or not verify_password(credentials.password, user['password_hash']):
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-
-        # Create session
-        session_token = secrets.token_urlsafe(32)
-        expires_at = datetime.now() + timedelta(hours=24)
-
-        cursor.execute("""
-            INSERT INTO sessions (session_token, user_id, expires_at, is_2fa_validated)
-            VALUES (?, ?, ?, ?)
-        """, (session_token, user['id'], expires_at, False))
-        conn.commit()
-
-        return TokenResponse(
-            access_token=session_token,
-            requires_2fa=True
-        )
+    def load_user():
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, password_hash, totp_secret 
+                FROM users 
+                WHERE username = ? AND is_active = 1
+            """, (credentials.username,))
+            return cursor.fetchone()
+
+    user = await run_db(load_user)
+
+    if not user or not await verify_password_async(credentials.password, user['password_hash']):
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    # Create session
+    session_token = secrets.token_urlsafe(32)
+    expires_at = datetime.now() + timedelta(hours=24)
+
+    def create_session():
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO sessions (session_token, user_id, expires_at, is_2fa_validated)
+                VALUES (?, ?, ?, ?)
+            """, (session_token, user['id'], expires_at, False))
+            conn.commit()
+
+    await run_db(create_session)
+
+    return TokenResponse(
+        access_token=session_token,
+        requires_2fa=True
+    )
 
 @app.post("/api/auth/verify-2fa")
 async def verify_2fa(verify: TOTPVerify, authorization: Optional[str] = Header(None)):
@@ -147,30 +244,38 @@ async def verify_2fa(verify: TOTPVerify, authorization: Optional[str] = Header(N
 
     token = authorization.replace("Bearer ", "")
 
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
+    def load_session():
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT s.user_id, u.totp_secret
+                FROM sessions s
+                JOIN users u ON s.user_id = u.id
+                WHERE s.session_token = ?
+            """, (token,))
+            return cursor.fetchone()
+
+    session = await run_db(load_session)
 
-        cursor.execute("""
-            SELECT s.user_id, u.totp_secret
-            FROM sessions s
-            JOIN users u ON s.user_id = u.id
-            WHERE s.session_token = ?
-        """, (token,))
-        session = cursor.fetchone()
+    if not session:
+        raise HTTPException(status_code=401, detail="Invalid session")
 
-        if not session:
-            raise HTTPException(status_code=401, detail="Invalid session")
+    if not verify_totp(session['totp_secret'], verify.totp_code):
+        raise HTTPException(status_code=401, detail="Invalid 2FA code")
 
-        if not verify_totp(session['totp_secret'], verify.totp_code):
-            raise HTTPException(status_code=401, detail="Invalid 2FA code")
+    def validate_session():
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE sessions SET is_2fa_validated = 1
+                WHERE session_token = ?
+            """, (token,))
+            conn.commit()
 
-        cursor.execute("""
-            UPDATE sessions SET is_2fa_validated = 1
-            WHERE session_token = ?
-        """, (token,))
-        conn.commit()
+    await run_db(validate_session)
+    session_cache.invalidate(token)
 
-        return {"status": "success", "message": "2FA verified"}
+    return {"status": "success", "message": "2FA verified"}
 
 @app.post("/api/auth/logout")
 async def logout(authorization: Optional[str] = Header(None)):
@@ -180,15 +285,50 @@ async def logout(authorization: Optional[str] = Header(None)):
 
     token = authorization.replace("Bearer ", "")
 
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM sessions WHERE session_token = ?", (token,))
-        conn.commit()
-
-        if cursor.rowcount == 0:
-            raise HTTPException(status_code=404, detail="Session not found")
-
-        return {"status": "success", "message": "Logged out successfully"}
+    def delete_session():
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM stream_tokens WHERE session_token = ?", (token,))
+            cursor.execute("DELETE FROM sessions WHERE session_token = ?", (token,))
+            conn.commit()
+            return cursor.rowcount
+
+    deleted = await run_db(delete_session)
+    session_cache.invalidate(token)
+    if deleted == 0:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    return {"status": "success", "message": "Logged out successfully"}
+
+async def current_dataset_version() -> int:
+    """get_dataset_version without blocking the event loop on a refresh"""
+    version = peek_dataset_version()
+    return version if version is not None else await run_db(get_dataset_version)
+
+async def json_response(content: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    """JSONResponse with the body serialised on the CPU pool"""
+    body = await run_cpu(encode_json, content)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+async def stream_cameras_geojson(
+    bbox: Optional[str], status: Optional[str], camera_type: Optional[str]
+) -> AsyncIterator[bytes]:
+    """GeoJSON FeatureCollection in batches of STREAM_BATCH_SIZE features.
+
+    Every batch is read under the "db" limiter and gives its connection back
+    before it is sent, so slow clients cannot hold the pool.
+    """
+    camera_ids = await run_db(get_camera_ids, bbox=bbox, status=status, camera_type=camera_type)
+    yield b'{"type": "FeatureCollection", "features": ['
+    separator = b''
+    for start in range(0, len(camera_ids), STREAM_BATCH_SIZE):
+        chunk = await run_db(
+            encode_camera_features, camera_ids[start:start + STREAM_BATCH_SIZE].tolist(), status, camera_type
+        )
+        if chunk:
+            yield separator + chunk
+            separator = b','
+    yield b']}'
 
 # Camera endpoints
 @app.get("/api/v1/cameras")
@@ -196,48 +336,325 @@ async def get_cameras(
     bbox: Optional[str] = None,
     status: Optional[str] = None,
     camera_type: Optional[str] = None,
+    zoom: Optional[float] = None,
+    stream: bool = False,
+    since: Optional[str] = None,
+    response_format: Optional[str] = Query(None, alias="format"),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get cameras with filtering, clustered below MAX_CLUSTER_ZOOM when zoom is given.
+
+    format=binary (or Accept: application/vnd.cameragis.columns) returns the
+    packed columnar payload instead of GeoJSON. Responses carry a strong ETag
+    derived from the dataset version, and a matching If-None-Match gets a 304
+    without querying the cameras table.
+
+    since=<version or ISO timestamp> returns only the cameras written since
+    then plus the ids of deleted ones (see get_cameras_delta); the response's
+    "version" is the since of the next request.
+    """
+    clustered = zoom is not None and zoom < MAX_CLUSTER_ZOOM
+    binary = response_format == "binary" or bool(accept and COLUMNAR_MEDIA_TYPE in accept)
+    representation = "clusters" if clustered else "binary" if binary else "stream" if stream else "json"
+    if since is not None and representation != "json":
+        raise HTTPException(status_code=400, detail="since is only supported for plain GeoJSON responses")
+
+    etag = make_etag(
+        await current_dataset_version(), "cameras", representation, bbox, status, camera_type,
+        int(zoom) if clustered else None, since
+    )
+    # The body's format depends on Accept, so shared caches must key on it too
+    headers = {"ETag": etag, "Vary": "Accept"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    if clustered:
+        clusters = await run_db(
+            get_camera_clusters, zoom, bbox=bbox, status=status, camera_type=camera_type
+        )
+        return await json_response(clusters, headers)
+    if binary:
+        payload = await run_db(
+            get_cameras_columnar, bbox=bbox, status=status, camera_type=camera_type
+        )
+        return Response(content=payload, media_type=COLUMNAR_MEDIA_TYPE, headers=headers)
+    if stream:
+        return StreamingResponse(
+            stream_cameras_geojson(bbox, status, camera_type),
+            media_type="application/geo+json",
+            headers=headers
+        )
+    if since is not None:
+        try:
+            delta = await run_db(
+                get_cameras_delta, since, bbox=bbox, status=status, camera_type=camera_type
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return await json_response(delta, headers)
+    cameras = await run_db(
+        get_cameras_geojson, bbox=bbox, status=status, camera_type=camera_type
+    )
+    with span("cameras.encode_json"):
+        return await json_response(cameras, headers)
+
+@app.post("/api/v1/cameras/stream/token")
+async def create_stream_token(authorization: Optional[str] = Header(None)):
+    """Short-lived token for opening the change feed with EventSource.
+
+    The token is passed as /api/v1/cameras/stream?token=...; it only opens
+    streams, expires after STREAM_TOKEN_SECONDS and stops working when its
+    session ends. A client whose stream drops fetches a new one to reconnect.
+    """
+    with span("auth"):
+        await _authenticate(authorization)
+    session_token = authorization.replace("Bearer ", "")
+    token = secrets.token_urlsafe(32)
+    now = datetime.now()
+
+    def store_stream_token():
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM stream_tokens WHERE expires_at < ?", (now,))
+            cursor.execute("""
+                INSERT INTO stream_tokens (token, session_token, expires_at)
+                VALUES (?, ?, ?)
+            """, (token, session_token, now + timedelta(seconds=STREAM_TOKEN_SECONDS)))
+            conn.commit()
+
+    await run_db(store_stream_token)
+    return {"token": token, "expires_in": STREAM_TOKEN_SECONDS}
+
+@app.get("/api/v1/cameras/stream")
+async def stream_camera_changes(
+    request: Request,
+    bbox: Optional[str] = None,
+    status: Optional[str] = None,
+    current_user: dict = Depends(get_stream_user)
+):
+    """Server-sent events with camera changes inside bbox/status.
+
+    Browsers authenticate with ?token= from POST /api/v1/cameras/stream/token,
+    because EventSource cannot send an Authorization header.
+
+    "changes" events carry compact upsert/delete records; on "resync" the
+    client should reload its view with GET /api/v1/cameras.
+    """
+    subscription = change_feed.subscribe(bbox, status, await current_dataset_version())
+    return StreamingResponse(
+        iter_sse(subscription, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/v1/cameras/stats")
+async def get_cameras_stats(
+    bbox: Optional[str] = None,
+    zoom: Optional[float] = Query(None, ge=0, le=MAX_ZOOM),
+    status: Optional[str] = None,
+    camera_type: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """Camera counts by status and type, and a density grid, for bbox.
+
+    Served from precomputed per-cell counts, so the cost does not grow with
+    the number of cameras; zoom picks a grid fine enough for a heatmap at
+    that map zoom.
+    """
+    etag = make_etag(await current_dataset_version(), "stats", bbox, zoom, status, camera_type)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    stats = await run_db(get_camera_stats, bbox=bbox, zoom=zoom, status=status, camera_type=camera_type)
+    return await json_response(stats, {"ETag": etag})
+
+@app.get("/api/v1/cameras/covering")
+async def get_cameras_covering(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    status: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """Cameras whose field of view covers the point lat/lon, nearest first"""
+    etag = make_etag(await current_dataset_version(), "covering", fov_config_key(), lat, lon, status)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    result = await run_db(get_covering_cameras, lon, lat, status)
+    return await json_response(result, {"ETag": etag})
+
+# Upper bounds for the nearest-camera endpoints
+MAX_NEAREST_K = 1000
+MAX_NEAREST_BATCH = int(os.getenv("CAMERA_NEAREST_BATCH_MAX", "1000"))
+
+@app.get("/api/v1/cameras/nearest")
+async def get_cameras_nearest(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(10, ge=1, le=MAX_NEAREST_K),
+    status: Optional[str] = None,
+    max_distance_m: Optional[float] = Query(None, gt=0),
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """The k cameras closest to lat/lon by great-circle distance, nearest first"""
+    etag = make_etag(await current_dataset_version(), "nearest", lat, lon, k, status, max_distance_m)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    result = await run_db(get_nearest_cameras, lon, lat, k, status, max_distance_m)
+    return await json_response(result, {"ETag": etag})
+
+@app.post("/api/v1/cameras/nearest/batch")
+async def get_cameras_nearest_batch(
+    request: NearestBatchRequest,
     current_user: dict = Depends(get_current_user)
 ):
-    """Get cameras with filtering"""
-    return get_cameras_geojson(bbox=bbox, status=status, camera_type=camera_type)
+    """Nearest cameras for many [lon, lat] points; results follow the order of points"""
+    if len(request.points) > MAX_NEAREST_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_NEAREST_BATCH} points per request")
+    points = []
+    for point in request.points:
+        if len(point) < 2 or not (-180 <= point[0] <= 180 and -90 <= point[1] <= 90):
+            raise HTTPException(status_code=400, detail=f"Invalid point: {point}")
+        points.append((point[0], point[1]))
+
+    results = await run_db(
+        get_nearest_cameras_batch, points, request.k, request.status, request.max_distance_m
+    )
+    return await json_response({"results": results})
+
+@app.get("/api/v1/cameras/tiles/{z}/{x}/{y}.mvt")
+async def get_cameras_tile(
+    z: int,
+    x: int,
+    y: int,
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get cameras as a Mapbox Vector Tile"""
+    if not (0 <= z <= MAX_ZOOM) or not (0 <= x < 2 ** z) or not (0 <= y < 2 ** z):
+        raise HTTPException(status_code=404, detail="Tile out of range")
+
+    version = await current_dataset_version()
+    etag = make_etag(version, "tile", z, x, y)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    tile = await run_db(get_camera_tile, z, x, y, version)
+    return Response(
+        content=tile,
+        media_type="application/vnd.mapbox-vector-tile",
+        headers={"ETag": etag}
+    )
+
+@app.post("/api/v1/routes/coverage")
+async def get_route_coverage(
+    request: RouteCoverageRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Cameras within buffer_m of a route, ordered along it, and the covered and
+    uncovered stretches of the route according to the cameras' fields of view"""
+    try:
+        coverage = await run_db(analyze_route_coverage, request.route, request.buffer_m, request.status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await json_response(coverage)
 
-@app.post("/api/data/sync-sheets")
+@app.post("/api/data/sync-sheets", status_code=202)
 async def sync_sheets(
     spreadsheet_id: str,
+    ranges: Optional[List[str]] = Query(None),
     current_user: dict = Depends(get_current_user)
 ):
-    """Sync cameras from Google Sheets"""
-    result = sync_cameras_from_sheets(spreadsheet_id)
-    return result
-
-@app.post("/api/data/upload-file")
+    """Queue a sync of cameras from Google Sheets; poll /api/jobs/{job_id}.
+
+    spreadsheet_id may be a comma-separated list, synced concurrently; each
+    ranges parameter adds a tab/range read in the same batchGet call.
+    """
+    spreadsheet_ids = [part.strip() for part in spreadsheet_id.split(',') if part.strip()]
+    if not spreadsheet_ids:
+        raise HTTPException(status_code=400, detail="spreadsheet_id is required")
+
+    job_id = await run_db(
+        job_runner.submit, "sync_sheets",
+        {"spreadsheet_ids": spreadsheet_ids, "ranges": ranges},
+        current_user['user_id']
+    )
+    return {"job_id": job_id, "status": "queued"}
+
+@app.post("/api/data/upload-file", status_code=202)
 async def upload_file(
     file: UploadFile = File(...),
     current_user: dict = Depends(get_current_user)
 ):
-    """Upload CSV or XLSX file with camera data"""
-    try:
-        contents = await file.read()
-
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(io.BytesIO(contents))
-        elif file.filename.endswith('.xlsx'):
-            df = pd.read_excel(io.BytesIO(contents))
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported file format")
-
-        # Convert DataFrame to list of dicts
-        data = df.to_dict('records')
-        result = import_cameras_from_file(data)
-
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    """Upload CSV or XLSX file with camera data; poll /api/jobs/{job_id}.
+
+    The upload is spooled to disk and imported in the background in chunks
+    of UPLOAD_CHUNK_ROWS rows, so memory does not grow with the file size.
+    """
+    if not file.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+        raise HTTPException(status_code=400, detail="Unsupported file format")
+
+    suffix = os.path.splitext(file.filename)[1].lower()
+    path = await run_import(spool_upload, file.file, suffix, JOB_SPOOL_DIR)
+    job_id = await run_db(
+        job_runner.submit, "import_file",
+        {"path": path, "filename": file.filename},
+        current_user['user_id']
+    )
+    return {"job_id": job_id, "status": "queued"}
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Status and progress (rows processed, errors, throughput) of a job"""
+    job = await run_db(job_runner.get, job_id, current_user['user_id'])
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/api/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Cancel a job; a running import stops after its current chunk"""
+    job = await run_db(job_runner.cancel, job_id, current_user['user_id'])
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+register_gauge("camera_dataset_version", "Current camera dataset version", get_dataset_version)
+register_gauge("session_cache_hits", "Session cache hits since start", lambda: session_cache.stats()["hits"])
+register_gauge("session_cache_misses", "Session cache misses since start", lambda: session_cache.stats()["misses"])
+register_gauge(
+    "camera_snapshot_version", "Dataset version of the loaded camera snapshot (-1 when none)",
+    lambda: -1 if snapshot_manager.version is None else snapshot_manager.version
+)
+register_gauge("change_feed_subscribers", "Open camera change streams", change_feed.subscriber_count)
+
+@app.get("/api/metrics")
+async def metrics(authorization: Optional[str] = Header(None)):
+    """Request, span and SQL statement metrics in the Prometheus text format.
+
+    Only served when METRICS_TOKEN is configured, to scrapers that send it
+    as a Bearer token: the labels reveal routes, SQL and usage patterns.
+    """
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not secrets.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    # Gauges may query SQLite
+    return Response(content=await run_db(render_metrics), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "change_feed_subscribers": change_feed.subscriber_count()
+    }
 
 if __name__ == "__main__":
     import uvicorn
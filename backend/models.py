@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 class UserCreate(BaseModel):
@@ -39,6 +39,17 @@ class CameraGeoJSON(BaseModel):
     type: str = "FeatureCollection"
     features: list
 
+class RouteCoverageRequest(BaseModel):
+    route: Dict[str, Any]  # GeoJSON LineString, or a Feature with one
+    buffer_m: float = Field(50.0, gt=0, le=5000)
+    status: Optional[str] = None
+
+class NearestBatchRequest(BaseModel):
+    points: List[List[float]]  # [lon, lat] pairs, GeoJSON order
+    k: int = Field(10, ge=1, le=1000)
+    status: Optional[str] = None
+    max_distance_m: Optional[float] = Field(None, gt=0)
+
 class TokenResponse(BaseModel):
     access_token: str
     token_type: str = "bearer"
@@ -0,0 +1,84 @@
+import os
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+# Tombstones of deleted cameras and the previous states of changed ones are
+# kept this long; clients asking for
+# changes since before the oldest kept one get a full reset instead
+TOMBSTONE_RETENTION_DAYS = float(os.getenv("CAMERA_TOMBSTONE_RETENTION_DAYS", "30"))
+
+SQLITE_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def parse_since(since: str) -> Tuple[Optional[int], Optional[str], Optional[int]]:
+    """Parse since as a dataset version or an ISO 8601 timestamp.
+
+    Returns (version, None, None) or (None, sqlite_timestamp, epoch_seconds);
+    naive timestamps are taken as UTC, like SQLite's CURRENT_TIMESTAMP.
+    Raises ValueError when it is neither.
+    """
+    since = since.strip()
+    if since.isdigit():
+        return int(since), None, None
+    try:
+        moment = datetime.fromisoformat(since.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError("since must be a dataset version or an ISO 8601 timestamp")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    moment = moment.astimezone(timezone.utc)
+    return None, moment.strftime(SQLITE_TIMESTAMP_FORMAT), int(moment.timestamp())
+
+def read_meta(cursor, key: str, default: int = 0) -> int:
+    cursor.execute("SELECT value FROM dataset_meta WHERE key = ?", (key,))
+    row = cursor.fetchone()
+    return row[0] if row else default
+
+def record_tombstones(cursor, camera_ids: List[int], version: int) -> None:
+    """Log deleted cameras inside the caller's transaction and drop expired entries"""
+    if not camera_ids:
+        return
+    cursor.executemany(
+        "INSERT OR REPLACE INTO camera_tombstones (camera_id, version) VALUES (?, ?)",
+        [(camera_id, version) for camera_id in camera_ids]
+    )
+    _expire(cursor, "camera_tombstones", "version", "deleted_at")
+
+def record_previous_states(cursor, rows: list, version: int) -> None:
+    """Log the state cameras had before version updated or deleted them.
+
+    rows are the cameras' rows as read before the write (id, version,
+    updated_at, longitude, latitude, status, camera_type). Only the state
+    before a camera's latest change is kept.
+    """
+    if not rows:
+        return
+    cursor.executemany("""
+        INSERT OR REPLACE INTO camera_previous_states
+        (camera_id, replaced_version, state_version, state_updated_at, longitude, latitude, status, camera_type)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, [
+        (row['id'], version, row['version'], row['updated_at'],
+         row['longitude'], row['latitude'], row['status'], row['camera_type'])
+        for row in rows
+    ])
+    _expire(cursor, "camera_previous_states", "replaced_version", "replaced_at")
+
+def _expire(cursor, table: str, version_column: str, time_column: str) -> None:
+    """Drop log entries past the retention and raise the delta floors over them"""
+    modifier = f"-{TOMBSTONE_RETENTION_DAYS} days"
+    cursor.execute(
+        f"SELECT MAX({version_column}) FROM {table} WHERE {time_column} < datetime('now', ?)",
+        (modifier,)
+    )
+    expired_version = cursor.fetchone()[0]
+    if expired_version is None:
+        return
+    cursor.execute(f"DELETE FROM {table} WHERE {time_column} < datetime('now', ?)", (modifier,))
+    # Deltas from before the dropped entries can no longer be answered
+    cursor.execute("""
+        UPDATE dataset_meta SET value = MAX(value, ?) WHERE key = 'tombstone_floor'
+    """, (expired_version,))
+    cursor.execute("""
+        UPDATE dataset_meta SET value = MAX(value, CAST(strftime('%s', 'now', ?) AS INTEGER))
+        WHERE key = 'tombstone_floor_at'
+    """, (modifier,))
@@ -0,0 +1,46 @@
+from typing import Callable, List, NamedTuple, Optional
+
+class CameraState(NamedTuple):
+    """Spatial and display state of a camera row"""
+    longitude: float
+    latitude: float
+    status: str
+    camera_type: str
+    direction: Optional[float]
+    field_of_view: Optional[float]
+
+class CameraChange(NamedTuple):
+    """A written camera row; old is None for inserts, new is None for deletes"""
+    camera_id: int
+    old: Optional[CameraState]
+    new: Optional[CameraState]
+
+# Called with a committed batch and the dataset version it was committed as
+CameraListener = Callable[[List[CameraChange], int], None]
+
+_listeners: List[CameraListener] = []
+
+def add_listener(listener: CameraListener) -> None:
+    """Register a callback that receives every committed batch of changes"""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+def remove_listener(listener: CameraListener) -> None:
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+def publish(changes: List[CameraChange], version: Optional[int]) -> None:
+    """Notify listeners about changes committed as dataset version.
+
+    Called by the write paths after commit with the version they bumped to;
+    the current version may already be newer if another process wrote since.
+    A failing listener is logged and skipped so that derived caches can never
+    break an import or sync.
+    """
+    if not changes:
+        return
+    for listener in list(_listeners):
+        try:
+            listener(changes, version)
+        except Exception as e:
+            print(f"Error in camera change listener {listener!r}: {e}")
@@ -0,0 +1,165 @@
+import os
+import struct
+import sys
+import zlib
+from typing import Dict, List, Optional
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from database import get_db_writer
+from services.camera_events import CameraChange, CameraState
+
+# Viewing distance in metres, per camera_type ("PTZ=200,Dome=30") with a default
+FOV_DEFAULT_RANGE = float(os.getenv("CAMERA_FOV_DEFAULT_RANGE", "100"))
+FOV_RANGES_SPEC = os.getenv("CAMERA_FOV_RANGES", "")
+# Straight edges used to approximate a full 360 degree arc
+FOV_ARC_SEGMENTS = int(os.getenv("CAMERA_FOV_ARC_SEGMENTS", "32"))
+
+METERS_PER_DEGREE = 111320.0
+INSERT_BATCH_SIZE = 5000
+# Little-endian WKB polygon header: byte order, geometry type, rings, points
+_WKB_POLYGON_HEADER = struct.Struct('<BIII')
+
+def _parse_ranges(spec: str) -> Dict[str, float]:
+    ranges = {}
+    for item in spec.split(','):
+        if '=' in item:
+            camera_type, meters = item.split('=', 1)
+            ranges[camera_type.strip()] = float(meters)
+    return ranges
+
+FOV_RANGES = _parse_ranges(FOV_RANGES_SPEC)
+
+def fov_range(camera_type: Optional[str]) -> float:
+    return FOV_RANGES.get(camera_type, FOV_DEFAULT_RANGE)
+
+def fov_config_key() -> int:
+    """Fingerprint of the sector settings; stored sectors are rebuilt when it changes"""
+    config = f"{FOV_DEFAULT_RANGE}|{sorted(FOV_RANGES.items())}|{FOV_ARC_SEGMENTS}"
+    return zlib.crc32(config.encode())
+
+def sector_polygons(longitude: np.ndarray, latitude: np.ndarray, direction: np.ndarray,
+                    field_of_view: np.ndarray, range_m: np.ndarray) -> List[bytes]:
+    """Field-of-view polygons of many cameras, as WKB.
+
+    direction is a compass bearing (clockwise from north) of the view axis,
+    field_of_view its full opening angle. Arc vertices are pushed out by
+    1 / cos(half step) so each polygon contains the true circular sector;
+    the index bbox therefore never misses a covered point. Cameras with the
+    same number of arc steps are computed together as one array.
+    """
+    steps = np.maximum(1, np.ceil(FOV_ARC_SEGMENTS * field_of_view / 360.0)).astype(int)
+    polygons: List[bytes] = [b""] * len(steps)
+
+    for count in np.unique(steps).tolist():
+        rows = np.flatnonzero(steps == count)
+        lon, lat = longitude[rows], latitude[rows]
+        fov = field_of_view[rows]
+        step = fov / count
+        radius = range_m[rows] / np.cos(np.radians(step / 2))
+        bearings = np.radians(
+            (direction[rows] - fov / 2)[:, None] + step[:, None] * np.arange(count + 1)
+        )
+        meters_per_lon = METERS_PER_DEGREE * np.maximum(np.cos(np.radians(lat)), 1e-6)
+
+        # Ring: apex, arc vertices, apex
+        ring = np.empty((len(rows), count + 3, 2))
+        ring[:, 0, 0] = ring[:, -1, 0] = lon
+        ring[:, 0, 1] = ring[:, -1, 1] = lat
+        ring[:, 1:-1, 0] = lon[:, None] + radius[:, None] * np.sin(bearings) / meters_per_lon[:, None]
+        ring[:, 1:-1, 1] = lat[:, None] + radius[:, None] * np.cos(bearings) / METERS_PER_DEGREE
+
+        full_circle = fov >= 360.0
+        for row, points, full in zip(rows.tolist(), ring, full_circle.tolist()):
+            if full:
+                # A full circle has no apex; close the arc on its first vertex
+                points = points[1:-1].copy()
+                points[-1] = points[0]
+            polygons[row] = _WKB_POLYGON_HEADER.pack(1, 3, 1, len(points)) + points.tobytes()
+    return polygons
+
+def refresh_fov_sectors(cursor, changes: List[CameraChange]) -> None:
+    """Rewrite the stored sectors of changed cameras inside the caller's transaction"""
+    if not changes:
+        return
+    # Delete first: SpatiaLite's index triggers do not handle INSERT OR REPLACE
+    cursor.executemany(
+        "DELETE FROM camera_fov WHERE camera_id = ?",
+        [(change.camera_id,) for change in changes]
+    )
+    written = [change for change in changes if change.new is not None]
+    if not written:
+        return
+
+    camera_ids = [change.camera_id for change in written]
+    longitude = np.array([change.new.longitude for change in written], dtype=float)
+    latitude = np.array([change.new.latitude for change in written], dtype=float)
+    # Same defaults as the imports: no direction faces north, no FOV is 90 degrees
+    direction = np.array([change.new.direction or 0.0 for change in written], dtype=float) % 360.0
+    field_of_view = np.minimum(
+        np.array([change.new.field_of_view or 90.0 for change in written], dtype=float), 360.0
+    )
+    range_m = np.array([fov_range(change.new.camera_type) for change in written], dtype=float)
+    polygons = sector_polygons(longitude, latitude, direction, field_of_view, range_m)
+
+    rows = list(zip(
+        camera_ids, longitude.tolist(), latitude.tolist(), direction.tolist(),
+        field_of_view.tolist(), range_m.tolist(), polygons
+    ))
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        cursor.executemany("""
+            INSERT INTO camera_fov
+                (camera_id, longitude, latitude, direction, field_of_view, range_m, geometry)
+            VALUES (?, ?, ?, ?, ?, ?, GeomFromWKB(?, 4326))
+        """, rows[start:start + INSERT_BATCH_SIZE])
+
+def rebuild_fov_sectors(cursor) -> int:
+    """Recompute every stored sector, e.g. after the range settings changed"""
+    cursor.execute("DELETE FROM camera_fov")
+    cursor.execute("""
+        SELECT id, ST_X(geometry), ST_Y(geometry), status, camera_type, direction, field_of_view
+        FROM cameras WHERE geometry IS NOT NULL
+    """)
+    changes = [
+        CameraChange(row[0], None, CameraState(row[1], row[2], row[3], row[4], row[5], row[6]))
+        for row in cursor.fetchall()
+    ]
+    refresh_fov_sectors(cursor, changes)
+    cursor.execute(
+        "INSERT OR REPLACE INTO dataset_meta (key, value) VALUES ('fov_config', ?)",
+        (fov_config_key(),)
+    )
+    return len(changes)
+
+def ensure_fov_sectors() -> None:
+    """Build sectors for existing cameras when missing or configured differently"""
+    with get_db_writer() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT value FROM dataset_meta WHERE key = 'fov_config'")
+        row = cursor.fetchone()
+        if row is not None and row[0] == fov_config_key():
+            return
+        count = rebuild_fov_sectors(cursor)
+        conn.commit()
+    print(f"Rebuilt field-of-view sectors for {count} cameras")
+
+def covering_mask(longitude: float, latitude: float, cam_lon: np.ndarray, cam_lat: np.ndarray,
+                  direction: np.ndarray, field_of_view: np.ndarray, range_m: np.ndarray):
+    """Vectorized test of which cameras see the point; returns (mask, distance_m, bearing).
+
+    The point and camera arrays broadcast against each other, so (k, 1)
+    points and (1, m) cameras give (k, m) results. Longitude differences are
+    wrapped, so sectors reaching across the antimeridian cover both sides.
+    """
+    dx = ((longitude - cam_lon + 180.0) % 360.0 - 180.0) * METERS_PER_DEGREE * np.cos(np.radians(cam_lat))
+    dy = (latitude - cam_lat) * METERS_PER_DEGREE
+    distance = np.hypot(dx, dy)
+    bearing = np.degrees(np.arctan2(dx, dy)) % 360.0
+    # Signed difference folded into [-180, 180)
+    off_axis = np.abs((bearing - direction + 180.0) % 360.0 - 180.0)
+    mask = (distance <= range_m) & (
+        (field_of_view >= 360.0) | (off_axis <= field_of_view / 2) | (distance == 0)
+    )
+    return mask, distance, bearing
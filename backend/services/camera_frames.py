@@ -0,0 +1,73 @@
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Only this many per-row errors are returned in detail; all are counted
+MAX_REPORTED_ERRORS = 1000
+
+def _column(df: pd.DataFrame, name: str) -> pd.Series:
+    if name in df.columns:
+        return df[name]
+    return pd.Series(np.nan, index=df.index, dtype=object)
+
+def _text(df: pd.DataFrame, name: str, default: str) -> pd.Series:
+    values = _column(df, name)
+    return values.where(values.notna(), default).astype(str)
+
+def _blank(values: pd.Series) -> pd.Series:
+    return values.isna() | (values.astype(str).str.strip() == '')
+
+def prepare_camera_frame(
+    df: pd.DataFrame,
+    row_offset: int = 0
+) -> Tuple[pd.DataFrame, int, List[Dict[str, Any]]]:
+    """Validate and coerce an uploaded camera table column by column.
+
+    Applies the same rules as the per-row import (coordinate ranges,
+    direction defaulting to 0 and a zero/missing field of view to 90) as
+    whole-column pandas operations. Returns the valid rows with the columns
+    name, status, camera_type, description, direction, field_of_view,
+    longitude and latitude, the number of rejected rows, and details for the
+    first MAX_REPORTED_ERRORS of them (row numbers are 0-based positions in
+    the upload, shifted by row_offset).
+    """
+    df = df.reset_index(drop=True)
+
+    latitude = pd.to_numeric(_column(df, 'latitude'), errors='coerce')
+    longitude = pd.to_numeric(_column(df, 'longitude'), errors='coerce')
+    direction_raw = _column(df, 'direction')
+    direction = pd.to_numeric(direction_raw, errors='coerce')
+    fov_raw = _column(df, 'field_of_view')
+    fov = pd.to_numeric(fov_raw, errors='coerce')
+
+    invalid_coordinates = ~(latitude.between(-90, 90) & longitude.between(-180, 180))
+    invalid_direction = direction.isna() & ~_blank(direction_raw)
+    invalid_fov = fov.isna() & ~_blank(fov_raw)
+
+    reasons = np.select(
+        [invalid_coordinates.to_numpy(), invalid_direction.to_numpy(), invalid_fov.to_numpy()],
+        ["Invalid coordinates", "Invalid direction", "Invalid field_of_view"],
+        default=""
+    )
+    rejected = reasons != ""
+    rejected_rows = np.flatnonzero(rejected)
+    errors = [
+        {"row": int(row) + row_offset, "error": str(reasons[row])}
+        for row in rejected_rows[:MAX_REPORTED_ERRORS]
+    ]
+
+    valid = ~rejected
+    fov = fov.fillna(90.0)
+    frame = pd.DataFrame({
+        "name": _text(df, 'name', 'Unnamed Camera'),
+        "status": _text(df, 'status', 'Active'),
+        "camera_type": _text(df, 'type', 'Fixed'),
+        "description": _text(df, 'description', ''),
+        "direction": direction.fillna(0.0).astype(float),
+        "field_of_view": fov.where(fov != 0, 90.0).astype(float),
+        "longitude": longitude,
+        "latitude": latitude,
+    })[valid]
+
+    return frame, int(rejected.sum()), errors
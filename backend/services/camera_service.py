@@ -2,197 +2,977 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from database import get_db_connection
-from services.google_sheets import read_sheet_data, validate_coordinates
-from typing import List, Dict, Any, Optional
+from database import get_db_connection, get_db_writer
+from services.google_sheets import (
+    DEFAULT_RANGE, read_sheet_data, read_sheet_ranges, sheet_row_prefix, validate_coordinates
+)
+from services.camera_fov import covering_mask, refresh_fov_sectors
+from services.camera_snapshot import SNAPSHOT_ENABLED, snapshot_manager
+from services.camera_stats import apply_stats_changes, cell_center, select_level
+from services.camera_delta import parse_since, read_meta, record_previous_states, record_tombstones
+from services.camera_events import CameraChange, CameraState, add_listener, publish
+from services.dataset_version import bump_dataset_version, get_dataset_version, mark_committed
+from services.columnar import COLUMNS as COLUMNAR_COLUMNS, encode_camera_columns
+from services.cluster_index import MAX_CLUSTER_ZOOM, ClusterIndex
+from services.nearest_index import NearestIndex
+from services.tile_cache import TileCache
+from services.vector_tiles import BUFFER, encode_point_layer, tile_bounds
+from utils.metrics import span
+from typing import List, Dict, Any, Callable, Optional
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import threading
 import json
+import numpy as np
 
-def sync_cameras_from_sheets(spreadsheet_id: str) -> Dict[str, Any]:
-    """Sync camera data from Google Sheets to database"""
-    sheet_data = read_sheet_data(spreadsheet_id)
+TILE_CACHE_SIZE = int(os.getenv("CAMERA_TILE_CACHE_SIZE", "2048"))
+# Optional MBTiles-style SQLite file that keeps rendered tiles across restarts
+TILE_CACHE_PATH = os.getenv("CAMERA_TILE_CACHE_PATH")
+TILE_CACHE_DISK_SIZE = int(os.getenv("CAMERA_TILE_CACHE_DISK_SIZE", "100000"))
+
+tile_cache = TileCache(
+    max_memory_tiles=TILE_CACHE_SIZE,
+    mbtiles_path=TILE_CACHE_PATH,
+    max_disk_tiles=TILE_CACHE_DISK_SIZE
+)
+
+CAMERA_STATE_COLUMNS = """
+    ST_X(geometry) AS longitude, ST_Y(geometry) AS latitude,
+    status, camera_type, direction, field_of_view
+"""
+
+def _camera_state(row) -> Optional[CameraState]:
+    if row is None or row['longitude'] is None:
+        return None
+    return CameraState(
+        row['longitude'], row['latitude'], row['status'], row['camera_type'],
+        row['direction'], row['field_of_view']
+    )
+
+def _invalidate_tiles(changes: List[CameraChange], version: int) -> None:
+    """Drop cached tiles that contain the old or new position of a camera"""
+    points = [
+        (state.longitude, state.latitude)
+        for change in changes for state in (change.old, change.new) if state is not None
+    ]
+    coords = np.array(points, dtype=float).reshape(-1, 2)
+    tile_cache.invalidate_points(coords[:, 0], coords[:, 1], version)
+
+add_listener(_invalidate_tiles)
+
+cluster_index = ClusterIndex(max_zoom=MAX_CLUSTER_ZOOM)
+add_listener(cluster_index.apply_changes)
+
+nearest_index = NearestIndex()
+add_listener(nearest_index.apply_changes)
+
+if SNAPSHOT_ENABLED:
+    # Start the next snapshot right after commit rather than on the next read
+    add_listener(lambda changes, version: snapshot_manager.schedule(version))
+
+UPSERT_SHEET_CAMERA_SQL = """
+    INSERT INTO cameras 
+    (g_sheet_row_id, name, status, camera_type, description, 
+     direction, field_of_view, geometry, content_hash, version)
+    VALUES (?, ?, ?, ?, ?, ?, ?, MakePoint(?, ?, 4326), ?, ?)
+    ON CONFLICT(g_sheet_row_id) DO UPDATE SET
+        name = excluded.name,
+        status = excluded.status,
+        camera_type = excluded.camera_type,
+        description = excluded.description,
+        direction = excluded.direction,
+        field_of_view = excluded.field_of_view,
+        geometry = excluded.geometry,
+        content_hash = excluded.content_hash,
+        version = excluded.version,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+# Keeps IN (...) lists below SQLite's host parameter limit
+SQL_IN_BATCH = 500
+
+def _content_hash(values: tuple) -> str:
+    return hashlib.blake2b(repr(values).encode('utf-8'), digest_size=16).hexdigest()
+
+def _fetch_by_keys(cursor, sql: str, keys: List[Any]) -> List[Any]:
+    """Run sql (with a single "{keys}" IN placeholder) over keys in batches"""
+    rows = []
+    for start in range(0, len(keys), SQL_IN_BATCH):
+        batch = keys[start:start + SQL_IN_BATCH]
+        cursor.execute(sql.format(keys=','.join('?' * len(batch))), batch)
+        rows.extend(cursor.fetchall())
+    return rows
+
+def sync_cameras_from_sheets(spreadsheet_id: str, ranges: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Sync camera data from Google Sheets to database.
+
+    Each sheet row is hashed and compared with the content_hash stored for
+    its g_sheet_row_id; only new or changed rows are upserted, and cameras
+    whose rows disappeared from the sheet are deleted. A resync of an
+    unchanged sheet writes nothing and does not bump the dataset version.
+    Several tabs can be synced at once by passing ranges (one batchGet).
+    """
+    with span("sync.read_sheet"):
+        if ranges:
+            sheets = read_sheet_ranges(spreadsheet_id, ranges)
+        else:
+            sheets = {DEFAULT_RANGE: read_sheet_data(spreadsheet_id)}
     
-    if not sheet_data:
+    # A range that failed or came back empty must not delete its cameras
+    sheets = {range_name: rows for range_name, rows in sheets.items() if rows}
+    if not sheets:
         return {"status": "error", "message": "No data retrieved from Google Sheets"}
     
-    added = 0
-    updated = 0
+    sheet_data = [row for rows in sheets.values() for row in rows]
+    
     errors = 0
+    sheet_rows = {}
+    seen_row_ids = set()
     
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        
+    with span("sync.hash_rows"):
         for row in sheet_data:
+            g_sheet_row_id = row.get('g_sheet_row_id')
+            seen_row_ids.add(g_sheet_row_id)
             try:
                 lat, lon = validate_coordinates(
                     row.get('latitude', ''),
                     row.get('longitude', '')
                 )
-                
+            
                 if lat is None or lon is None:
                     errors += 1
                     continue
-                
-                name = row.get('name', 'Unnamed Camera')
-                status = row.get('status', 'Active')
-                camera_type = row.get('type', 'Fixed')
-                description = row.get('description', '')
-                direction = float(row.get('direction', 0) or 0)
-                fov = float(row.get('field_of_view', 90) or 90)
-                g_sheet_row_id = row.get('g_sheet_row_id')
-                
-                # Check if camera exists
-                cursor.execute(
-                    "SELECT id FROM cameras WHERE g_sheet_row_id = ?",
-                    (g_sheet_row_id,)
+            
+                values = (
+                    row.get('name', 'Unnamed Camera'),
+                    row.get('status', 'Active'),
+                    row.get('type', 'Fixed'),
+                    row.get('description', ''),
+                    float(row.get('direction', 0) or 0),
+                    float(row.get('field_of_view', 90) or 90),
+                    lon,
+                    lat
                 )
-                existing = cursor.fetchone()
-                
-                if existing:
-                    # Update existing camera
-                    cursor.execute("""
-                        UPDATE cameras 
-                        SET name = ?, status = ?, camera_type = ?, description = ?,
-                            direction = ?, field_of_view = ?, 
-                            geometry = GeomFromText(?, 4326),
-                            updated_at = CURRENT_TIMESTAMP
-                        WHERE g_sheet_row_id = ?
-                    """, (name, status, camera_type, description, direction, fov,
-                          f'POINT({lon} {lat})', g_sheet_row_id))
-                    updated += 1
-                else:
-                    # Insert new camera
-                    cursor.execute("""
-                        INSERT INTO cameras 
-                        (g_sheet_row_id, name, status, camera_type, description, 
-                         direction, field_of_view, geometry)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, GeomFromText(?, 4326))
-                    """, (g_sheet_row_id, name, status, camera_type, description,
-                          direction, fov, f'POINT({lon} {lat})'))
-                    added += 1
-                
+                sheet_rows[g_sheet_row_id] = (values, _content_hash(values))
             except Exception as e:
                 print(f"Error processing row: {e}")
                 errors += 1
+    
+    changes = []
+    
+    with get_db_writer() as conn, span("sync.write"):
+        cursor = conn.cursor()
+        # Take the write lock before reading the stored hashes, so no other
+        # process can change the rows between the comparison and the upsert
+        cursor.execute("BEGIN IMMEDIATE")
         
-        conn.commit()
+        stored = {}
+        for range_name in sheets:
+            # Range scan over the (g_sheet_row_id, content_hash) index. The
+            # range also holds tabs whose name extends this one ("Kyiv" vs
+            # "Kyiv_2024"), so only ids ending in a bare row number are ours
+            prefix = sheet_row_prefix(spreadsheet_id, range_name)
+            cursor.execute("""
+                SELECT g_sheet_row_id, content_hash FROM cameras
+                WHERE g_sheet_row_id >= ? AND g_sheet_row_id < ?
+            """, (prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)))
+            stored.update(
+                (row[0], row[1]) for row in cursor.fetchall() if row[0][len(prefix):].isdigit()
+            )
+        
+        changed = [
+            (g_sheet_row_id, values, content_hash)
+            for g_sheet_row_id, (values, content_hash) in sheet_rows.items()
+            if stored.get(g_sheet_row_id, None) != content_hash
+        ]
+        changed_existing = [key for key, _, _ in changed if key in stored]
+        removed = [key for key in stored if key not in seen_row_ids]
+        
+        # Bumped before writing so rows and tombstones carry the new version
+        version = bump_dataset_version(cursor) if changed or removed else None
+        
+        old_states = {
+            row['g_sheet_row_id']: row for row in _fetch_by_keys(
+                cursor,
+                f"SELECT id, g_sheet_row_id, version, updated_at, {CAMERA_STATE_COLUMNS} FROM cameras "
+                "WHERE g_sheet_row_id IN ({keys})",
+                changed_existing + removed
+            )
+        }
+        
+        cursor.executemany(UPSERT_SHEET_CAMERA_SQL, [
+            (g_sheet_row_id, *values, content_hash, version)
+            for g_sheet_row_id, values, content_hash in changed
+        ])
+        
+        new_ids = {
+            row['g_sheet_row_id']: row['id'] for row in _fetch_by_keys(
+                cursor,
+                "SELECT id, g_sheet_row_id FROM cameras WHERE g_sheet_row_id IN ({keys})",
+                [key for key, _, _ in changed if key not in stored]
+            )
+        }
+        
+        for g_sheet_row_id, values, _ in changed:
+            name, status, camera_type, description, direction, fov, lon, lat = values
+            new_state = CameraState(lon, lat, status, camera_type, direction, fov)
+            old = old_states.get(g_sheet_row_id)
+            if old is not None:
+                changes.append(CameraChange(old['id'], _camera_state(old), new_state))
+            else:
+                changes.append(CameraChange(new_ids[g_sheet_row_id], None, new_state))
+        
+        record_previous_states(cursor, list(old_states.values()), version)
+        removed_ids = [old_states[key]['id'] for key in removed]
+        cursor.executemany("DELETE FROM cameras WHERE id = ?", [(i,) for i in removed_ids])
+        record_tombstones(cursor, removed_ids, version)
+        changes.extend(
+            CameraChange(old_states[key]['id'], _camera_state(old_states[key]), None)
+            for key in removed
+        )
+        with span("sync.fov_sectors"):
+            refresh_fov_sectors(cursor, changes)
+        with span("sync.grid_stats"):
+            apply_stats_changes(cursor, changes)
+        with span("sync.commit"):
+            conn.commit()
     
+    if version is not None:
+        mark_committed(version)
+    with span("sync.publish"):
+        publish(changes, version)
+    
+    added = sum(1 for key, _, _ in changed if key not in stored)
     return {
         "status": "success",
         "added": added,
-        "updated": updated,
+        "updated": len(changed) - added,
+        "unchanged": len(sheet_rows) - len(changed),
+        "deleted": len(removed),
         "errors": errors
     }
 
+SHEETS_SYNC_WORKERS = int(os.getenv("SHEETS_SYNC_WORKERS", "4"))
+
+# Long-lived, so each worker thread keeps its cached Sheets service
+# between syncs instead of building a new client per call
+_sheets_pool: Optional[ThreadPoolExecutor] = None
+_sheets_pool_lock = threading.Lock()
+
+def _get_sheets_pool() -> ThreadPoolExecutor:
+    global _sheets_pool
+    with _sheets_pool_lock:
+        if _sheets_pool is None:
+            _sheets_pool = ThreadPoolExecutor(
+                max_workers=SHEETS_SYNC_WORKERS, thread_name_prefix="sheets-sync"
+            )
+        return _sheets_pool
+
+def sync_many_spreadsheets(
+    spreadsheet_ids: List[str],
+    ranges: Optional[List[str]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """Sync several spreadsheets on a bounded thread pool.
+
+    Sheets API reads run concurrently; the writes still queue on the single
+    writer connection, so one spreadsheet's fetch overlaps another's write.
+    """
+    pool = _get_sheets_pool()
+    futures = {
+        spreadsheet_id: pool.submit(sync_cameras_from_sheets, spreadsheet_id, ranges)
+        for spreadsheet_id in spreadsheet_ids
+    }
+    results = {}
+    for spreadsheet_id, future in futures.items():
+        try:
+            results[spreadsheet_id] = future.result()
+        except Exception as e:
+            print(f"Error syncing spreadsheet {spreadsheet_id}: {e}")
+            results[spreadsheet_id] = {"status": "error", "message": str(e)}
+    return results
+
+def parse_bbox(bbox) -> Optional[tuple]:
+    """Parse a "min_lon,min_lat,max_lon,max_lat" string (or sequence), None if malformed"""
+    if not bbox:
+        return None
+    if isinstance(bbox, str):
+        bbox = bbox.split(',')
+    try:
+        bbox_parts = [float(x) for x in bbox]
+    except ValueError:
+        return None
+    if len(bbox_parts) != 4:
+        return None
+    return tuple(bbox_parts)
+
+CAMERA_COLUMNS = """
+    id, g_sheet_row_id, name, status, camera_type, description,
+    direction, field_of_view, created_at, updated_at,
+    ST_X(geometry) as longitude, ST_Y(geometry) as latitude
+"""
+
+def build_cameras_query(
+    bbox=None,
+    status: Optional[str] = None,
+    camera_type: Optional[str] = None,
+    columns: str = CAMERA_COLUMNS
+) -> tuple:
+    """Build the camera SELECT and its parameters.
+
+    The bbox filter first selects candidate rowids from the
+    idx_cameras_geometry R*Tree, so SQLite walks the spatial index instead
+    of evaluating ST_Intersects for every row. The R*Tree stores 32-bit
+    rounded boxes, so MbrIntersects re-checks the exact geometry of the
+    (few) candidates.
+    """
+    query = f"""
+        SELECT {columns}
+        FROM cameras
+        WHERE 1=1
+    """
+    params = []
+
+    # Apply bounding box filter through the R*Tree
+    bbox_parts = parse_bbox(bbox)
+    if bbox_parts:
+        min_lon, min_lat, max_lon, max_lat = bbox_parts
+        query += """
+            AND cameras.ROWID IN (
+                SELECT pkid FROM idx_cameras_geometry
+                WHERE xmin <= ? AND xmax >= ? AND ymin <= ? AND ymax >= ?
+            )
+            AND MbrIntersects(geometry, BuildMbr(?, ?, ?, ?, 4326))
+        """
+        params.extend([max_lon, min_lon, max_lat, min_lat])
+        params.extend([min_lon, min_lat, max_lon, max_lat])
+
+    # Apply status filter
+    if status:
+        query += " AND status = ?"
+        params.append(status)
+
+    # Apply type filter
+    if camera_type:
+        query += " AND camera_type = ?"
+        params.append(camera_type)
+
+    return query, params
+
+def explain_cameras_query(
+    bbox: Optional[str] = None,
+    status: Optional[str] = None,
+    camera_type: Optional[str] = None
+) -> List[str]:
+    """Return the EXPLAIN QUERY PLAN details for a camera query"""
+    query, params = build_cameras_query(bbox, status, camera_type)
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("EXPLAIN QUERY PLAN " + query, params)
+        return [row['detail'] for row in cursor.fetchall()]
+
+def check_spatial_index_used(bbox: str = "-180,-90,180,90") -> bool:
+    """Check that bbox queries are planned through the R*Tree.
+
+    The plan must contain a virtual table scan of idx_cameras_geometry and
+    must drive the cameras lookup by primary key rather than a full scan.
+    """
+    plan = explain_cameras_query(bbox=bbox)
+    uses_rtree = any('idx_cameras_geometry' in detail for detail in plan)
+    full_scan = any(
+        detail.startswith('SCAN cameras') or detail.startswith('SCAN TABLE cameras')
+        for detail in plan
+    )
+    return uses_rtree and not full_scan
+
+def _row_to_feature(row) -> Dict[str, Any]:
+    return {
+        "type": "Feature",
+        "geometry": {
+            "type": "Point",
+            "coordinates": [row['longitude'], row['latitude']]
+        },
+        "properties": {
+            "id": row['id'],
+            "name": row['name'],
+            "status": row['status'],
+            "camera_type": row['camera_type'],
+            "description": row['description'],
+            "direction": row['direction'],
+            "field_of_view": row['field_of_view']
+        }
+    }
+
 def get_cameras_geojson(
     bbox: Optional[str] = None,
     status: Optional[str] = None,
     camera_type: Optional[str] = None
 ) -> Dict[str, Any]:
-    """Get cameras as GeoJSON with filtering"""
+    """Get cameras as GeoJSON with filtering.
+
+    With CAMERA_SNAPSHOT_ENABLED=1 the cameras come from the columnar
+    snapshot of the current dataset version when it is ready.
+    """
+    snapshot = snapshot_manager.current(get_dataset_version()) if SNAPSHOT_ENABLED else None
+    if snapshot is not None:
+        with span("cameras.snapshot_query"):
+            positions = snapshot.query(parse_bbox(bbox), status, camera_type)
+        with span("cameras.to_features"):
+            return {"type": "FeatureCollection", "features": snapshot.features(positions)}
+    
     with get_db_connection() as conn:
         cursor = conn.cursor()
         
-        query = """
-            SELECT id, g_sheet_row_id, name, status, camera_type, description,
-                   direction, field_of_view, created_at, updated_at,
-                   ST_X(geometry) as longitude, ST_Y(geometry) as latitude
-            FROM cameras
-            WHERE 1=1
-        """
-        params = []
+        with span("cameras.query"):
+            query, params = build_cameras_query(bbox, status, camera_type)
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
         
-        # Apply bounding box filter
-        if bbox:
-            try:
-                bbox_parts = [float(x) for x in bbox.split(',')]
-                if len(bbox_parts) == 4:
-                    min_lon, min_lat, max_lon, max_lat = bbox_parts
-                    query += """
-                        AND ST_Intersects(
-                            geometry, 
-                            BuildMbr(?, ?, ?, ?, 4326)
-                        )
-                    """
-                    params.extend([min_lon, min_lat, max_lon, max_lat])
-            except:
-                pass
-        
-        # Apply status filter
-        if status:
-            query += " AND status = ?"
-            params.append(status)
-        
-        # Apply type filter
-        if camera_type:
-            query += " AND camera_type = ?"
-            params.append(camera_type)
-        
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        
-        features = []
-        for row in rows:
-            feature = {
-                "type": "Feature",
-                "geometry": {
-                    "type": "Point",
-                    "coordinates": [row['longitude'], row['latitude']]
-                },
-                "properties": {
-                    "id": row['id'],
-                    "name": row['name'],
-                    "status": row['status'],
-                    "camera_type": row['camera_type'],
-                    "description": row['description'],
-                    "direction": row['direction'],
-                    "field_of_view": row['field_of_view']
-                }
-            }
-            features.append(feature)
+        with span("cameras.to_features"):
+            features = [_row_to_feature(row) for row in rows]
         
         return {
             "type": "FeatureCollection",
             "features": features
         }
 
-def import_cameras_from_file(file_data: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """Import cameras from uploaded CSV/XLSX file"""
-    added = 0
-    errors = 0
+STREAM_BATCH_SIZE = 1000
+
+def get_camera_ids(
+    bbox: Optional[str] = None,
+    status: Optional[str] = None,
+    camera_type: Optional[str] = None
+) -> np.ndarray:
+    """Ids of the matching cameras in ascending order, the plan of a stream"""
+    query, params = build_cameras_query(bbox, status, camera_type, columns="id")
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(query + " ORDER BY id", params)
+        return np.fromiter((row[0] for row in cursor), dtype=np.int64)
+
+def encode_camera_features(
+    camera_ids: List[int],
+    status: Optional[str] = None,
+    camera_type: Optional[str] = None
+) -> bytes:
+    """Comma-separated GeoJSON features of one stream batch, b'' if none remain.
+
+    Each batch is its own short read, so a stream holds no pooled connection
+    between batches. Status and type are checked again; cameras deleted since
+    get_camera_ids are left out, and cameras that moved keep their place.
+    """
+    if not camera_ids:
+        return b''
+    query, params = build_cameras_query(None, status, camera_type)
+    rows = []
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        for start in range(0, len(camera_ids), SQL_IN_BATCH):
+            batch = camera_ids[start:start + SQL_IN_BATCH]
+            cursor.execute(query + f" AND id IN ({','.join('?' * len(batch))}) ORDER BY id", params + batch)
+            rows.extend(cursor.fetchall())
+    return ','.join(json.dumps(_row_to_feature(row)) for row in rows).encode('utf-8')
+
+def get_cameras_columnar(
+    bbox: Optional[str] = None,
+    status: Optional[str] = None,
+    camera_type: Optional[str] = None
+) -> bytes:
+    """Get cameras as packed typed arrays (see services.columnar)"""
+    snapshot = snapshot_manager.current(get_dataset_version()) if SNAPSHOT_ENABLED else None
+    if snapshot is not None:
+        with span("cameras.snapshot_query"):
+            rows = snapshot.columnar_rows(snapshot.query(parse_bbox(bbox), status, camera_type))
+        with span("cameras.encode_columns"):
+            return encode_camera_columns(rows)
     
     with get_db_connection() as conn:
         cursor = conn.cursor()
+        # Plain tuples: no sqlite3.Row or dict per camera
+        cursor.row_factory = None
         
-        for row in file_data:
-            try:
-                lat, lon = validate_coordinates(
-                    row.get('latitude', ''),
-                    row.get('longitude', '')
+        with span("cameras.query"):
+            query, params = build_cameras_query(bbox, status, camera_type, columns=COLUMNAR_COLUMNS)
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+        with span("cameras.encode_columns"):
+            return encode_camera_columns(rows)
+
+def get_cameras_delta(
+    since: str,
+    bbox: Optional[str] = None,
+    status: Optional[str] = None,
+    camera_type: Optional[str] = None
+) -> Dict[str, Any]:
+    """Cameras written since a dataset version or timestamp, plus deleted ids.
+
+    Version deltas use the cameras.version and camera_tombstones.version
+    indexes, timestamp deltas updated_at and deleted_at (second resolution,
+    so the boundary second is included again). With filters, "deleted" only
+    lists cameras that matched them at since and no longer do (or are gone),
+    judged by the state logged before each camera's latest change. When the
+    logs cannot answer (since predates them, a version newer than the
+    dataset, or a filtered-out camera changed more than once since) the
+    response has reset=true and carries every matching camera instead.
+    Everything is read from one snapshot; "version" is the next since.
+    """
+    since_version, since_time, since_epoch = parse_since(since)
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        # One read transaction: rows, tombstones and version from the same snapshot
+        cursor.execute("BEGIN")
+        version = read_meta(cursor, 'version')
+        if since_version is not None:
+            reset = since_version < read_meta(cursor, 'tombstone_floor') or since_version > version
+            changed_sql, changed_param = "version > ?", since_version
+            deleted_sql = "SELECT camera_id FROM camera_tombstones WHERE version > ?"
+        else:
+            reset = since_epoch < read_meta(cursor, 'tombstone_floor_at')
+            changed_sql, changed_param = "updated_at >= ?", since_time
+            deleted_sql = "SELECT camera_id FROM camera_tombstones WHERE deleted_at >= ?"
+
+        query, params = build_cameras_query(bbox, status, camera_type)
+        if not reset:
+            cursor.execute(f"{query} AND {changed_sql}", params + [changed_param])
+            features = [_row_to_feature(row) for row in cursor.fetchall()]
+
+        deleted = []
+        if not reset:
+            cursor.execute(deleted_sql, (changed_param,))
+            deleted = [row[0] for row in cursor.fetchall()]
+            if bbox or status or camera_type:
+                matched = {feature['properties']['id'] for feature in features}
+                deleted = _left_view(
+                    cursor, deleted, matched, changed_sql, changed_param,
+                    since_version, since_time, parse_bbox(bbox), status, camera_type
                 )
-                
-                if lat is None or lon is None:
-                    errors += 1
-                    continue
-                
-                cursor.execute("""
-                    INSERT INTO cameras 
-                    (name, status, camera_type, description, direction, field_of_view, geometry)
-                    VALUES (?, ?, ?, ?, ?, ?, GeomFromText(?, 4326))
-                """, (
-                    row.get('name', 'Unnamed Camera'),
-                    row.get('status', 'Active'),
-                    row.get('type', 'Fixed'),
-                    row.get('description', ''),
-                    float(row.get('direction', 0) or 0),
-                    float(row.get('field_of_view', 90) or 90),
-                    f'POINT({lon} {lat})'
-                ))
-                added += 1
-                
-            except Exception as e:
-                print(f"Error importing row: {e}")
-                errors += 1
+                reset = deleted is None
+                deleted = deleted or []
+
+        if reset:
+            cursor.execute(query, params)
+            features = [_row_to_feature(row) for row in cursor.fetchall()]
+
+    return {
+        "type": "FeatureCollection",
+        "features": features,
+        "deleted": deleted,
+        "version": version,
+        "reset": reset
+    }
+
+def _left_view(
+    cursor, deleted: List[int], matched: set, changed_sql: str, changed_param: Any,
+    since_version: Optional[int], since_time: Optional[str],
+    bbox: Optional[tuple], status: Optional[str], camera_type: Optional[str]
+) -> Optional[List[int]]:
+    """Deleted or changed cameras that matched the filters at since but do not now.
+
+    Returns None when a candidate's state at since is unknown, i.e. its
+    logged previous state is itself newer than since.
+    """
+    cursor.execute(f"SELECT id FROM cameras WHERE {changed_sql}", (changed_param,))
+    tombstoned = set(deleted)
+    candidates = deleted + [row[0] for row in cursor.fetchall() if row[0] not in matched]
+    previous = {
+        row['camera_id']: row for row in _fetch_by_keys(
+            cursor,
+            "SELECT camera_id, state_version, state_updated_at, longitude, latitude, status, camera_type "
+            "FROM camera_previous_states WHERE camera_id IN ({keys})",
+            candidates
+        )
+    }
+
+    left = []
+    for camera_id in candidates:
+        state = previous.get(camera_id)
+        if state is None:
+            if camera_id in tombstoned:
+                return None
+            # Never updated, so inserted since: the client never had it
+            continue
+        if since_version is not None:
+            known = state['state_version'] <= since_version
+        else:
+            known = state['state_updated_at'] is not None and state['state_updated_at'] < since_time
+        if not known:
+            return None
+        if status and state['status'] != status:
+            continue
+        if camera_type and state['camera_type'] != camera_type:
+            continue
+        if bbox:
+            min_lon, min_lat, max_lon, max_lat = bbox
+            if state['longitude'] is None or not (
+                min_lon <= state['longitude'] <= max_lon and min_lat <= state['latitude'] <= max_lat
+            ):
+                continue
+        left.append(camera_id)
+    return left
+
+def _ensure_cluster_index() -> None:
+    """(Re)build the cluster index when it lags behind the dataset version"""
+    version = get_dataset_version()
+    if cluster_index.built and cluster_index.version == version:
+        return
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+        cursor.execute("SELECT value FROM dataset_meta WHERE key = 'version'")
+        version = cursor.fetchone()[0]
+        cursor.execute(f"SELECT {CAMERA_STATE_COLUMNS} FROM cameras WHERE geometry IS NOT NULL")
+        cluster_index.build((_camera_state(row) for row in cursor), version)
+        conn.rollback()
+
+def get_camera_clusters(
+    zoom: float,
+    bbox: Optional[str] = None,
+    status: Optional[str] = None,
+    camera_type: Optional[str] = None
+) -> Dict[str, Any]:
+    """Get grid clusters for a zoom level as GeoJSON with filtering"""
+    _ensure_cluster_index()
+    clusters = cluster_index.query(zoom, parse_bbox(bbox), status, camera_type)
+    
+    features = []
+    for cluster in clusters:
+        feature = {
+            "type": "Feature",
+            "geometry": {
+                "type": "Point",
+                "coordinates": [cluster['longitude'], cluster['latitude']]
+            },
+            "properties": {
+                "cluster": True,
+                "cell": cluster['cell'],
+                "point_count": cluster['count'],
+                "status_counts": cluster['status_counts'],
+                "camera_type_counts": cluster['camera_type_counts']
+            }
+        }
+        features.append(feature)
+    
+    return {
+        "type": "FeatureCollection",
+        "features": features
+    }
+
+def get_camera_stats(
+    bbox: Optional[str] = None,
+    zoom: Optional[float] = None,
+    status: Optional[str] = None,
+    camera_type: Optional[str] = None
+) -> Dict[str, Any]:
+    """Camera counts by status and type plus a density grid over bbox.
+
+    Read from camera_grid_stats (see services/camera_stats.py), never from
+    the cameras table: the work depends on the number of grid cells, which
+    select_level caps, not on the number of cameras. Counts cover the whole
+    cells touching bbox; "bounds" is the area they actually span.
+
+    There are no per-district aggregates: cameras carry no district or
+    region column, and neither Sheets nor file imports supply one, so a
+    district's counts are read through its bbox instead.
+    """
+    level, (min_x, min_y, max_x, max_y) = select_level(parse_bbox(bbox), zoom)
+    xs = list(range(min_x, max_x + 1))
+    # IN on cell_x keeps every probe a primary key range seek over cell_y
+    query = f"""
+        SELECT cell_x, cell_y, status, camera_type, count FROM camera_grid_stats
+        WHERE level = ? AND cell_x IN ({','.join('?' * len(xs))}) AND cell_y BETWEEN ? AND ?
+    """
+    params: List[Any] = [level, *xs, min_y, max_y]
+    if status:
+        query += " AND status = ?"
+        params.append(status)
+    if camera_type:
+        query += " AND camera_type = ?"
+        params.append(camera_type)
+    
+    with get_db_connection() as conn:
+        rows = conn.execute(query, params).fetchall() if xs else []
+    
+    status_counts: Dict[str, int] = {}
+    camera_type_counts: Dict[str, int] = {}
+    combo_counts: Dict[tuple, int] = {}
+    cell_counts: Dict[tuple, int] = {}
+    for cell_x, cell_y, row_status, row_type, count in rows:
+        status_counts[row_status] = status_counts.get(row_status, 0) + count
+        camera_type_counts[row_type] = camera_type_counts.get(row_type, 0) + count
+        combo_counts[(row_status, row_type)] = combo_counts.get((row_status, row_type), 0) + count
+        cell_counts[(cell_x, cell_y)] = cell_counts.get((cell_x, cell_y), 0) + count
+    
+    cells = []
+    for (cell_x, cell_y), count in sorted(cell_counts.items()):
+        lon, lat = cell_center(level, cell_x, cell_y)
+        cells.append({"x": cell_x, "y": cell_y, "longitude": lon, "latitude": lat, "count": count})
+    west, north = cell_center(level, min_x - 0.5, min_y - 0.5)
+    east, south = cell_center(level, max_x + 0.5, max_y + 0.5)
+    
+    return {
+        "level": level,
+        "bounds": [west, south, east, north],
+        "total": sum(status_counts.values()),
+        "status_counts": status_counts,
+        "camera_type_counts": camera_type_counts,
+        "status_type_counts": [
+            {"status": key[0], "camera_type": key[1], "count": count}
+            for key, count in sorted(combo_counts.items())
+        ],
+        "cells": cells
+    }
+
+def _ensure_nearest_index() -> None:
+    """(Re)build the nearest-camera tree when it lags behind the dataset version"""
+    version = get_dataset_version()
+    if nearest_index.built and nearest_index.version == version:
+        return
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+        cursor.execute("SELECT value FROM dataset_meta WHERE key = 'version'")
+        version = cursor.fetchone()[0]
+        cursor.execute("""
+            SELECT id, ST_X(geometry), ST_Y(geometry), status
+            FROM cameras WHERE geometry IS NOT NULL
+        """)
+        nearest_index.build(cursor, version)
+        conn.rollback()
+
+def get_nearest_cameras_batch(
+    points: List[tuple],
+    k: int,
+    status: Optional[str] = None,
+    max_distance_m: Optional[float] = None
+) -> List[Dict[str, Any]]:
+    """The k nearest cameras to each (lon, lat) point, one GeoJSON collection per point.
+
+    Features are ordered nearest first and carry the exact great-circle
+    distance_m; camera rows for all points are fetched in one pass.
+    """
+    _ensure_nearest_index()
+    matches = [
+        nearest_index.query(lon, lat, k, status, max_distance_m) for lon, lat in points
+    ]
+    
+    with get_db_connection() as conn:
+        rows = _fetch_by_keys(
+            conn.cursor(),
+            f"SELECT {CAMERA_COLUMNS} FROM cameras WHERE id IN ({{keys}})",
+            sorted({camera_id for found in matches for camera_id, _ in found})
+        )
+    rows_by_id = {row['id']: row for row in rows}
+    
+    collections = []
+    for found in matches:
+        features = []
+        for camera_id, distance in found:
+            row = rows_by_id.get(camera_id)
+            if row is None:
+                # Deleted by another process since the index was patched
+                continue
+            feature = _row_to_feature(row)
+            feature['properties']['distance_m'] = round(distance, 2)
+            features.append(feature)
+        collections.append({"type": "FeatureCollection", "features": features})
+    return collections
+
+def get_nearest_cameras(
+    longitude: float,
+    latitude: float,
+    k: int,
+    status: Optional[str] = None,
+    max_distance_m: Optional[float] = None
+) -> Dict[str, Any]:
+    """The k nearest cameras to a point as GeoJSON, nearest first"""
+    return get_nearest_cameras_batch([(longitude, latitude)], k, status, max_distance_m)[0]
+
+# Rows per executemany call during file imports
+IMPORT_BATCH_SIZE = int(os.getenv("CAMERA_IMPORT_BATCH_SIZE", "5000"))
+# The R*Tree is dropped before the insert and rebuilt once afterwards,
+# instead of being updated by a trigger for every row, when an import has at
+# least this many rows and at least RATIO times the rows already stored: the
+# rebuild re-indexes the whole table, the triggers only the new rows
+SPATIAL_INDEX_REBUILD_ROWS = int(os.getenv("CAMERA_SPATIAL_INDEX_REBUILD_ROWS", "50000"))
+SPATIAL_INDEX_REBUILD_RATIO = float(os.getenv("CAMERA_SPATIAL_INDEX_REBUILD_RATIO", "0.5"))
+
+def get_covering_cameras(
+    longitude: float,
+    latitude: float,
+    status: Optional[str] = None
+) -> Dict[str, Any]:
+    """Cameras whose field of view contains the point, as GeoJSON.
+
+    The idx_camera_fov_geometry R*Tree narrows the search to sectors whose
+    bbox contains the point; the exact distance/angle test then runs over
+    those candidates as NumPy arrays. Features carry distance_m and bearing
+    (from the camera to the point). Sectors of cameras next to the
+    antimeridian extend past +/-180, so the point is also probed shifted by
+    a full turn.
+    """
+    probe = """
+        SELECT pkid FROM idx_camera_fov_geometry
+        WHERE xmin <= ? AND xmax >= ? AND ymin <= ? AND ymax >= ?
+    """
+    params = []
+    for shifted in (longitude, longitude - 360.0, longitude + 360.0):
+        params.extend([shifted, shifted, latitude, latitude])
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT camera_id, longitude, latitude, direction, field_of_view, range_m
+            FROM camera_fov
+            WHERE camera_id IN ({probe} UNION {probe} UNION {probe})
+        """, params)
+        candidates = cursor.fetchall()
+        if not candidates:
+            return {"type": "FeatureCollection", "features": []}
+        
+        columns = np.array([tuple(row) for row in candidates], dtype=float)
+        mask, distance, bearing = covering_mask(longitude, latitude, *columns[:, 1:].T)
+        covered = {
+            int(camera_id): (round(float(d), 2), round(float(b), 2))
+            for camera_id, d, b in zip(columns[mask, 0], distance[mask], bearing[mask])
+        }
+        
+        rows = _fetch_by_keys(
+            cursor, f"SELECT {CAMERA_COLUMNS} FROM cameras WHERE id IN ({{keys}})", list(covered)
+        )
+    
+    features = []
+    for row in sorted(rows, key=lambda row: covered[row['id']][0]):
+        if status and row['status'] != status:
+            continue
+        feature = _row_to_feature(row)
+        feature['properties']['distance_m'], feature['properties']['bearing'] = covered[row['id']]
+        features.append(feature)
+    return {"type": "FeatureCollection", "features": features}
+
+INSERT_CAMERA_SQL = """
+    INSERT INTO cameras 
+    (name, status, camera_type, description, direction, field_of_view, geometry, version)
+    VALUES (?, ?, ?, ?, ?, ?, MakePoint(?, ?, 4326), ?)
+"""
+
+def import_cameras_from_file(
+    file_data,
+    row_offset: int = 0,
+    rebuild_spatial_index: Optional[bool] = None,
+    before_commit: Optional[Callable[[Any, int, int], None]] = None
+) -> Dict[str, Any]:
+    """Import cameras from uploaded CSV/XLSX file.
+
+    file_data is a DataFrame (or a list of row dicts). Validation runs
+    column-wise, geometry is built with MakePoint and rows are inserted with
+    executemany batches inside a single transaction. rebuild_spatial_index
+    defaults to rebuilding the R*Tree for imports of at least
+    SPATIAL_INDEX_REBUILD_ROWS rows that are also large next to the table
+    (SPATIAL_INDEX_REBUILD_RATIO). before_commit(cursor, added, errors)
+    runs inside that transaction, e.g. to checkpoint job progress.
+    """
+    # pandas is loaded by the first import, not by every worker at startup
+    import pandas as pd
+    from services.camera_frames import prepare_camera_frame
+    
+    with span("import.prepare"):
+        if not isinstance(file_data, pd.DataFrame):
+            file_data = pd.DataFrame.from_records(list(file_data))
+        
+        frame, errors, error_details = prepare_camera_frame(file_data, row_offset)
+        columns = [
+            frame[column].tolist() for column in (
+                'name', 'status', 'camera_type', 'description',
+                'direction', 'field_of_view', 'longitude', 'latitude'
+            )
+        ]
+        rows = list(zip(*columns))
+    camera_ids: List[int] = []
+    
+    with get_db_writer() as conn:
+        cursor = conn.cursor()
+        version = bump_dataset_version(cursor) if rows else None
+        
+        rebuild_index = rebuild_spatial_index
+        if rebuild_index is None:
+            rebuild_index = len(rows) >= SPATIAL_INDEX_REBUILD_ROWS
+            if rebuild_index:
+                cursor.execute("SELECT COUNT(*) FROM cameras")
+                rebuild_index = len(rows) >= cursor.fetchone()[0] * SPATIAL_INDEX_REBUILD_RATIO
+        if rebuild_index:
+            cursor.execute("SELECT DisableSpatialIndex('cameras', 'geometry')")
+            cursor.execute("DROP TABLE IF EXISTS idx_cameras_geometry")
+        
+        with span("import.insert"):
+            for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+                batch = rows[start:start + IMPORT_BATCH_SIZE]
+                cursor.executemany(INSERT_CAMERA_SQL, [row + (version,) for row in batch])
+                # AUTOINCREMENT ids are consecutive while we hold the write lock
+                cursor.execute("SELECT last_insert_rowid()")
+                last_id = cursor.fetchone()[0]
+                camera_ids.extend(range(last_id - len(batch) + 1, last_id + 1))
+        
+        if rebuild_index:
+            with span("import.spatial_index"):
+                cursor.execute("SELECT CreateSpatialIndex('cameras', 'geometry')")
         
-        conn.commit()
+        changes = [
+            CameraChange(camera_id, None, CameraState(lon, lat, status, camera_type, direction, fov))
+            for camera_id, (_, status, camera_type, _, direction, fov, lon, lat)
+            in zip(camera_ids, rows)
+        ]
+        with span("import.fov_sectors"):
+            refresh_fov_sectors(cursor, changes)
+        with span("import.grid_stats"):
+            apply_stats_changes(cursor, changes)
+        
+        if before_commit is not None:
+            before_commit(cursor, len(rows), errors)
+        
+        with span("import.commit"):
+            conn.commit()
+    
+    if version is not None:
+        mark_committed(version)
+    with span("import.publish"):
+        publish(changes, version)
+    
+    return {
+        "status": "success",
+        "added": len(rows),
+        "errors": errors,
+        "error_details": error_details
+    }
+
+def get_camera_tile(z: int, x: int, y: int, version: int) -> bytes:
+    """Get a Mapbox Vector Tile with the cameras inside tile z/x/y.
+
+    version is the dataset version the caller's ETag was built from; cached
+    tiles of other versions are not served.
+    """
+    key = (z, x, y)
+    tile = tile_cache.get(key, version)
+    if tile is not None:
+        return tile
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        query, params = build_cameras_query(bbox=tile_bounds(z, x, y, BUFFER))
+        cursor.execute(query, params)
+        features = (
+            {
+                "id": row['id'],
+                "longitude": row['longitude'],
+                "latitude": row['latitude'],
+                "properties": {
+                    "status": row['status'],
+                    "camera_type": row['camera_type'],
+                    "direction": row['direction'],
+                    "field_of_view": row['field_of_view']
+                }
+            }
+            for row in cursor
+        )
+        tile = encode_point_layer("cameras", z, x, y, features)
     
-    return {"status": "success", "added": added, "errors": errors}
+    tile_cache.put(key, tile, version)
+    return tile
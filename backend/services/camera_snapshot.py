@@ -0,0 +1,400 @@
+import importlib.util
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import database
+from database import get_db_connection
+
+# Serve get_cameras_geojson/get_cameras_columnar from a memory-mapped
+# columnar snapshot instead of SQLite. Builds are serialised across workers
+# with a file lock (fcntl on POSIX, msvcrt on Windows); without either the
+# feature stays off
+_HAS_FILE_LOCK = any(importlib.util.find_spec(name) for name in ("fcntl", "msvcrt"))
+SNAPSHOT_ENABLED = os.getenv("CAMERA_SNAPSHOT_ENABLED", "0") == "1" and _HAS_FILE_LOCK
+# Shared by every worker of one database; defaults to <database>-snapshots
+SNAPSHOT_DIR = os.getenv("CAMERA_SNAPSHOT_DIR")
+# Side of a grid index cell in degrees
+SNAPSHOT_CELL_DEGREES = float(os.getenv("CAMERA_SNAPSHOT_CELL_DEGREES", "0.01"))
+
+MAGIC = b"CSNP"
+FORMAT_VERSION = 1
+ALIGNMENT = 8
+_HEADER_LENGTH = struct.Struct('<I')
+
+SNAPSHOT_COLUMNS = """
+    id, name, status, camera_type, description, direction, field_of_view,
+    ST_X(geometry), ST_Y(geometry)
+"""
+
+def snapshot_dir() -> str:
+    return SNAPSHOT_DIR or f"{database.DATABASE_PATH}-snapshots"
+
+def snapshot_path(version: int) -> str:
+    return os.path.join(snapshot_dir(), f"cameras-{version}.snap")
+
+@contextmanager
+def _build_lock(path: str):
+    """Non-blocking exclusive lock on path; yields False if another process holds it"""
+    with open(path, "w") as lock:
+        try:
+            import fcntl
+        except ImportError:
+            import msvcrt
+            # msvcrt locks a byte range; the lock is on the first byte
+            try:
+                msvcrt.locking(lock.fileno(), msvcrt.LK_NBLCK, 1)
+            except OSError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+            return
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        yield True
+
+def _pad(size: int) -> int:
+    return (-size) % ALIGNMENT
+
+def _encode_strings(values: List[Optional[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """UTF-8 blob plus n + 1 offsets; None is stored as an empty string"""
+    encoded = [(value or "").encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype='<i8')
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+def _dictionary_encode(values: List[str]) -> Tuple[List[str], np.ndarray]:
+    labels, codes = np.unique(np.asarray(values, dtype=object).astype(str), return_inverse=True)
+    return labels.tolist(), codes.astype('<u2')
+
+def _grid_shape(cell_degrees: float) -> Tuple[int, int]:
+    return int(np.ceil(360.0 / cell_degrees)), int(np.ceil(180.0 / cell_degrees))
+
+def _cell_columns(longitude: np.ndarray, cell_degrees: float, size: int) -> np.ndarray:
+    return np.clip(np.floor((longitude + 180.0) / cell_degrees), 0, size - 1).astype(np.int64)
+
+def _cell_rows(latitude: np.ndarray, cell_degrees: float, size: int) -> np.ndarray:
+    return np.clip(np.floor((latitude + 90.0) / cell_degrees), 0, size - 1).astype(np.int64)
+
+def write_snapshot(rows: List[tuple], version: int, path: str,
+                   cell_degrees: float = SNAPSHOT_CELL_DEGREES) -> None:
+    """Write SNAPSHOT_COLUMNS rows as a snapshot file, atomically.
+
+    Layout: MAGIC, uint32 LE header length, JSON header padded to 8 bytes,
+    then little-endian arrays on 8 byte boundaries. Rows are sorted by grid
+    cell key (column * grid rows + row), so every run of cells within one
+    column is one contiguous slice; cameras without geometry sort last.
+    The file is written next to path and renamed over it, so readers only
+    ever open complete snapshots.
+    """
+    count = len(rows)
+    if count:
+        ids, names, statuses, types, descriptions, directions, fovs, lons, lats = zip(*rows)
+    else:
+        ids = names = statuses = types = descriptions = directions = fovs = lons = lats = ()
+
+    longitude = np.array(lons, dtype=float).reshape(-1)
+    latitude = np.array(lats, dtype=float).reshape(-1)
+    columns, grid_rows = _grid_shape(cell_degrees)
+    located = np.isfinite(longitude) & np.isfinite(latitude)
+    keys = np.full(count, np.iinfo(np.int64).max, dtype=np.int64)
+    keys[located] = (
+        _cell_columns(longitude[located], cell_degrees, columns) * grid_rows
+        + _cell_rows(latitude[located], cell_degrees, grid_rows)
+    )
+    ids = np.array(ids, dtype='<i8').reshape(-1)
+    order = np.lexsort((ids, keys))
+
+    def take(values):
+        return [values[i] for i in order.tolist()]
+
+    status_labels, status_codes = _dictionary_encode(take(statuses))
+    type_labels, type_codes = _dictionary_encode(take(types))
+    name_offsets, name_data = _encode_strings(take(names))
+    description_offsets, description_data = _encode_strings(take(descriptions))
+    arrays = {
+        "cell_keys": keys[order],
+        "ids": ids[order],
+        "longitude": longitude[order].astype('<f8'),
+        "latitude": latitude[order].astype('<f8'),
+        # NULL is NaN
+        "direction": np.array(directions, dtype=float).reshape(-1)[order].astype('<f8'),
+        "field_of_view": np.array(fovs, dtype=float).reshape(-1)[order].astype('<f8'),
+        "status": status_codes,
+        "camera_type": type_codes,
+        "name_offsets": name_offsets,
+        "name_data": name_data,
+        "description_null": np.array([value is None for value in take(descriptions)], dtype=np.uint8),
+        "description_offsets": description_offsets,
+        "description_data": description_data,
+    }
+
+    def build_header(offsets: Dict[str, int]) -> bytes:
+        header = {
+            "format": FORMAT_VERSION,
+            "version": version,
+            "count": count,
+            "cell_degrees": cell_degrees,
+            "status_labels": status_labels,
+            "type_labels": type_labels,
+            "arrays": {
+                name: {"dtype": array.dtype.str, "offset": offsets[name], "length": len(array)}
+                for name, array in arrays.items()
+            },
+        }
+        encoded = json.dumps(header).encode('utf-8')
+        return encoded + b" " * _pad(len(MAGIC) + _HEADER_LENGTH.size + len(encoded))
+
+    # Offsets depend on the header length, which depends on the offsets'
+    # digits; a second pass with the first pass's length settles it
+    offsets = {name: 0 for name in arrays}
+    for _ in range(2):
+        position = len(MAGIC) + _HEADER_LENGTH.size + len(build_header(offsets))
+        for name, array in arrays.items():
+            offsets[name] = position
+            position += array.nbytes + _pad(array.nbytes)
+    header = build_header(offsets)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC + _HEADER_LENGTH.pack(len(header)) + header)
+        for array in arrays.values():
+            f.write(array.tobytes())
+            f.write(b"\0" * _pad(array.nbytes))
+    os.replace(temporary, path)
+
+class CameraSnapshot:
+    """Read-only view of one snapshot file.
+
+    Every column is a NumPy array over a shared read-only mmap, so all
+    workers serving the same version share one copy in the page cache.
+    Queries select candidate rows through the grid index (one searchsorted
+    range per grid column of the bbox) and filter them with vectorized masks.
+    """
+
+    __slots__ = (
+        "version", "count", "cell_degrees", "status_labels", "type_labels", "_mmap", "_offsets",
+        "_status_codes", "_type_codes", "cell_keys", "ids", "longitude", "latitude",
+        "direction", "field_of_view", "status", "camera_type", "name_offsets", "name_data",
+        "description_null", "description_offsets", "description_data"
+    )
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a camera snapshot")
+        start = len(MAGIC) + _HEADER_LENGTH.size
+        (length,) = _HEADER_LENGTH.unpack(self._mmap[len(MAGIC):start])
+        header = json.loads(self._mmap[start:start + length])
+        if header["format"] != FORMAT_VERSION:
+            raise ValueError(f"{path} has snapshot format {header['format']}")
+
+        self.version = header["version"]
+        self.count = header["count"]
+        self.cell_degrees = header["cell_degrees"]
+        self.status_labels = header["status_labels"]
+        self.type_labels = header["type_labels"]
+        self._status_codes = {label: code for code, label in enumerate(self.status_labels)}
+        self._type_codes = {label: code for code, label in enumerate(self.type_labels)}
+        self._offsets = {name: spec["offset"] for name, spec in header["arrays"].items()}
+        for name, spec in header["arrays"].items():
+            setattr(self, name, np.frombuffer(
+                self._mmap, dtype=np.dtype(spec["dtype"]), count=spec["length"], offset=spec["offset"]
+            ))
+
+    def query(
+        self,
+        bbox: Optional[tuple] = None,
+        status: Optional[str] = None,
+        camera_type: Optional[str] = None
+    ) -> np.ndarray:
+        """Row positions of the matching cameras, ordered by camera id"""
+        if bbox is None:
+            positions = np.arange(self.count)
+        else:
+            min_lon, min_lat, max_lon, max_lat = bbox
+            if min_lon > max_lon or min_lat > max_lat:
+                return np.empty(0, dtype=np.int64)
+            columns, grid_rows = _grid_shape(self.cell_degrees)
+            column_range = _cell_columns(np.array([min_lon, max_lon]), self.cell_degrees, columns)
+            row_range = _cell_rows(np.array([min_lat, max_lat]), self.cell_degrees, grid_rows)
+            column = np.arange(column_range[0], column_range[1] + 1) * grid_rows
+            lo = np.searchsorted(self.cell_keys, column + row_range[0], side="left")
+            hi = np.searchsorted(self.cell_keys, column + row_range[1], side="right")
+            lengths = hi - lo
+            # Concatenated aranges lo[i]:hi[i], without a Python loop
+            positions = np.repeat(lo - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            lon, lat = self.longitude[positions], self.latitude[positions]
+            positions = positions[(lon >= min_lon) & (lon <= max_lon) & (lat >= min_lat) & (lat <= max_lat)]
+
+        for value, codes, column_codes in (
+            (status, self._status_codes, self.status),
+            (camera_type, self._type_codes, self.camera_type),
+        ):
+            if value:
+                code = codes.get(value)
+                if code is None:
+                    return np.empty(0, dtype=np.int64)
+                positions = positions[column_codes[positions] == code]
+        return positions[np.argsort(self.ids[positions], kind="stable")]
+
+    def _strings(self, column: str, positions: np.ndarray) -> List[str]:
+        """Decode a string column straight from the mmap (slices of it are bytes)"""
+        offsets = getattr(self, f"{column}_offsets")
+        base = self._offsets[f"{column}_data"]
+        starts = (offsets[positions] + base).tolist()
+        ends = (offsets[positions + 1] + base).tolist()
+        view = self._mmap
+        return [view[start:end].decode('utf-8') for start, end in zip(starts, ends)]
+
+    def _floats(self, column: np.ndarray, positions: np.ndarray) -> List[Optional[float]]:
+        return [None if value != value else value for value in column[positions].tolist()]
+
+    def features(self, positions: np.ndarray) -> List[Dict[str, Any]]:
+        """GeoJSON features in the same shape as camera_service._row_to_feature"""
+        names = self._strings("name", positions)
+        descriptions = self._strings("description", positions)
+        description_null = self.description_null[positions].tolist()
+        statuses = [self.status_labels[code] for code in self.status[positions].tolist()]
+        types = [self.type_labels[code] for code in self.camera_type[positions].tolist()]
+        return [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [lon, lat]},
+                "properties": {
+                    "id": camera_id,
+                    "name": name,
+                    "status": status,
+                    "camera_type": camera_type,
+                    "description": None if null else description,
+                    "direction": direction,
+                    "field_of_view": field_of_view
+                }
+            }
+            for camera_id, lon, lat, name, status, camera_type, description, null, direction, field_of_view
+            in zip(
+                self.ids[positions].tolist(),
+                self._floats(self.longitude, positions), self._floats(self.latitude, positions),
+                names, statuses, types, descriptions, description_null,
+                self._floats(self.direction, positions), self._floats(self.field_of_view, positions)
+            )
+        ]
+
+    def columnar_rows(self, positions: np.ndarray) -> List[tuple]:
+        """Rows in the column order of services.columnar.COLUMNS"""
+        return list(zip(
+            self.ids[positions].tolist(),
+            self._floats(self.longitude, positions), self._floats(self.latitude, positions),
+            self._floats(self.direction, positions), self._floats(self.field_of_view, positions),
+            [self.status_labels[code] for code in self.status[positions].tolist()],
+            [self.type_labels[code] for code in self.camera_type[positions].tolist()]
+        ))
+
+class SnapshotManager:
+    """Keeps the snapshot of the current dataset version.
+
+    current(version) returns the snapshot for exactly that version or None,
+    in which case callers read SQLite; it never serves older data. A missing
+    version is opened from disk if another worker already wrote it, otherwise
+    built in a background thread. A cross-process file lock lets one worker build
+    while the others keep falling back. The swap is a single reference
+    assignment, so requests still holding the previous snapshot finish on it.
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[CameraSnapshot] = None
+        self._lock = threading.Lock()
+        self._building = False
+
+    @property
+    def version(self) -> Optional[int]:
+        snapshot = self._snapshot
+        return snapshot.version if snapshot is not None else None
+
+    def current(self, version: int) -> Optional[CameraSnapshot]:
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        if self._open(version):
+            return self._snapshot
+        self.schedule(version)
+        return None
+
+    def _open(self, version: int) -> bool:
+        path = snapshot_path(version)
+        if not os.path.exists(path):
+            return False
+        try:
+            snapshot = CameraSnapshot(path)
+        except (OSError, ValueError) as e:
+            print(f"Error opening camera snapshot {path}: {e}")
+            return False
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version < snapshot.version:
+                self._snapshot = snapshot
+        return True
+
+    def schedule(self, version: int) -> None:
+        """Build the snapshot of version in the background unless one is underway"""
+        with self._lock:
+            if self._building or self.version == version:
+                return
+            self._building = True
+        threading.Thread(target=self._build, name="camera-snapshot", daemon=True).start()
+
+    def _build(self) -> None:
+        try:
+            os.makedirs(snapshot_dir(), exist_ok=True)
+            with _build_lock(os.path.join(snapshot_dir(), "build.lock")) as acquired:
+                if not acquired:
+                    # Another worker is building; its file is picked up by current()
+                    return
+                with get_db_connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.row_factory = None
+                    # Rows and version from one read snapshot
+                    cursor.execute("BEGIN")
+                    cursor.execute("SELECT value FROM dataset_meta WHERE key = 'version'")
+                    version = cursor.fetchone()[0]
+                    if not os.path.exists(snapshot_path(version)):
+                        cursor.execute(f"SELECT {SNAPSHOT_COLUMNS} FROM cameras")
+                        write_snapshot(cursor.fetchall(), version, snapshot_path(version))
+                    conn.rollback()
+                self._open(version)
+                self._prune(version)
+        except Exception as e:
+            print(f"Error building camera snapshot: {e}")
+        finally:
+            with self._lock:
+                self._building = False
+
+    def _prune(self, version: int) -> None:
+        """Delete snapshots older than the previous version; open mmaps stay valid"""
+        for name in os.listdir(snapshot_dir()):
+            if not (name.startswith("cameras-") and name.endswith(".snap")):
+                continue
+            try:
+                if int(name[len("cameras-"):-len(".snap")]) < version - 1:
+                    os.remove(os.path.join(snapshot_dir(), name))
+            except (ValueError, OSError):
+                continue
+
+snapshot_manager = SnapshotManager()
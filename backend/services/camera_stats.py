@@ -0,0 +1,172 @@
+import os
+import sys
+import zlib
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from database import get_db_writer
+from services.camera_events import CameraChange, CameraState
+from services.vector_tiles import MAX_LATITUDE
+
+# Web Mercator tile zooms at which camera counts are kept; level 0 (one
+# cell for the whole world) is always included and holds the totals
+STATS_LEVELS_SPEC = os.getenv("CAMERA_STATS_LEVELS", "0,2,4,6,8,10,12,14,16")
+# A zoom z view is summarised with cells about 2**STATS_DETAIL per tile side
+STATS_DETAIL = int(os.getenv("CAMERA_STATS_DETAIL", "4"))
+# Most grid cells read for one request; larger regions use a coarser level
+STATS_MAX_CELLS = int(os.getenv("CAMERA_STATS_MAX_CELLS", "4096"))
+
+# Cell keys pack x and y into one int64 next to a status/type code
+MAX_STATS_LEVEL = 20
+INSERT_BATCH_SIZE = 5000
+
+def _parse_levels(spec: str) -> List[int]:
+    levels = {0}
+    for item in spec.split(','):
+        if item.strip():
+            levels.add(min(max(int(item), 0), MAX_STATS_LEVEL))
+    return sorted(levels)
+
+STATS_LEVELS = _parse_levels(STATS_LEVELS_SPEC)
+
+def stats_config_key() -> int:
+    """Fingerprint of the grid levels; stored counts are rebuilt when it changes"""
+    return zlib.crc32(f"{STATS_LEVELS}".encode())
+
+def _unit(longitude: np.ndarray, latitude: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    lat = np.clip(latitude, -MAX_LATITUDE, MAX_LATITUDE)
+    u = (longitude + 180.0) / 360.0
+    sin_lat = np.sin(np.radians(lat))
+    v = 0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * np.pi)
+    return u, v
+
+def _cells(u: np.ndarray, v: np.ndarray, level: int) -> Tuple[np.ndarray, np.ndarray]:
+    n = 2 ** level
+    x = np.clip(np.floor(u * n), 0, n - 1).astype(np.int64)
+    y = np.clip(np.floor(v * n), 0, n - 1).astype(np.int64)
+    return x, y
+
+def cell_range(level: int, bbox: Optional[tuple]) -> Tuple[int, int, int, int]:
+    """Inclusive (min_x, min_y, max_x, max_y) of the level's cells touching bbox"""
+    n = 2 ** level
+    if bbox is None:
+        return 0, 0, n - 1, n - 1
+    min_lon, min_lat, max_lon, max_lat = bbox
+    u, v = _unit(np.array([min_lon, max_lon], dtype=float), np.array([max_lat, min_lat], dtype=float))
+    x, y = _cells(u, v, level)
+    return int(x[0]), int(y[0]), int(x[1]), int(y[1])
+
+def cell_center(level: int, x: int, y: int) -> Tuple[float, float]:
+    n = 2 ** level
+    lon = (x + 0.5) / n * 360.0 - 180.0
+    lat = float(np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + 0.5) / n)))))
+    return lon, lat
+
+def select_level(bbox: Optional[tuple], zoom: Optional[float]) -> Tuple[int, Tuple[int, int, int, int]]:
+    """Finest stored level with at most STATS_MAX_CELLS cells over bbox.
+
+    With a zoom, levels finer than zoom + STATS_DETAIL are skipped, so a
+    heatmap has about as many cells per tile at every zoom.
+    """
+    candidates = STATS_LEVELS
+    if zoom is not None:
+        candidates = [level for level in STATS_LEVELS if level <= max(zoom, 0) + STATS_DETAIL] or [0]
+    for level in reversed(candidates):
+        cells = cell_range(level, bbox)
+        if (cells[2] - cells[0] + 1) * (cells[3] - cells[1] + 1) <= STATS_MAX_CELLS:
+            return level, cells
+    return 0, cell_range(0, bbox)
+
+def apply_stats_changes(cursor, changes: List[CameraChange]) -> None:
+    """Update the grid counts of changed cameras inside the caller's transaction.
+
+    Each change removes its old state from, and adds its new state to, one
+    cell per level. The +1/-1 deltas are summed per (cell, status, type) in
+    numpy, so a large import costs one upsert per touched cell, not per camera.
+    """
+    states: List[CameraState] = []
+    signs: List[int] = []
+    for change in changes:
+        if change.old is not None:
+            states.append(change.old)
+            signs.append(-1)
+        if change.new is not None:
+            states.append(change.new)
+            signs.append(1)
+    if not states:
+        return
+
+    longitude = np.array([state.longitude for state in states], dtype=float)
+    latitude = np.array([state.latitude for state in states], dtype=float)
+    valid = np.isfinite(longitude) & np.isfinite(latitude)
+    combos, combo_codes = np.unique(
+        np.array([f"{state.status}\x00{state.camera_type}" for state in states], dtype=object),
+        return_inverse=True
+    )
+    combos = [combo.split("\x00", 1) for combo in combos.tolist()]
+    u, v = _unit(longitude[valid], latitude[valid])
+    sign = np.array(signs, dtype=np.int64)[valid]
+    combo_codes = combo_codes.astype(np.int64)[valid]
+
+    upserts = []
+    emptied = []
+    for level in STATS_LEVELS:
+        x, y = _cells(u, v, level)
+        keys = ((x << level) | y) * len(combos) + combo_codes
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        deltas = np.bincount(inverse, weights=sign).astype(np.int64)
+        for key, delta in zip(unique_keys.tolist(), deltas.tolist()):
+            if not delta:
+                continue
+            cell, combo = divmod(key, len(combos))
+            status, camera_type = combos[combo]
+            row = (level, cell >> level, cell & ((1 << level) - 1), status, camera_type)
+            upserts.append(row + (delta,))
+            if delta < 0:
+                emptied.append(row)
+
+    for start in range(0, len(upserts), INSERT_BATCH_SIZE):
+        cursor.executemany("""
+            INSERT INTO camera_grid_stats (level, cell_x, cell_y, status, camera_type, count)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (level, cell_x, cell_y, status, camera_type)
+            DO UPDATE SET count = count + excluded.count
+        """, upserts[start:start + INSERT_BATCH_SIZE])
+    # Keep the table as small as the data: drop cells that lost their last camera
+    cursor.executemany("""
+        DELETE FROM camera_grid_stats
+        WHERE level = ? AND cell_x = ? AND cell_y = ? AND status = ? AND camera_type = ? AND count <= 0
+    """, emptied)
+
+def rebuild_camera_stats(cursor) -> int:
+    """Recount every camera, e.g. after the grid levels changed"""
+    cursor.execute("DELETE FROM camera_grid_stats")
+    cursor.execute("""
+        SELECT id, ST_X(geometry), ST_Y(geometry), status, camera_type
+        FROM cameras WHERE geometry IS NOT NULL
+    """)
+    changes = [
+        CameraChange(row[0], None, CameraState(row[1], row[2], row[3], row[4], None, None))
+        for row in cursor.fetchall()
+    ]
+    apply_stats_changes(cursor, changes)
+    cursor.execute(
+        "INSERT OR REPLACE INTO dataset_meta (key, value) VALUES ('stats_config', ?)",
+        (stats_config_key(),)
+    )
+    return len(changes)
+
+def ensure_camera_stats() -> None:
+    """Build the grid counts for existing cameras when missing or configured differently"""
+    with get_db_writer() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT value FROM dataset_meta WHERE key = 'stats_config'")
+        row = cursor.fetchone()
+        if row is not None and row[0] == stats_config_key():
+            return
+        count = rebuild_camera_stats(cursor)
+        conn.commit()
+    print(f"Rebuilt grid statistics for {count} cameras")
@@ -0,0 +1,230 @@
+import asyncio
+import json
+import os
+import queue
+import sys
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from services.camera_events import CameraChange, CameraState, add_listener
+from services.camera_service import parse_bbox
+from services.dataset_version import get_dataset_version
+from utils.executors import run_db
+
+# Messages buffered per subscriber before its backlog is replaced by a resync
+FEED_QUEUE_SIZE = int(os.getenv("CAMERA_FEED_QUEUE_SIZE", "256"))
+# Committed batches waiting for fan-out; beyond this everyone resyncs
+FEED_MAX_PENDING = int(os.getenv("CAMERA_FEED_MAX_PENDING", "64"))
+# A batch touching more of a subscriber's cameras than this becomes a resync
+FEED_MAX_EVENTS = int(os.getenv("CAMERA_FEED_MAX_EVENTS", "1000"))
+FEED_KEEPALIVE_SECONDS = float(os.getenv("CAMERA_FEED_KEEPALIVE_SECONDS", "15"))
+
+PROPERTY_FIELDS = ('status', 'camera_type', 'direction', 'field_of_view')
+
+Message = Tuple[str, Dict[str, Any]]
+
+class Subscription:
+    """One SSE client: its filters and a bounded queue owned by its event loop"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, bbox: Optional[tuple],
+                 status: Optional[str], version: int):
+        self.loop = loop
+        self.bbox = bbox
+        self.status = status
+        self.version = version
+        self.queue: "asyncio.Queue[Message]" = asyncio.Queue(maxsize=FEED_QUEUE_SIZE)
+
+    def offer(self, message: Message) -> None:
+        """Enqueue a message; runs on the subscriber's event loop"""
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # A client this far behind reloads its view instead of catching up
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(("resync", {"version": message[1].get("version")}))
+
+class _Batch:
+    """Column arrays of a committed change batch, shared by all subscribers"""
+
+    def __init__(self, changes: List[CameraChange]):
+        self.changes = changes
+        self.old = self._columns([change.old for change in changes])
+        self.new = self._columns([change.new for change in changes])
+
+    @staticmethod
+    def _columns(states: List[Optional[CameraState]]) -> Dict[str, np.ndarray]:
+        present = np.array([state is not None for state in states], dtype=bool)
+        return {
+            "present": present,
+            "lon": np.array([state.longitude if state else np.nan for state in states], dtype=float),
+            "lat": np.array([state.latitude if state else np.nan for state in states], dtype=float),
+            "status": np.array([state.status if state else None for state in states], dtype=object),
+        }
+
+    @staticmethod
+    def _visible(columns: Dict[str, np.ndarray], subscription: Subscription) -> np.ndarray:
+        mask = columns["present"].copy()
+        if subscription.bbox:
+            min_lon, min_lat, max_lon, max_lat = subscription.bbox
+            mask &= (columns["lon"] >= min_lon) & (columns["lon"] <= max_lon)
+            mask &= (columns["lat"] >= min_lat) & (columns["lat"] <= max_lat)
+        if subscription.status:
+            mask &= columns["status"] == subscription.status
+        return mask
+
+    def events_for(self, subscription: Subscription) -> Optional[List[Dict[str, Any]]]:
+        """Compact events visible to the subscriber, or None when there are too many"""
+        was_visible = self._visible(self.old, subscription)
+        is_visible = self._visible(self.new, subscription)
+        relevant = np.flatnonzero(was_visible | is_visible)
+        if len(relevant) > FEED_MAX_EVENTS:
+            return None
+
+        events = []
+        for index in relevant.tolist():
+            change = self.changes[index]
+            if not is_visible[index]:
+                # Deleted, or moved/filtered out of the subscriber's view
+                events.append({"op": "delete", "id": change.camera_id})
+                continue
+            new = change.new
+            old = change.old if was_visible[index] else None
+            events.append({
+                "op": "upsert",
+                "id": change.camera_id,
+                "lon": new.longitude,
+                "lat": new.latitude,
+                "changed": {
+                    field: getattr(new, field) for field in PROPERTY_FIELDS
+                    if old is None or getattr(old, field) != getattr(new, field)
+                }
+            })
+        return events
+
+class ChangeFeed:
+    """Fans committed camera changes out to SSE subscribers.
+
+    The camera_events listener only enqueues the batch, so the write path
+    never waits for filtering or slow clients. A background thread filters
+    each batch for every subscriber with NumPy masks and hands the result
+    to the subscriber's event loop with call_soon_threadsafe.
+    """
+
+    def __init__(self):
+        self._subscriptions: Set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._pending: "queue.Queue[Tuple[Optional[List[CameraChange]], int]]" = queue.Queue(maxsize=FEED_MAX_PENDING)
+        self._thread: Optional[threading.Thread] = None
+        # Last dataset version published by this process
+        self.published_version: Optional[int] = None
+
+    def subscribe(self, bbox: Optional[str], status: Optional[str], version: int) -> Subscription:
+        """Register a subscriber at dataset version; must be called on its event loop"""
+        subscription = Subscription(asyncio.get_running_loop(), parse_bbox(bbox), status, version)
+        with self._lock:
+            self._subscriptions.add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="camera-feed", daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscriptions)
+
+    def publish(self, changes: List[CameraChange], version: int) -> None:
+        """camera_events listener; never blocks the writer"""
+        previous = self.published_version
+        # Writers of this process may publish out of order once they release the lock
+        self.published_version = version if previous is None else max(previous, version)
+        if not self.subscriber_count():
+            return
+        # A gap means another worker process wrote in between
+        batches = [(changes, version)]
+        if previous is not None and version > previous + 1:
+            batches.insert(0, (None, version - 1))
+        for batch in batches:
+            try:
+                self._pending.put_nowait(batch)
+            except queue.Full:
+                # Fan-out is falling behind: collapse everything into one resync
+                with self._pending.mutex:
+                    self._pending.queue.clear()
+                self._pending.put_nowait((None, version))
+                break
+
+    def _run(self) -> None:
+        while True:
+            changes, version = self._pending.get()
+            try:
+                self._fan_out(changes, version)
+            except Exception as e:
+                print(f"Error in camera change feed: {e}")
+
+    def _fan_out(self, changes: Optional[List[CameraChange]], version: int) -> None:
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        if not subscriptions:
+            return
+
+        batch = _Batch(changes) if changes is not None else None
+        for subscription in subscriptions:
+            events = batch.events_for(subscription) if batch is not None else None
+            if events is None:
+                message = ("resync", {"version": version})
+            elif events:
+                message = ("changes", {"version": version, "events": events})
+            else:
+                continue
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, message)
+            except RuntimeError:
+                # The subscriber's loop is closed
+                self.unsubscribe(subscription)
+
+def _format(event: str, data: Dict[str, Any]) -> str:
+    event_id = f"id: {data['version']}\n" if data.get('version') is not None else ""
+    return f"{event_id}event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+async def iter_sse(
+    subscription: Subscription,
+    is_disconnected: Callable[[], Awaitable[bool]]
+):
+    """Server-sent events for a subscription until the client goes away.
+
+    Sends "ready" first, then "changes" and "resync" messages. Writes made by
+    other worker processes are not published here; a keepalive that finds a
+    dataset version newer than this process has published sends a resync.
+    """
+    try:
+        yield _format("ready", {"version": subscription.version})
+        while True:
+            try:
+                event, data = await asyncio.wait_for(subscription.queue.get(), FEED_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    break
+                version = await run_db(get_dataset_version)
+                if version > max(subscription.version, change_feed.published_version or 0):
+                    subscription.version = version
+                    yield _format("resync", {"version": version})
+                else:
+                    yield ": keepalive\n\n"
+                continue
+            if data.get("version") is not None:
+                subscription.version = max(subscription.version, data["version"])
+            yield _format(event, data)
+    finally:
+        change_feed.unsubscribe(subscription)
+
+change_feed = ChangeFeed()
+add_listener(change_feed.publish)
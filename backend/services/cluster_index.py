@@ -0,0 +1,145 @@
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services.camera_events import CameraChange, CameraState
+from services.vector_tiles import lonlat_to_unit
+
+# Cells are CELL_SIZE pixels wide on a 256px Web Mercator tile, i.e. zoom z
+# is split into 2 ** (z + CELL_SHIFT) cells per axis.
+CELL_SIZE = 64
+CELL_SHIFT = 2
+MAX_CLUSTER_ZOOM = 15
+
+class _Cell:
+    """Per-cell aggregate keyed by (status, camera_type): [count, sum_lon, sum_lat]"""
+    __slots__ = ("groups",)
+
+    def __init__(self):
+        self.groups: Dict[Tuple[str, str], List[float]] = {}
+
+    def add(self, state: CameraState, sign: int) -> None:
+        key = (state.status, state.camera_type)
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = [0, 0.0, 0.0]
+        group[0] += sign
+        group[1] += sign * state.longitude
+        group[2] += sign * state.latitude
+        if group[0] <= 0:
+            del self.groups[key]
+
+class ClusterIndex:
+    """Hierarchical grid of camera aggregates for zoom levels 0..max_zoom.
+
+    The index is built once per dataset version from a full scan and then
+    patched with every committed CameraChange, so cluster queries never touch
+    SQLite. A patch that skips a version (written by another process) marks
+    the index stale so the next query rebuilds it.
+    """
+
+    def __init__(self, max_zoom: int = MAX_CLUSTER_ZOOM):
+        self.max_zoom = max_zoom
+        self.built = False
+        self.version = None
+        self._levels: List[Dict[Tuple[int, int], _Cell]] = [{} for _ in range(max_zoom + 1)]
+        self._lock = threading.Lock()
+
+    def _cells_for(self, state: CameraState) -> Iterable[Tuple[int, Tuple[int, int]]]:
+        u, v = lonlat_to_unit(state.longitude, state.latitude)
+        for z in range(self.max_zoom + 1):
+            n = 2 ** (z + CELL_SHIFT)
+            yield z, (min(int(u * n), n - 1), min(int(v * n), n - 1))
+
+    def _apply(self, state: CameraState, sign: int) -> None:
+        for z, key in self._cells_for(state):
+            level = self._levels[z]
+            cell = level.get(key)
+            if cell is None:
+                cell = level[key] = _Cell()
+            cell.add(state, sign)
+            if not cell.groups:
+                del level[key]
+
+    def build(self, states: Iterable[CameraState], version: Optional[int] = None) -> None:
+        with self._lock:
+            self._levels = [{} for _ in range(self.max_zoom + 1)]
+            for state in states:
+                self._apply(state, 1)
+            self.built = True
+            self.version = version
+
+    def apply_changes(self, changes: List[CameraChange], version: Optional[int] = None) -> None:
+        """Patch the index incrementally; ignored until the first build"""
+        with self._lock:
+            if not self.built:
+                return
+            if version is not None and self.version is not None and version != self.version + 1:
+                if version > self.version:
+                    self.built = False
+                return
+            self.version = version
+            for change in changes:
+                if change.old is not None:
+                    self._apply(change.old, -1)
+                if change.new is not None:
+                    self._apply(change.new, 1)
+
+    def query(
+        self,
+        zoom: int,
+        bbox: Optional[tuple] = None,
+        status: Optional[str] = None,
+        camera_type: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Return clusters for the grid cells of zoom intersecting bbox"""
+        z = max(0, min(int(zoom), self.max_zoom))
+        n = 2 ** (z + CELL_SHIFT)
+        with self._lock:
+            level = self._levels[z]
+            if bbox:
+                min_lon, min_lat, max_lon, max_lat = bbox
+                u0, v1 = lonlat_to_unit(min_lon, min_lat)
+                u1, v0 = lonlat_to_unit(max_lon, max_lat)
+                x0, x1 = int(u0 * n), min(int(u1 * n), n - 1)
+                y0, y1 = int(v0 * n), min(int(v1 * n), n - 1)
+                # Walk the smaller of the cell range and the populated cells
+                if (x1 - x0 + 1) * (y1 - y0 + 1) < len(level):
+                    items = [
+                        ((cx, cy), level[(cx, cy)])
+                        for cx in range(x0, x1 + 1)
+                        for cy in range(y0, y1 + 1)
+                        if (cx, cy) in level
+                    ]
+                else:
+                    items = [
+                        (key, cell) for key, cell in level.items()
+                        if x0 <= key[0] <= x1 and y0 <= key[1] <= y1
+                    ]
+            else:
+                items = list(level.items())
+
+            clusters = []
+            for (cx, cy), cell in items:
+                count, sum_lon, sum_lat = 0, 0.0, 0.0
+                status_counts: Dict[str, int] = {}
+                type_counts: Dict[str, int] = {}
+                for (group_status, group_type), (g_count, g_lon, g_lat) in cell.groups.items():
+                    if status and group_status != status:
+                        continue
+                    if camera_type and group_type != camera_type:
+                        continue
+                    count += g_count
+                    sum_lon += g_lon
+                    sum_lat += g_lat
+                    status_counts[group_status] = status_counts.get(group_status, 0) + g_count
+                    type_counts[group_type] = type_counts.get(group_type, 0) + g_count
+                if count:
+                    clusters.append({
+                        "cell": [z, cx, cy],
+                        "count": count,
+                        "longitude": sum_lon / count,
+                        "latitude": sum_lat / count,
+                        "status_counts": status_counts,
+                        "camera_type_counts": type_counts,
+                    })
+            return clusters
@@ -0,0 +1,96 @@
+import json
+import struct
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+MEDIA_TYPE = "application/vnd.cameragis.columns"
+MAGIC = b"CAMB"
+FORMAT_VERSION = 1
+ALIGNMENT = 8
+
+# Column order of the rows passed to encode_camera_columns
+COLUMNS = """
+    id, ST_X(geometry) AS longitude, ST_Y(geometry) AS latitude,
+    direction, field_of_view, status, camera_type
+"""
+
+def _pad(size: int) -> int:
+    return (-size) % ALIGNMENT
+
+def _dictionary_encode(values: Sequence[Any]) -> Tuple[List[str], np.ndarray]:
+    labels, codes = np.unique(np.asarray(values, dtype=object).astype(str), return_inverse=True)
+    dtype = np.uint8 if len(labels) <= 256 else np.uint16
+    return labels.tolist(), codes.astype(dtype)
+
+def encode_camera_columns(rows: Sequence[Tuple]) -> bytes:
+    """Pack camera rows into typed arrays behind a small JSON header.
+
+    Layout: b"CAMB", uint32 LE header length, UTF-8 JSON header padded to 8
+    bytes, then the arrays, each starting on an 8 byte boundary. The header
+    lists every array with its dtype, absolute byte offset, element count and
+    components per camera, so a browser can wrap them as
+    Float64Array/Float32Array/Uint*Array views and hand them to deck.gl as
+    binary attributes without copying. Missing direction/FOV values are NaN.
+    """
+    count = len(rows)
+    if count:
+        ids, lons, lats, directions, fovs, statuses, types = zip(*rows)
+    else:
+        ids = lons = lats = directions = fovs = statuses = types = ()
+
+    positions = np.empty((count, 2), dtype='<f8')
+    positions[:, 0] = lons
+    positions[:, 1] = lats
+    status_labels, status_codes = _dictionary_encode(statuses)
+    type_labels, type_codes = _dictionary_encode(types)
+
+    arrays: Dict[str, Tuple[np.ndarray, int]] = {
+        "positions": (positions, 2),
+        "ids": (np.asarray(ids, dtype='<u4'), 1),
+        "direction": (np.asarray(directions, dtype=float).astype('<f4'), 1),
+        "field_of_view": (np.asarray(fovs, dtype=float).astype('<f4'), 1),
+        "status": (status_codes, 1),
+        "camera_type": (type_codes, 1),
+    }
+
+    def build_header(offsets: Dict[str, int]) -> bytes:
+        header = {
+            "version": FORMAT_VERSION,
+            "count": count,
+            "dictionaries": {"status": status_labels, "camera_type": type_labels},
+            "arrays": [
+                {
+                    "name": name,
+                    "dtype": array.dtype.name,
+                    "offset": offsets.get(name, 0),
+                    "length": int(array.size),
+                    "size": size,
+                }
+                for name, (array, size) in arrays.items()
+            ],
+        }
+        return json.dumps(header, separators=(',', ':')).encode('utf-8')
+
+    # Offsets depend on the header length and vice versa; widen the offset
+    # digits until the layout is stable (two passes in practice).
+    offsets: Dict[str, int] = {}
+    while True:
+        header = build_header(offsets)
+        position = len(MAGIC) + 4 + len(header)
+        position += _pad(position)
+        new_offsets = {}
+        for name, (array, _) in arrays.items():
+            new_offsets[name] = position
+            position += array.nbytes + _pad(array.nbytes)
+        if new_offsets == offsets:
+            break
+        offsets = new_offsets
+
+    header += b' ' * _pad(len(MAGIC) + 4 + len(header))
+    parts = [MAGIC, struct.pack('<I', len(header)), header]
+    for array, _ in arrays.values():
+        data = array.tobytes()
+        parts.append(data)
+        parts.append(b'\0' * _pad(len(data)))
+    return b''.join(parts)
@@ -0,0 +1,63 @@
+import hashlib
+import os
+import sys
+import threading
+import time
+from typing import Any, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from database import get_db_connection
+
+# Other worker processes bump the version in SQLite; this process trusts its
+# cached copy for this many seconds before re-reading it.
+VERSION_REFRESH_SECONDS = float(os.getenv("CAMERA_VERSION_REFRESH_SECONDS", "1.0"))
+
+_lock = threading.Lock()
+_version: Optional[int] = None
+_checked_at = 0.0
+
+def bump_dataset_version(cursor) -> int:
+    """Increment the stored dataset version inside the caller's transaction"""
+    cursor.execute("UPDATE dataset_meta SET value = value + 1 WHERE key = 'version'")
+    cursor.execute("SELECT value FROM dataset_meta WHERE key = 'version'")
+    return cursor.fetchone()[0]
+
+def mark_committed(version: int) -> None:
+    """Publish a version committed by this process without a round trip"""
+    global _version, _checked_at
+    with _lock:
+        if _version is None or version > _version:
+            _version = version
+        _checked_at = time.monotonic()
+
+def peek_dataset_version() -> Optional[int]:
+    """The cached version while it is fresh, else None; never touches SQLite"""
+    with _lock:
+        if _version is not None and time.monotonic() - _checked_at < VERSION_REFRESH_SECONDS:
+            return _version
+    return None
+
+def get_dataset_version() -> int:
+    """Current dataset version, re-read from SQLite at most once per refresh window"""
+    version = peek_dataset_version()
+    if version is not None:
+        return version
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT value FROM dataset_meta WHERE key = 'version'")
+        row = cursor.fetchone()
+    mark_committed(row[0] if row else 0)
+    return _version
+
+def make_etag(version: int, *parts: Any) -> str:
+    """Strong ETag for a response derived from the dataset version and request parameters"""
+    digest = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:16]
+    return f'"v{version}-{digest}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return etag in [tag.strip() for tag in if_none_match.split(',')]
@@ -0,0 +1,121 @@
+import os
+import shutil
+import sys
+import tempfile
+from typing import TYPE_CHECKING, Any, BinaryIO, Callable, Dict, Iterator, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from services.camera_service import import_cameras_from_file
+
+SUPPORTED_EXTENSIONS = ('.csv', '.xlsx')
+# Rows parsed and imported per chunk; peak memory scales with this, not the file
+UPLOAD_CHUNK_ROWS = int(os.getenv("CAMERA_UPLOAD_CHUNK_ROWS", "20000"))
+SPOOL_BLOCK_SIZE = 1024 * 1024
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+def spool_upload(source: BinaryIO, suffix: str, directory: Optional[str] = None) -> str:
+    """Copy an upload to a temporary file in fixed-size blocks and return its path"""
+    with tempfile.NamedTemporaryFile(suffix=suffix, dir=directory, delete=False) as target:
+        shutil.copyfileobj(source, target, SPOOL_BLOCK_SIZE)
+        return target.name
+
+def iter_camera_frames(
+    path: str,
+    chunk_rows: int = UPLOAD_CHUNK_ROWS,
+    start_row: int = 0
+) -> Iterator["pd.DataFrame"]:
+    """Parse a CSV/XLSX file into DataFrames of at most chunk_rows rows,
+    skipping the first start_row data rows"""
+    import pandas as pd
+    
+    if path.endswith('.csv'):
+        # Skipped as parsed records: skiprows counts physical lines, which
+        # differ from records once a quoted field spans several lines
+        skip = start_row
+        with pd.read_csv(path, chunksize=chunk_rows) as reader:
+            for frame in reader:
+                if skip >= len(frame):
+                    skip -= len(frame)
+                    continue
+                if skip:
+                    frame = frame.iloc[skip:]
+                    skip = 0
+                yield frame
+        return
+
+    from openpyxl import load_workbook
+
+    # read_only streams rows from the sheet XML instead of building the workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name) if name is not None else f"column_{i}" for i, name in enumerate(header)]
+        for _ in range(start_row):
+            if next(rows, None) is None:
+                return
+        buffer = []
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) >= chunk_rows:
+                yield pd.DataFrame(buffer, columns=columns)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns)
+    finally:
+        workbook.close()
+
+def import_camera_file(
+    path: str,
+    chunk_rows: int = UPLOAD_CHUNK_ROWS,
+    start_row: int = 0,
+    checkpoint: Optional[Callable[[Any, int, int, int], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None
+) -> Dict[str, Any]:
+    """Import a spooled CSV/XLSX file chunk by chunk.
+
+    Each chunk commits on its own. checkpoint(cursor, rows_processed, added,
+    errors) runs inside every chunk's transaction, so progress recorded there
+    matches what was committed and an import can resume from start_row.
+    should_stop() is polled between chunks; when it returns True the import
+    ends early with status "interrupted".
+    """
+    from services.camera_frames import MAX_REPORTED_ERRORS
+    
+    added = 0
+    errors = 0
+    error_details = []
+    offset = start_row
+    status = "success"
+
+    for frame in iter_camera_frames(path, chunk_rows, start_row):
+        if should_stop is not None and should_stop():
+            status = "interrupted"
+            break
+        before_commit = None
+        if checkpoint is not None:
+            end = offset + len(frame)
+            before_commit = lambda cursor, chunk_added, chunk_errors, end=end: checkpoint(
+                cursor, end, chunk_added, chunk_errors
+            )
+        # Rebuilding the whole R*Tree after every chunk would be quadratic
+        result = import_cameras_from_file(
+            frame, row_offset=offset, rebuild_spatial_index=False, before_commit=before_commit
+        )
+        added += result['added']
+        errors += result['errors']
+        error_details.extend(result['error_details'][:MAX_REPORTED_ERRORS - len(error_details)])
+        offset += len(frame)
+
+    return {
+        "status": status,
+        "added": added,
+        "errors": errors,
+        "error_details": error_details,
+        "rows_processed": offset
+    }
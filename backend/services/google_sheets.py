@@ -1,33 +1,103 @@
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from typing import List, Dict, Any
 import os
+import threading
+
+DEFAULT_RANGE = "Sheet1!A:H"
+DEFAULT_TAB = DEFAULT_RANGE.split('!')[0]
+
+# Point the client at another Sheets-compatible server (e.g. a local fake in tests)
+SHEETS_API_ENDPOINT = os.getenv('GOOGLE_SHEETS_API_ENDPOINT')
+
+# googleapiclient services share an httplib2 connection that is not
+# thread-safe, so each thread keeps its own, built once. A thread's service
+# is rebuilt when the generation has moved on since it was built
+_local = threading.local()
+_generation = 0
 
 def get_google_sheets_service():
     """Get Google Sheets API service using Replit integration"""
+    generation = _generation
+    service = getattr(_local, 'service', None)
+    if service is not None and getattr(_local, 'generation', None) == generation:
+        return service
+    
     try:
+        # Imported here: only workers that actually sync pay for googleapiclient
+        from google.oauth2.credentials import Credentials
+        from googleapiclient.discovery import build
+        
         # Replit integration provides credentials automatically
         token = os.getenv('GOOGLE_OAUTH_ACCESS_TOKEN')
         refresh_token = os.getenv('GOOGLE_OAUTH_REFRESH_TOKEN')
         
-        if not token:
+        if token:
+            creds = Credentials(
+                token=token,
+                refresh_token=refresh_token,
+                token_uri='https://oauth2.googleapis.com/token',
+                client_id=os.getenv('GOOGLE_OAUTH_CLIENT_ID'),
+                client_secret=os.getenv('GOOGLE_OAUTH_CLIENT_SECRET')
+            )
+        elif SHEETS_API_ENDPOINT:
+            from google.auth.credentials import AnonymousCredentials
+            creds = AnonymousCredentials()
+        else:
             raise ValueError("Google Sheets integration not configured")
         
-        creds = Credentials(
-            token=token,
-            refresh_token=refresh_token,
-            token_uri='https://oauth2.googleapis.com/token',
-            client_id=os.getenv('GOOGLE_OAUTH_CLIENT_ID'),
-            client_secret=os.getenv('GOOGLE_OAUTH_CLIENT_SECRET')
+        client_options = {"api_endpoint": SHEETS_API_ENDPOINT} if SHEETS_API_ENDPOINT else None
+        # static_discovery uses the discovery document bundled with the
+        # client library instead of fetching it
+        service = build(
+            'sheets', 'v4', credentials=creds,
+            client_options=client_options, static_discovery=True, cache_discovery=False
         )
-        
-        service = build('sheets', 'v4', credentials=creds)
+        _local.service = service
+        _local.generation = generation
         return service
     except Exception as e:
         print(f"Error initializing Google Sheets service: {e}")
         return None
 
-def read_sheet_data(spreadsheet_id: str, range_name: str = "Sheet1!A:H") -> List[Dict[str, Any]]:
+def reset_google_sheets_service():
+    """Drop every thread's cached service (e.g. after credentials change)"""
+    global _generation
+    _generation += 1
+    _local.service = None
+
+def sheet_row_prefix(spreadsheet_id: str, range_name: str = DEFAULT_RANGE) -> str:
+    """Prefix shared by the g_sheet_row_id of every row read from a range.
+    
+    Rows of the default tab, whatever the columns of the range, keep the
+    original "<spreadsheet>_<row>" ids; other tabs are namespaced as
+    "<spreadsheet>:<tab>_<row>". Row numbers are always digits, which is
+    what tells "Kyiv_5" from the rows of a "Kyiv_2024" tab.
+    """
+    tab = range_name.split('!')[0].strip("'")
+    if tab == DEFAULT_TAB:
+        return f"{spreadsheet_id}_"
+    return f"{spreadsheet_id}:{tab}_"
+
+def _values_to_rows(values: List[List[Any]], prefix: str) -> List[Dict[str, Any]]:
+    if not values:
+        return []
+    
+    headers = values[0]
+    data = []
+    
+    for idx, row in enumerate(values[1:], start=2):
+        if len(row) < len(headers):
+            row.extend([''] * (len(headers) - len(row)))
+        
+        camera_data = {}
+        for i, header in enumerate(headers):
+            camera_data[header.lower().replace(' ', '_')] = row[i] if i < len(row) else ''
+        
+        camera_data['g_sheet_row_id'] = f"{prefix}{idx}"
+        data.append(camera_data)
+    
+    return data
+
+def read_sheet_data(spreadsheet_id: str, range_name: str = DEFAULT_RANGE) -> List[Dict[str, Any]]:
     """Read data from Google Sheets"""
     service = get_google_sheets_service()
     if not service:
@@ -39,29 +109,35 @@ def read_sheet_data(spreadsheet_id: str, range_name: str = "Sheet1!A:H") -> List
             range=range_name
         ).execute()
         
-        values = result.get('values', [])
-        if not values:
-            return []
-        
-        headers = values[0]
-        data = []
-        
-        for idx, row in enumerate(values[1:], start=2):
-            if len(row) < len(headers):
-                row.extend([''] * (len(headers) - len(row)))
-            
-            camera_data = {}
-            for i, header in enumerate(headers):
-                camera_data[header.lower().replace(' ', '_')] = row[i] if i < len(row) else ''
-            
-            camera_data['g_sheet_row_id'] = f"{spreadsheet_id}_{idx}"
-            data.append(camera_data)
-        
-        return data
+        return _values_to_rows(result.get('values', []), sheet_row_prefix(spreadsheet_id, range_name))
     except Exception as e:
         print(f"Error reading Google Sheets: {e}")
         return []
 
+def read_sheet_ranges(spreadsheet_id: str, ranges: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Read several ranges/tabs of one spreadsheet in a single batchGet call"""
+    service = get_google_sheets_service()
+    if not service:
+        return {}
+    
+    try:
+        result = service.spreadsheets().values().batchGet(
+            spreadsheetId=spreadsheet_id,
+            ranges=ranges
+        ).execute()
+        
+        # valueRanges come back in request order; their "range" is normalised
+        # by the API (e.g. "Sheet1!A1:H100"), so key by the requested range
+        return {
+            range_name: _values_to_rows(
+                value_range.get('values', []), sheet_row_prefix(spreadsheet_id, range_name)
+            )
+            for range_name, value_range in zip(ranges, result.get('valueRanges', []))
+        }
+    except Exception as e:
+        print(f"Error reading Google Sheets: {e}")
+        return {}
+
 def validate_coordinates(lat: str, lon: str) -> tuple:
     """Validate and convert coordinates"""
     try:
@@ -0,0 +1,380 @@
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from database import DATABASE_PATH, get_db_connection, get_db_writer
+from services.camera_service import sync_cameras_from_sheets, sync_many_spreadsheets
+from services.file_ingest import import_camera_file
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# A job interrupted this many times (restarts, crashes) is marked failed
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# A running job whose owner sent no heartbeat for this long is taken to be
+# abandoned (its worker crashed or hung) and any worker may recover it
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_HEARTBEAT_SECONDS = JOB_LEASE_SECONDS / 4
+# Uploads wait here until their job has run, so they survive a restart
+JOB_SPOOL_DIR = os.getenv(
+    "JOB_SPOOL_DIR", os.path.join(os.path.dirname(os.path.abspath(DATABASE_PATH)), "job_uploads")
+)
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+class JobLeaseLost(Exception):
+    """The job was taken over by another runner after its lease expired"""
+
+class JobContext:
+    """What a job handler sees: its parameters, resume point and progress hooks"""
+
+    def __init__(self, runner: "JobRunner", job_id: str, params: Dict[str, Any],
+                 rows_processed: int, cancel_event: threading.Event):
+        self.runner = runner
+        self.job_id = job_id
+        self.params = params
+        self.rows_processed = rows_processed
+        self.cancel_requested = False
+        self._cancel_event = cancel_event
+
+    def should_stop(self) -> bool:
+        """True once the job is cancelled (from any process) or the runner shuts down"""
+        if not self.cancel_requested:
+            if self._cancel_event.is_set():
+                self.cancel_requested = True
+            else:
+                with get_db_connection() as conn:
+                    row = conn.execute(
+                        "SELECT cancel_requested FROM jobs WHERE id = ?", (self.job_id,)
+                    ).fetchone()
+                self.cancel_requested = bool(row and row[0])
+        return self.cancel_requested or self.runner.stopping
+
+    def checkpoint(self, cursor, rows_processed: int, added: int, errors: int) -> None:
+        """Record progress inside the caller's write transaction.
+
+        Raises JobLeaseLost if another runner owns the job by now, which rolls
+        the caller's transaction back instead of committing a chunk twice.
+        """
+        cursor.execute("""
+            UPDATE jobs SET rows_processed = ?, rows_added = rows_added + ?, errors = errors + ?
+            WHERE id = ? AND owner = ?
+        """, (rows_processed, added, errors, self.job_id, self.runner.owner))
+        if cursor.rowcount != 1:
+            raise JobLeaseLost(f"Job {self.job_id} was taken over by another worker")
+        self.rows_processed = rows_processed
+
+    def report(self, rows_processed: int, added: int, errors: int) -> None:
+        """Record progress in a transaction of its own"""
+        with get_db_writer() as conn:
+            self.checkpoint(conn.cursor(), rows_processed, added, errors)
+            conn.commit()
+
+def _run_sync_sheets(job: JobContext) -> Dict[str, Any]:
+    if job.should_stop():
+        return {"status": "interrupted"}
+
+    spreadsheet_ids = job.params['spreadsheet_ids']
+    ranges = job.params.get('ranges')
+    if len(spreadsheet_ids) == 1:
+        result = sync_cameras_from_sheets(spreadsheet_ids[0], ranges)
+        results = [result]
+    else:
+        by_id = sync_many_spreadsheets(spreadsheet_ids, ranges)
+        results = list(by_id.values())
+        failed = [spreadsheet_id for spreadsheet_id, r in by_id.items() if r.get('status') == 'error']
+        if not failed:
+            result = {"status": "success", "results": by_id}
+        elif len(failed) == len(by_id):
+            # Failing the job needs a top-level error
+            result = {"status": "error", "message": "All spreadsheets failed to sync", "results": by_id}
+        else:
+            result = {"status": "partial", "failed": failed, "results": by_id}
+
+    # A sync is a single transaction, so progress is only known at the end
+    job.report(
+        sum(r.get('added', 0) + r.get('updated', 0) + r.get('unchanged', 0) for r in results),
+        sum(r.get('added', 0) for r in results),
+        sum(r.get('errors', 0) for r in results)
+    )
+    return result
+
+def _run_import_file(job: JobContext) -> Dict[str, Any]:
+    return import_camera_file(
+        job.params['path'],
+        start_row=job.rows_processed,
+        checkpoint=job.checkpoint,
+        should_stop=job.should_stop
+    )
+
+# Syncs are idempotent and imports resume from their last committed chunk,
+# so both kinds can be re-run after an interruption
+HANDLERS: Dict[str, Callable[[JobContext], Dict[str, Any]]] = {
+    "sync_sheets": _run_sync_sheets,
+    "import_file": _run_import_file,
+}
+
+def _discard_upload(params: Dict[str, Any]) -> None:
+    path = params.get('path')
+    if path and os.path.exists(path):
+        os.unlink(path)
+
+class JobRunner:
+    """Runs sync/import jobs on a worker thread pool, tracked in the jobs table.
+
+    Jobs are enqueued by submit() and report progress through their
+    JobContext. Cancellation is cooperative: handlers poll should_stop()
+    between chunks. On shutdown running jobs stop at their next chunk and go
+    back to "queued"; start() re-dispatches queued jobs.
+
+    A running job is leased to the runner running it (owner, a random token
+    per runner: a restarted container often gets the old PID back), which
+    renews heartbeat_at every JOB_HEARTBEAT_SECONDS. Only jobs whose lease
+    has expired are resumed or failed, so a worker starting next to busy
+    ones never takes over their jobs.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS):
+        self.workers = workers
+        self.owner = uuid.uuid4().hex
+        self.stopping = False
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._cancel_events: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._heartbeat: Optional[threading.Thread] = None
+        self._stop_heartbeat = threading.Event()
+
+    def start(self) -> None:
+        os.makedirs(JOB_SPOOL_DIR, exist_ok=True)
+        self.stopping = False
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        for job_id in self._recover():
+            self._dispatch(job_id)
+        self._stop_heartbeat.clear()
+        self._heartbeat = threading.Thread(target=self._keep_leases, name="job-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def shutdown(self) -> None:
+        """Stop running jobs at their next chunk; blocks until they have"""
+        self.stopping = True
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        # Stopped last: jobs finishing their chunk keep renewing their lease
+        self._stop_heartbeat.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+            self._heartbeat = None
+
+    def submit(self, kind: str, params: Dict[str, Any], user_id: Optional[int] = None) -> str:
+        """Persist a new job and queue it; returns the job id"""
+        if kind not in HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        with get_db_writer() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, params, user_id) VALUES (?, ?, ?, ?)",
+                (job_id, kind, json.dumps(params), user_id)
+            )
+            conn.commit()
+        self._dispatch(job_id)
+        return job_id
+
+    def get(self, job_id: str, user_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Status and progress of a job, or None if it does not exist for this user"""
+        with get_db_connection() as conn:
+            row = conn.execute("""
+                SELECT id, kind, status, user_id, rows_processed, rows_added, errors,
+                       attempts, cancel_requested, result, error,
+                       created_at, started_at, finished_at,
+                       (julianday(COALESCE(finished_at, strftime('%Y-%m-%d %H:%M:%f', 'now')))
+                        - julianday(started_at)) * 86400 AS elapsed_seconds
+                FROM jobs WHERE id = ?
+            """, (job_id,)).fetchone()
+        if row is None or (user_id is not None and row['user_id'] != user_id):
+            return None
+
+        elapsed = row['elapsed_seconds']
+        return {
+            "id": row['id'],
+            "kind": row['kind'],
+            "status": row['status'],
+            "rows_processed": row['rows_processed'],
+            "rows_added": row['rows_added'],
+            "errors": row['errors'],
+            "attempts": row['attempts'],
+            "cancel_requested": bool(row['cancel_requested']),
+            "created_at": row['created_at'],
+            "started_at": row['started_at'],
+            "finished_at": row['finished_at'],
+            "elapsed_seconds": round(elapsed, 3) if elapsed is not None else None,
+            "rows_per_second": round(row['rows_processed'] / elapsed, 1) if elapsed else None,
+            "result": json.loads(row['result']) if row['result'] else None,
+            "error": row['error'],
+        }
+
+    def cancel(self, job_id: str, user_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Request cancellation; queued jobs are cancelled at once, running ones
+        stop at their next chunk. Returns the job status or None if not found."""
+        job = self.get(job_id, user_id)
+        if job is None:
+            return None
+        if job['status'] in ACTIVE_STATUSES:
+            with get_db_writer() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status IN ('queued', 'running')",
+                    (job_id,)
+                )
+                cursor.execute("""
+                    UPDATE jobs SET status = 'cancelled', finished_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+                    WHERE id = ? AND status = 'queued'
+                """, (job_id,))
+                cancelled_queued = cursor.rowcount == 1
+                cursor.execute("SELECT params FROM jobs WHERE id = ?", (job_id,))
+                params = json.loads(cursor.fetchone()[0])
+                conn.commit()
+            if cancelled_queued:
+                _discard_upload(params)
+            with self._lock:
+                event = self._cancel_events.get(job_id)
+            if event is not None:
+                event.set()
+        return self.get(job_id, user_id)
+
+    def _dispatch(self, job_id: str) -> None:
+        with self._lock:
+            self._cancel_events[job_id] = threading.Event()
+        self._executor.submit(self._run, job_id)
+
+    def _keep_leases(self) -> None:
+        """Renew the leases of this process's running jobs and take over expired ones"""
+        while not self._stop_heartbeat.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                with get_db_writer() as conn:
+                    conn.execute(
+                        "UPDATE jobs SET heartbeat_at = ? WHERE status = 'running' AND owner = ?",
+                        (time.time(), self.owner)
+                    )
+                    conn.commit()
+                if not self.stopping:
+                    for job_id in self._recover(include_queued=False):
+                        self._dispatch(job_id)
+            except Exception as e:
+                print(f"Error renewing job leases: {e}")
+
+    def _recover(self, include_queued: bool = True) -> List[str]:
+        """Decide the fate of queued jobs and of running jobs whose lease expired"""
+        resume = []
+        with get_db_writer() as conn:
+            cursor = conn.cursor()
+            # Lease check and takeover in one transaction, so a heartbeat
+            # from the owner cannot land in between
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("""
+                SELECT id, kind, params, attempts, cancel_requested FROM jobs
+                WHERE (status = 'queued' AND ?)
+                   OR (status = 'running' AND (heartbeat_at IS NULL OR heartbeat_at < ?))
+            """, (include_queued, time.time() - JOB_LEASE_SECONDS))
+            for job_id, kind, params, attempts, cancel_requested in cursor.fetchall():
+                params = json.loads(params)
+                if cancel_requested:
+                    status, error = 'cancelled', None
+                elif attempts >= JOB_MAX_ATTEMPTS:
+                    status, error = 'failed', f"Interrupted {attempts} times"
+                elif kind == 'import_file' and not os.path.exists(params.get('path', '')):
+                    status, error = 'failed', "Uploaded file is no longer available"
+                else:
+                    status, error = 'queued', None
+                    resume.append(job_id)
+
+                if status == 'queued':
+                    cursor.execute(
+                        "UPDATE jobs SET status = 'queued', owner = NULL, heartbeat_at = NULL WHERE id = ?",
+                        (job_id,)
+                    )
+                else:
+                    cursor.execute("""
+                        UPDATE jobs SET status = ?, error = ?, owner = NULL, heartbeat_at = NULL,
+                            finished_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+                        WHERE id = ?
+                    """, (status, error, job_id))
+                    _discard_upload(params)
+            conn.commit()
+
+        if resume:
+            print(f"Resuming {len(resume)} interrupted job(s)")
+        return resume
+
+    def _finish(self, job_id: str, status: str, params: Dict[str, Any],
+                result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        with get_db_writer() as conn:
+            if status == 'queued':
+                cursor = conn.execute(
+                    "UPDATE jobs SET status = 'queued', owner = NULL, heartbeat_at = NULL "
+                    "WHERE id = ? AND owner = ?",
+                    (job_id, self.owner)
+                )
+            else:
+                cursor = conn.execute("""
+                    UPDATE jobs SET status = ?, result = ?, error = ?, owner = NULL, heartbeat_at = NULL,
+                        finished_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+                    WHERE id = ? AND owner = ?
+                """, (status, json.dumps(result) if result is not None else None, error, job_id, self.owner))
+            owned = cursor.rowcount == 1
+            conn.commit()
+        if not owned:
+            # Our lease expired mid-run; the upload now belongs to the new owner
+            print(f"Job {job_id} was taken over by another worker")
+            return
+        if status != 'queued':
+            _discard_upload(params)
+
+    def _run(self, job_id: str) -> None:
+        with self._lock:
+            cancel_event = self._cancel_events[job_id]
+        try:
+            # Claim the job; another process may have picked it up already
+            with get_db_writer() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    UPDATE jobs SET status = 'running', attempts = attempts + 1,
+                        owner = ?, heartbeat_at = ?,
+                        started_at = COALESCE(started_at, strftime('%Y-%m-%d %H:%M:%f', 'now'))
+                    WHERE id = ? AND status = 'queued'
+                """, (self.owner, time.time(), job_id))
+                if cursor.rowcount != 1:
+                    return
+                cursor.execute("SELECT kind, params, rows_processed FROM jobs WHERE id = ?", (job_id,))
+                kind, params, rows_processed = cursor.fetchone()
+                conn.commit()
+
+            params = json.loads(params)
+            job = JobContext(self, job_id, params, rows_processed, cancel_event)
+            try:
+                result = HANDLERS[kind](job)
+            except Exception as e:
+                print(f"Job {job_id} ({kind}) failed: {e}")
+                self._finish(job_id, 'failed', params, error=str(e))
+                return
+
+            if result.get('status') == 'interrupted':
+                if job.cancel_requested:
+                    self._finish(job_id, 'cancelled', params, result=result)
+                else:
+                    # Shutting down: leave it for the next start() to resume
+                    self._finish(job_id, 'queued', params)
+            elif result.get('status') == 'error':
+                self._finish(job_id, 'failed', params, result=result, error=result.get('message'))
+            else:
+                self._finish(job_id, 'succeeded', params, result=result)
+        finally:
+            with self._lock:
+                self._cancel_events.pop(job_id, None)
+
+job_runner = JobRunner()
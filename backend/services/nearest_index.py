@@ -0,0 +1,238 @@
+import heapq
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from services.camera_events import CameraChange
+
+EARTH_RADIUS_M = 6371008.8
+# Points per KD-tree leaf; leaves are scanned with NumPy
+LEAF_SIZE = 32
+# Patched points are kept outside the tree until they exceed this share of it
+COMPACT_RATIO = 0.05
+COMPACT_MIN = 1000
+
+def lonlat_to_xyz(longitude, latitude) -> np.ndarray:
+    """Unit-sphere coordinates; chord length grows monotonically with great-circle distance"""
+    lon = np.radians(np.asarray(longitude, dtype=float))
+    lat = np.radians(np.asarray(latitude, dtype=float))
+    cos_lat = np.cos(lat)
+    return np.stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)), axis=-1)
+
+def chord_to_meters(chord_sq) -> np.ndarray:
+    """Exact great-circle distance for squared chord lengths on the unit sphere"""
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.minimum(np.sqrt(chord_sq) / 2, 1.0))
+
+def meters_to_chord_sq(meters: float) -> float:
+    angle = min(meters / EARTH_RADIUS_M, math.pi)
+    return (2 * math.sin(angle / 2)) ** 2
+
+class NearestIndex:
+    """k-nearest-camera search over a KD-tree of unit-sphere points.
+
+    The tree is a balanced, implicit binary tree (children of node i are
+    2i+1 and 2i+2) built by median splits along the widest axis; queries walk
+    it best-first by bbox distance. Like ClusterIndex it is built per dataset
+    version and patched with committed CameraChanges: deleted or moved
+    cameras are masked out of the tree and new positions go to a small side
+    table scanned by brute force, until the patches outgrow COMPACT_RATIO of
+    the tree and it is rebuilt from memory.
+    """
+
+    def __init__(self, leaf_size: int = LEAF_SIZE):
+        self.leaf_size = leaf_size
+        self.built = False
+        self.version = None
+        self._lock = threading.Lock()
+        self._status_codes: Dict[str, int] = {}
+        self._set_tree(np.empty(0, dtype=np.int64), np.empty((0, 3)), np.empty(0, dtype=np.int32))
+        self._extra: Dict[int, Tuple[np.ndarray, int]] = {}
+        self._extra_arrays = None
+
+    def _status_code(self, status: str) -> int:
+        code = self._status_codes.get(status)
+        if code is None:
+            code = self._status_codes[status] = len(self._status_codes)
+        return code
+
+    def _set_tree(self, ids: np.ndarray, xyz: np.ndarray, statuses: np.ndarray) -> None:
+        n = len(ids)
+        depth = max(0, math.ceil(math.log2(n / self.leaf_size))) if n > self.leaf_size else 0
+        order = np.arange(n)
+
+        ranges = [(0, n)]
+        for _ in range(depth):
+            next_ranges = []
+            for lo, hi in ranges:
+                mid = (lo + hi) // 2
+                segment = order[lo:hi]
+                points = xyz[segment]
+                axis = int(np.argmax(points.max(axis=0) - points.min(axis=0)))
+                order[lo:hi] = segment[np.argpartition(points[:, axis], mid - lo)]
+                next_ranges += [(lo, mid), (mid, hi)]
+            ranges = next_ranges
+
+        # Points are stored in leaf order so every leaf is a contiguous slice
+        self._ids = ids[order]
+        self._xyz = xyz[order]
+        self._statuses = statuses[order]
+        self._alive = np.ones(n, dtype=bool)
+        self._position = {camera_id: i for i, camera_id in enumerate(self._ids.tolist())}
+        self._first_leaf = 2 ** depth - 1
+        self._leaf_ranges = np.array(ranges, dtype=np.int64)
+
+        node_count = 2 ** (depth + 1) - 1
+        self._node_min = np.full((node_count, 3), np.inf)
+        self._node_max = np.full((node_count, 3), -np.inf)
+        if n:
+            starts = self._leaf_ranges[:, 0]
+            leaves = slice(self._first_leaf, node_count)
+            self._node_min[leaves] = np.minimum.reduceat(self._xyz, starts, axis=0)
+            self._node_max[leaves] = np.maximum.reduceat(self._xyz, starts, axis=0)
+            for level in range(depth - 1, -1, -1):
+                parents = np.arange(2 ** level - 1, 2 ** (level + 1) - 1)
+                self._node_min[parents] = np.minimum(self._node_min[2 * parents + 1], self._node_min[2 * parents + 2])
+                self._node_max[parents] = np.maximum(self._node_max[2 * parents + 1], self._node_max[2 * parents + 2])
+        self._dead = 0
+
+    def build(self, cameras: Iterable[Tuple[int, float, float, str]], version: Optional[int] = None) -> None:
+        """Build from (camera_id, longitude, latitude, status) tuples"""
+        ids, lons, lats, statuses = [], [], [], []
+        for camera_id, longitude, latitude, status in cameras:
+            ids.append(camera_id)
+            lons.append(longitude)
+            lats.append(latitude)
+            statuses.append(status)
+        with self._lock:
+            self._status_codes = {}
+            codes = np.array([self._status_code(status) for status in statuses], dtype=np.int32)
+            self._set_tree(
+                np.array(ids, dtype=np.int64), lonlat_to_xyz(lons, lats).reshape(-1, 3), codes
+            )
+            self._extra = {}
+            self._extra_arrays = None
+            self.built = True
+            self.version = version
+
+    def _remove(self, camera_id: int) -> None:
+        if self._extra.pop(camera_id, None) is not None:
+            self._extra_arrays = None
+            return
+        position = self._position.get(camera_id)
+        if position is not None and self._alive[position]:
+            self._alive[position] = False
+            self._dead += 1
+
+    def apply_changes(self, changes: List[CameraChange], version: Optional[int] = None) -> None:
+        """Patch the index incrementally; ignored until the first build"""
+        with self._lock:
+            if not self.built:
+                return
+            if version is not None and self.version is not None and version != self.version + 1:
+                if version > self.version:
+                    self.built = False
+                return
+            self.version = version
+            for change in changes:
+                self._remove(change.camera_id)
+                if change.new is not None:
+                    self._extra[change.camera_id] = (
+                        lonlat_to_xyz(change.new.longitude, change.new.latitude),
+                        self._status_code(change.new.status)
+                    )
+            self._extra_arrays = None
+
+    def _compact(self) -> None:
+        """Fold the side table into a rebuilt tree once patches pile up"""
+        if len(self._extra) + self._dead <= max(COMPACT_MIN, COMPACT_RATIO * len(self._ids)):
+            return
+        alive = self._alive
+        extra_ids = np.fromiter(self._extra.keys(), dtype=np.int64, count=len(self._extra))
+        extra_xyz = np.array([xyz for xyz, _ in self._extra.values()]).reshape(-1, 3)
+        extra_statuses = np.array([code for _, code in self._extra.values()], dtype=np.int32)
+        self._set_tree(
+            np.concatenate((self._ids[alive], extra_ids)),
+            np.concatenate((self._xyz[alive], extra_xyz)),
+            np.concatenate((self._statuses[alive], extra_statuses))
+        )
+        self._extra = {}
+        self._extra_arrays = None
+
+    def query(
+        self,
+        longitude: float,
+        latitude: float,
+        k: int,
+        status: Optional[str] = None,
+        max_distance_m: Optional[float] = None
+    ) -> List[Tuple[int, float]]:
+        """The k nearest cameras as (camera_id, great-circle metres), nearest first"""
+        target = lonlat_to_xyz(longitude, latitude)
+        limit = meters_to_chord_sq(max_distance_m) if max_distance_m is not None else np.inf
+
+        with self._lock:
+            self._compact()
+            code = None
+            if status is not None:
+                code = self._status_codes.get(status)
+                if code is None:
+                    return []
+
+            # Max-heap (negated) of the best k as (-chord_sq, camera_id)
+            best: List[Tuple[float, int]] = []
+
+            def offer(dist_sq: np.ndarray, ids: np.ndarray) -> None:
+                bound = limit if len(best) < k else min(limit, -best[0][0])
+                keep = dist_sq <= bound
+                if not keep.any():
+                    return
+                dist_sq, ids = dist_sq[keep], ids[keep]
+                if len(dist_sq) > k:
+                    nearest = np.argpartition(dist_sq, k - 1)[:k]
+                    dist_sq, ids = dist_sq[nearest], ids[nearest]
+                for d, camera_id in zip(dist_sq.tolist(), ids.tolist()):
+                    if len(best) < k:
+                        heapq.heappush(best, (-d, camera_id))
+                    elif d < -best[0][0]:
+                        heapq.heapreplace(best, (-d, camera_id))
+
+            if self._extra:
+                if self._extra_arrays is None:
+                    self._extra_arrays = (
+                        np.fromiter(self._extra.keys(), dtype=np.int64, count=len(self._extra)),
+                        np.array([xyz for xyz, _ in self._extra.values()]).reshape(-1, 3),
+                        np.array([c for _, c in self._extra.values()], dtype=np.int32)
+                    )
+                extra_ids, extra_xyz, extra_codes = self._extra_arrays
+                mask = extra_codes == code if code is not None else np.ones(len(extra_ids), dtype=bool)
+                offer(((extra_xyz[mask] - target) ** 2).sum(axis=1), extra_ids[mask])
+
+            if len(self._ids):
+                queue = [(0.0, 0)]
+                while queue:
+                    node_dist, node = heapq.heappop(queue)
+                    if node_dist > limit or (len(best) == k and node_dist > -best[0][0]):
+                        break
+                    if node >= self._first_leaf:
+                        lo, hi = self._leaf_ranges[node - self._first_leaf]
+                        mask = self._alive[lo:hi]
+                        if code is not None:
+                            mask = mask & (self._statuses[lo:hi] == code)
+                        if mask.any():
+                            offer(((self._xyz[lo:hi][mask] - target) ** 2).sum(axis=1), self._ids[lo:hi][mask])
+                        continue
+                    children = np.array([2 * node + 1, 2 * node + 2])
+                    # Squared distance from the target to each child's bbox
+                    gaps = np.maximum(
+                        np.maximum(self._node_min[children] - target, target - self._node_max[children]), 0.0
+                    )
+                    for child, child_dist in zip(children.tolist(), (gaps ** 2).sum(axis=1).tolist()):
+                        heapq.heappush(queue, (child_dist, child))
+
+        ranked = sorted((-d, camera_id) for d, camera_id in best)
+        return [
+            (camera_id, float(meters))
+            for (_, camera_id), meters in zip(ranked, chord_to_meters(np.array([d for d, _ in ranked])).tolist())
+        ]
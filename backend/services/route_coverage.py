@@ -0,0 +1,219 @@
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from database import get_db_connection
+from services.camera_fov import METERS_PER_DEGREE, covering_mask
+from services.camera_service import CAMERA_COLUMNS, _fetch_by_keys, _row_to_feature, build_cameras_query
+
+MAX_ROUTE_VERTICES = int(os.getenv("ROUTE_MAX_VERTICES", "20000"))
+# Coverage is evaluated every this many metres along the route ...
+ROUTE_SAMPLE_STEP = float(os.getenv("ROUTE_SAMPLE_STEP", "10"))
+# ... but never at more points than this (long routes get a coarser step)
+ROUTE_MAX_SAMPLES = int(os.getenv("ROUTE_MAX_SAMPLES", "200000"))
+# The route is probed against the spatial indexes in windows of this length
+ROUTE_PROBE_WINDOW = float(os.getenv("ROUTE_PROBE_WINDOW", "500"))
+
+def parse_route(route: Dict[str, Any]) -> np.ndarray:
+    """(n, 2) lon/lat array from a GeoJSON LineString (or a Feature of one)"""
+    if route.get('type') == 'Feature':
+        route = route.get('geometry') or {}
+    if route.get('type') != 'LineString':
+        raise ValueError("route must be a GeoJSON LineString")
+    try:
+        coordinates = np.array([point[:2] for point in route.get('coordinates', [])], dtype=float)
+    except (TypeError, ValueError):
+        raise ValueError("route coordinates must be [lon, lat] pairs")
+    if coordinates.ndim != 2 or len(coordinates) < 2:
+        raise ValueError("route needs at least two vertices")
+    if len(coordinates) > MAX_ROUTE_VERTICES:
+        raise ValueError(f"route has more than {MAX_ROUTE_VERTICES} vertices")
+    if not (np.all(np.abs(coordinates[:, 0]) <= 180) and np.all(np.abs(coordinates[:, 1]) <= 90)):
+        raise ValueError("route coordinates out of range")
+    return coordinates
+
+def _probe_windows(points: np.ndarray, along: np.ndarray) -> List[np.ndarray]:
+    """Split consecutive route points into windows of about ROUTE_PROBE_WINDOW metres.
+
+    Neighbouring windows share their boundary point so that the bboxes
+    together cover every segment.
+    """
+    window_ids = np.floor(along / ROUTE_PROBE_WINDOW).astype(int)
+    starts = np.flatnonzero(np.diff(window_ids, prepend=-1))
+    # The last point already closes the previous window
+    starts = starts[starts < len(points) - 1]
+    ends = np.append(starts[1:], len(points) - 1)
+    return [np.arange(start, end + 1) for start, end in zip(starts, ends)]
+
+def _window_bbox(points: np.ndarray, margin_m: float = 0.0) -> tuple:
+    min_lon, min_lat = points.min(axis=0)
+    max_lon, max_lat = points.max(axis=0)
+    margin_lat = margin_m / METERS_PER_DEGREE
+    widest_lat = min(max(abs(min_lat), abs(max_lat)) + margin_lat, 89.9)
+    margin_lon = margin_m / (METERS_PER_DEGREE * np.cos(np.radians(widest_lat)))
+    return (min_lon - margin_lon, min_lat - margin_lat, max_lon + margin_lon, max_lat + margin_lat)
+
+def _distance_to_segments(points: np.ndarray, starts: np.ndarray, ends: np.ndarray,
+                          start_along: np.ndarray, x_scale: float) -> tuple:
+    """Distance (m) from each point to the nearest of the segments and the
+    route position (m) of the closest spot on it, all points at once"""
+    scale = np.array([x_scale, METERS_PER_DEGREE])
+    offsets = (points[:, None, :] - starts[None, :, :]) * scale
+    deltas = (ends - starts) * scale
+    lengths_sq = np.maximum((deltas ** 2).sum(axis=1), 1e-12)
+    t = np.clip((offsets * deltas).sum(axis=2) / lengths_sq, 0.0, 1.0)
+    gaps = offsets - t[:, :, None] * deltas
+    dist = np.hypot(gaps[:, :, 0], gaps[:, :, 1])
+    nearest = dist.argmin(axis=1)
+    rows = np.arange(len(points))
+    along = start_along[nearest] + t[rows, nearest] * np.sqrt(lengths_sq[nearest])
+    return dist[rows, nearest], along
+
+def analyze_route_coverage(
+    route: Dict[str, Any],
+    buffer_m: float,
+    status: Optional[str] = None
+) -> Dict[str, Any]:
+    """Cameras along a route and the parts of the route inside some camera's view.
+
+    The route is resampled every ROUTE_SAMPLE_STEP metres. Window by window
+    the camera and field-of-view R*Trees are probed with the window's bbox
+    (grown by buffer_m for cameras), then all candidates of a window are
+    tested at once with NumPy: point-to-segment distances for the corridor,
+    the sector test at the midpoint of every sample step for coverage.
+    Runs of equally covered steps become the returned segments.
+    """
+    vertices = parse_route(route)
+    x_scale = METERS_PER_DEGREE * np.cos(np.radians(vertices[:, 1].mean()))
+    steps = np.hypot(np.diff(vertices[:, 0]) * x_scale, np.diff(vertices[:, 1]) * METERS_PER_DEGREE)
+    vertex_along = np.concatenate(([0.0], np.cumsum(steps)))
+    length = float(vertex_along[-1])
+    if length <= 0:
+        raise ValueError("route has zero length")
+
+    # Sample points: every vertex plus a point every sample step
+    step = max(ROUTE_SAMPLE_STEP, length / ROUTE_MAX_SAMPLES)
+    along = np.union1d(vertex_along, np.arange(0.0, length, step))
+    samples = np.column_stack((
+        np.interp(along, vertex_along, vertices[:, 0]),
+        np.interp(along, vertex_along, vertices[:, 1])
+    ))
+    midpoints = (samples[:-1] + samples[1:]) / 2
+    covered = np.zeros(len(midpoints), dtype=bool)
+    covering_pairs = []
+    # (window, camera ids found by its buffered bbox)
+    corridor_probes = []
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        for window in _probe_windows(samples, along):
+            query, params = build_cameras_query(
+                bbox=_window_bbox(samples[window], buffer_m), status=status, columns="id"
+            )
+            cursor.execute(query, params)
+            found = [row[0] for row in cursor.fetchall()]
+            if found:
+                corridor_probes.append((window, found))
+
+            min_lon, min_lat, max_lon, max_lat = _window_bbox(samples[window])
+            sector_query = """
+                SELECT f.camera_id, f.longitude, f.latitude, f.direction, f.field_of_view, f.range_m
+                FROM camera_fov f
+                JOIN cameras c ON c.id = f.camera_id
+                WHERE f.camera_id IN (
+                    SELECT pkid FROM idx_camera_fov_geometry
+                    WHERE xmin <= ? AND xmax >= ? AND ymin <= ? AND ymax >= ?
+                )
+            """
+            sector_params = [max_lon, min_lon, max_lat, min_lat]
+            if status:
+                sector_query += " AND c.status = ?"
+                sector_params.append(status)
+            cursor.execute(sector_query, sector_params)
+            sectors = cursor.fetchall()
+            if not sectors:
+                continue
+
+            columns = np.array([tuple(row) for row in sectors], dtype=float)
+            steps_in_window = window[:-1]
+            mask, _, _ = covering_mask(
+                midpoints[steps_in_window, 0:1], midpoints[steps_in_window, 1:2],
+                *(column[None, :] for column in columns[:, 1:].T)
+            )
+            covered[steps_in_window] |= mask.any(axis=1)
+            step_index, sector_index = np.nonzero(mask)
+            covering_pairs.append(np.column_stack((
+                steps_in_window[step_index], columns[sector_index, 0].astype(np.int64)
+            )))
+
+        corridor_ids = sorted({camera_id for _, found in corridor_probes for camera_id in found})
+        rows = _fetch_by_keys(
+            cursor, f"SELECT {CAMERA_COLUMNS} FROM cameras WHERE id IN ({{keys}})", corridor_ids
+        )
+
+    # A camera within buffer_m of the route is within buffer_m of a step of a
+    # window that found it, so each camera is only measured against those
+    row_of = {row['id']: index for index, row in enumerate(rows)}
+    positions = np.array([(row['longitude'], row['latitude']) for row in rows], dtype=float)
+    distance = np.full(len(rows), np.inf)
+    position = np.zeros(len(rows))
+    for window, found in corridor_probes:
+        indexes = np.array([row_of[camera_id] for camera_id in found if camera_id in row_of], dtype=int)
+        if not len(indexes):
+            continue
+        dist, pos = _distance_to_segments(
+            positions[indexes], samples[window[:-1]], samples[window[1:]], along[window[:-1]], x_scale
+        )
+        closer = dist < distance[indexes]
+        distance[indexes[closer]] = dist[closer]
+        position[indexes[closer]] = pos[closer]
+
+    # Corridor cameras, ordered along the route
+    cameras = []
+    for index in np.argsort(position, kind='stable').tolist():
+        if distance[index] > buffer_m:
+            continue
+        feature = _row_to_feature(rows[index])
+        feature['properties']['distance_m'] = round(float(distance[index]), 2)
+        feature['properties']['along_m'] = round(float(position[index]), 2)
+        cameras.append(feature)
+
+    # Runs of equally covered steps
+    boundaries = np.flatnonzero(np.diff(covered.astype(np.int8))) + 1
+    run_starts = np.concatenate(([0], boundaries))
+    run_ends = np.concatenate((boundaries, [len(covered)]))
+    run_of_step = np.repeat(np.arange(len(run_starts)), run_ends - run_starts)
+    run_cameras: Dict[int, List[int]] = {}
+    if covering_pairs:
+        pairs = np.concatenate(covering_pairs)
+        pairs = np.unique(np.column_stack((run_of_step[pairs[:, 0]], pairs[:, 1])), axis=0)
+        for run, camera_id in pairs.tolist():
+            run_cameras.setdefault(run, []).append(camera_id)
+
+    segments = []
+    for run, (start, end) in enumerate(zip(run_starts.tolist(), run_ends.tolist())):
+        segments.append({
+            "type": "Feature",
+            "geometry": {"type": "LineString", "coordinates": samples[start:end + 1].tolist()},
+            "properties": {
+                "covered": bool(covered[start]),
+                "start_m": round(float(along[start]), 2),
+                "end_m": round(float(along[end]), 2),
+                "length_m": round(float(along[end] - along[start]), 2),
+                "camera_ids": run_cameras.get(run, [])
+            }
+        })
+
+    covered_length = float(np.diff(along)[covered].sum())
+    return {
+        "length_m": round(length, 2),
+        "covered_length_m": round(covered_length, 2),
+        "coverage_ratio": round(covered_length / length, 4) if length else 0.0,
+        "buffer_m": buffer_m,
+        "cameras": {"type": "FeatureCollection", "features": cameras},
+        "segments": {"type": "FeatureCollection", "features": segments}
+    }
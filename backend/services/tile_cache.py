@@ -0,0 +1,204 @@
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.vector_tiles import point_tile_codes
+
+TileKey = Tuple[int, int, int]
+
+class TileCache:
+    """Bounded tile cache: an in-memory LRU in front of an optional MBTiles file.
+
+    The on-disk file follows the MBTiles layout (TMS row numbering) so it can
+    be inspected with standard tools, and it is bounded by max_disk_tiles with
+    oldest-written-first eviction.
+
+    Tiles belong to a dataset version. The memory tier holds one version:
+    invalidate_points moves it to the next version keeping the tiles the
+    changes did not touch, and a request for any newer version (written by
+    another worker, or before a restart) clears it. Disk rows carry their
+    dataset_version and only answer requests for exactly that version, so a
+    file shared by several workers never serves a tile older than the ETag
+    it is sent with.
+    """
+
+    def __init__(
+        self,
+        max_memory_tiles: int = 2048,
+        mbtiles_path: Optional[str] = None,
+        max_disk_tiles: int = 100000
+    ):
+        self.max_memory_tiles = max_memory_tiles
+        self.max_disk_tiles = max_disk_tiles
+        self.mbtiles_path = mbtiles_path
+        self._memory: "OrderedDict[TileKey, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk: Optional[sqlite3.Connection] = None
+        # Dataset version of the memory tier, None until the first request
+        self.version: Optional[int] = None
+        if mbtiles_path:
+            self._disk = sqlite3.connect(mbtiles_path, check_same_thread=False)
+            self._disk.execute("PRAGMA journal_mode=WAL")
+            self._disk.execute("""
+                CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)
+            """)
+            self._disk.execute("""
+                CREATE TABLE IF NOT EXISTS tiles (
+                    zoom_level INTEGER NOT NULL,
+                    tile_column INTEGER NOT NULL,
+                    tile_row INTEGER NOT NULL,
+                    tile_data BLOB NOT NULL,
+                    dataset_version INTEGER NOT NULL DEFAULT -1,
+                    PRIMARY KEY (zoom_level, tile_column, tile_row)
+                )
+            """)
+            columns = [row[1] for row in self._disk.execute("PRAGMA table_info(tiles)")]
+            if "dataset_version" not in columns:
+                # Files from before versioning: their tiles never match a version
+                self._disk.execute("ALTER TABLE tiles ADD COLUMN dataset_version INTEGER NOT NULL DEFAULT -1")
+            self._disk.execute("CREATE INDEX IF NOT EXISTS tiles_dataset_version ON tiles(dataset_version)")
+            self._disk.executemany(
+                "INSERT OR IGNORE INTO metadata (name, value) VALUES (?, ?)",
+                [("name", "cameras"), ("format", "pbf"), ("type", "overlay")]
+            )
+            self._disk.commit()
+
+    @staticmethod
+    def _tms_row(z: int, y: int) -> int:
+        return (2 ** z) - 1 - y
+
+    def _use_memory(self, version: int) -> bool:
+        """Whether the memory tier may serve or store tiles of version"""
+        if self.version == version:
+            return True
+        if self.version is None or version > self.version:
+            # Changes this process never saw: nothing cached can be trusted
+            self._memory.clear()
+            self.version = version
+            return True
+        # A request still on an older version: bypass the cache
+        return False
+
+    def get(self, key: TileKey, version: int) -> Optional[bytes]:
+        with self._lock:
+            use_memory = self._use_memory(version)
+            if use_memory:
+                tile = self._memory.get(key)
+                if tile is not None:
+                    self._memory.move_to_end(key)
+                    return tile
+            if self._disk is None:
+                return None
+            z, x, y = key
+            row = self._disk.execute("""
+                SELECT tile_data FROM tiles
+                WHERE zoom_level = ? AND tile_column = ? AND tile_row = ? AND dataset_version = ?
+            """, (z, x, self._tms_row(z, y), version)).fetchone()
+            if row is None:
+                return None
+            if use_memory:
+                self._remember(key, row[0])
+            return row[0]
+
+    def put(self, key: TileKey, tile: bytes, version: int) -> None:
+        with self._lock:
+            if self._use_memory(version):
+                self._remember(key, tile)
+            if self._disk is None:
+                return
+            z, x, y = key
+            tms_row = self._tms_row(z, y)
+            # Never replace a tile another worker rendered for a newer version
+            self._disk.execute("""
+                DELETE FROM tiles
+                WHERE zoom_level = ? AND tile_column = ? AND tile_row = ? AND dataset_version <= ?
+            """, (z, x, tms_row, version))
+            self._disk.execute("""
+                INSERT OR IGNORE INTO tiles (zoom_level, tile_column, tile_row, tile_data, dataset_version)
+                VALUES (?, ?, ?, ?, ?)
+            """, (z, x, tms_row, tile, version))
+            # rowid grows with every write, so the smallest rowids are the oldest
+            self._disk.execute("""
+                DELETE FROM tiles WHERE rowid IN (
+                    SELECT rowid FROM tiles ORDER BY rowid
+                    LIMIT max(0, (SELECT count(*) FROM tiles) - ?)
+                )
+            """, (self.max_disk_tiles,))
+            self._disk.commit()
+
+    def _remember(self, key: TileKey, tile: bytes) -> None:
+        self._memory[key] = tile
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_tiles:
+            self._memory.popitem(last=False)
+
+    @staticmethod
+    def _touched(keys: List[TileKey], longitude: np.ndarray, latitude: np.ndarray) -> List[TileKey]:
+        """The keys whose buffered extent contains one of the points.
+
+        Only zooms that actually have cached tiles are projected, and the
+        test is a vectorized isin per zoom, so the cost follows the cache
+        size rather than points x every zoom level.
+        """
+        by_zoom: Dict[int, List[TileKey]] = {}
+        for key in keys:
+            by_zoom.setdefault(key[0], []).append(key)
+        touched = []
+        for z, zoom_keys in by_zoom.items():
+            n = 2 ** z
+            codes = np.array([x * n + y for _, x, y in zoom_keys], dtype=np.int64)
+            hit = np.isin(codes, point_tile_codes(longitude, latitude, z))
+            touched.extend(key for key, matched in zip(zoom_keys, hit.tolist()) if matched)
+        return touched
+
+    def invalidate_points(self, longitude: np.ndarray, latitude: np.ndarray, version: int) -> int:
+        """Apply the committed changes of version at the given old/new positions.
+
+        Cached tiles containing a point are dropped and the rest move on to
+        version. When version does not directly follow the cached one the
+        memory tier is cleared instead. Returns how many tiles were dropped.
+        """
+        with self._lock:
+            dropped = 0
+            if self.version is not None and version == self.version + 1:
+                stale = self._touched(list(self._memory), longitude, latitude)
+                for key in stale:
+                    del self._memory[key]
+                dropped += len(stale)
+                self.version = version
+            elif self.version is None or version > self.version:
+                dropped += len(self._memory)
+                self._memory.clear()
+                self.version = version
+
+            if self._disk is not None:
+                dropped += self._invalidate_disk(longitude, latitude, version)
+            return dropped
+
+    def _invalidate_disk(self, longitude: np.ndarray, latitude: np.ndarray, version: int) -> int:
+        # One transaction, so a tile another worker writes meanwhile is either
+        # dropped here or keeps its older version and is never served
+        with self._disk:
+            cursor = self._disk.execute("""
+                SELECT zoom_level, tile_column, tile_row FROM tiles WHERE dataset_version = ?
+            """, (version - 1,))
+            keys = [(z, x, self._tms_row(z, tms_row)) for z, x, tms_row in cursor.fetchall()]
+            stale = self._touched(keys, longitude, latitude)
+            self._disk.executemany("""
+                DELETE FROM tiles
+                WHERE zoom_level = ? AND tile_column = ? AND tile_row = ? AND dataset_version = ?
+            """, [(z, x, self._tms_row(z, y), version - 1) for z, x, y in stale])
+            self._disk.execute(
+                "UPDATE tiles SET dataset_version = ? WHERE dataset_version = ?", (version, version - 1)
+            )
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM tiles")
+                self._disk.commit()
@@ -0,0 +1,157 @@
+import math
+import struct
+from typing import Any, Dict, Iterable, Sequence, Tuple
+
+import numpy as np
+
+EXTENT = 4096
+# Features within this many tile units outside the tile are still encoded so
+# that point symbols are not clipped at tile edges.
+BUFFER = 64
+MAX_ZOOM = 22
+MAX_LATITUDE = 85.05112878
+
+def lonlat_to_unit(lon: float, lat: float) -> Tuple[float, float]:
+    """Project WGS84 to Web Mercator in the unit square (0,0 = north-west)"""
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    u = (lon + 180.0) / 360.0
+    sin_lat = math.sin(math.radians(lat))
+    v = 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    return u, v
+
+def tile_bounds(z: int, x: int, y: int, buffer: int = 0) -> Tuple[float, float, float, float]:
+    """Return (min_lon, min_lat, max_lon, max_lat) of a tile plus buffer"""
+    n = 2 ** z
+    pad = buffer / EXTENT
+
+    def lon(tx: float) -> float:
+        return tx / n * 360.0 - 180.0
+
+    def lat(ty: float) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * ty / n))))
+
+    return (
+        max(-180.0, lon(x - pad)),
+        max(-90.0, lat(y + 1 + pad)),
+        min(180.0, lon(x + 1 + pad)),
+        min(90.0, lat(y - pad)),
+    )
+
+def _points_to_unit(longitude: np.ndarray, latitude: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    lat = np.clip(latitude, -MAX_LATITUDE, MAX_LATITUDE)
+    u = (longitude + 180.0) / 360.0
+    sin_lat = np.sin(np.radians(lat))
+    v = 0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * np.pi)
+    return u, v
+
+def point_tile_codes(
+    longitude: np.ndarray,
+    latitude: np.ndarray,
+    z: int,
+    buffer: int = BUFFER
+) -> np.ndarray:
+    """Sorted unique x * 2**z + y of the zoom z tiles whose buffered extent holds a point"""
+    u, v = _points_to_unit(np.asarray(longitude, dtype=np.float64), np.asarray(latitude, dtype=np.float64))
+    pad = buffer / EXTENT
+    n = 2 ** z
+    fx, fy = u * n, v * n
+    x_lo = np.clip(np.floor(fx - pad), 0, n - 1).astype(np.int64)
+    x_hi = np.clip(np.floor(fx + pad), 0, n - 1).astype(np.int64)
+    y_lo = np.clip(np.floor(fy - pad), 0, n - 1).astype(np.int64)
+    y_hi = np.clip(np.floor(fy + pad), 0, n - 1).astype(np.int64)
+    # The buffer is far smaller than a tile, so each point touches at most
+    # a 2x2 block; collect the four corners and deduplicate.
+    xs = np.concatenate([x_lo, x_hi, x_lo, x_hi])
+    ys = np.concatenate([y_lo, y_lo, y_hi, y_hi])
+    return np.unique(xs * n + ys)
+
+# --- Minimal Mapbox Vector Tile 2.1 protobuf encoder (points only) ---
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        bits = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(bits | 0x80)
+        else:
+            out.append(bits)
+            return bytes(out)
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+def _field(number: int, wire_type: int) -> bytes:
+    return _varint((number << 3) | wire_type)
+
+def _length_delimited(number: int, payload: bytes) -> bytes:
+    return _field(number, 2) + _varint(len(payload)) + payload
+
+def _packed(number: int, values: Sequence[int]) -> bytes:
+    return _length_delimited(number, b''.join(_varint(v) for v in values))
+
+def _encode_value(value: Any) -> bytes:
+    if isinstance(value, bool):
+        return _field(7, 0) + _varint(int(value))
+    if isinstance(value, int):
+        return _field(6, 0) + _varint(_zigzag(value))
+    if isinstance(value, float):
+        return _field(3, 1) + struct.pack('<d', value)
+    return _length_delimited(1, str(value).encode('utf-8'))
+
+def encode_point_layer(
+    name: str,
+    z: int,
+    x: int,
+    y: int,
+    features: Iterable[Dict[str, Any]],
+    buffer: int = BUFFER
+) -> bytes:
+    """Encode point features into a single-layer MVT tile.
+
+    Each feature is a dict with "id", "longitude", "latitude" and
+    "properties"; None property values are omitted.
+    """
+    n = 2 ** z
+    keys: Dict[str, int] = {}
+    values: Dict[Tuple[type, Any], int] = {}
+    encoded_features = []
+
+    for feature in features:
+        u, v = lonlat_to_unit(feature['longitude'], feature['latitude'])
+        px = int(round((u * n - x) * EXTENT))
+        py = int(round((v * n - y) * EXTENT))
+        if not (-buffer <= px <= EXTENT + buffer and -buffer <= py <= EXTENT + buffer):
+            continue
+
+        tags = []
+        for key, value in feature['properties'].items():
+            if value is None:
+                continue
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault((type(value), value), len(values)))
+
+        # MoveTo(1) with a single point, parameters are zigzag deltas from 0,0
+        geometry = [(1 & 0x7) | (1 << 3), _zigzag(px), _zigzag(py)]
+        encoded_features.append(_length_delimited(2, (
+            _field(1, 0) + _varint(feature['id'])
+            + _packed(2, tags)
+            + _field(3, 0) + _varint(1)
+            + _packed(4, geometry)
+        )))
+
+    if not encoded_features:
+        return b''
+
+    layer = bytearray()
+    layer += _field(15, 0) + _varint(2)
+    layer += _length_delimited(1, name.encode('utf-8'))
+    for encoded in encoded_features:
+        layer += encoded
+    for key in keys:
+        layer += _length_delimited(3, key.encode('utf-8'))
+    for (_, value) in values:
+        layer += _length_delimited(4, _encode_value(value))
+    layer += _field(5, 0) + _varint(EXTENT)
+
+    return _length_delimited(3, bytes(layer))
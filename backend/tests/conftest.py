@@ -0,0 +1,42 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import database
+from fake_sheets import FakeSheetsServer
+from services import dataset_version, google_sheets
+
+@pytest.fixture
+def camera_db(tmp_path, monkeypatch):
+    """A fresh, fully migrated database; skipped where SpatiaLite is missing"""
+    monkeypatch.setattr(database, "DATABASE_PATH", str(tmp_path / "cameras.db"))
+    database.close_connections()
+    try:
+        # Some sqlite3 builds cannot load extensions at all
+        conn = database._open_connection()
+        try:
+            conn.execute("SELECT ST_X(MakePoint(1, 2, 4326))")
+        finally:
+            conn.close()
+    except (AttributeError, sqlite3.OperationalError):
+        pytest.skip("SpatiaLite is not available")
+    # The cached version belongs to whichever database was used before
+    monkeypatch.setattr(dataset_version, "_version", None)
+    database.init_database()
+    yield database.DATABASE_PATH
+    database.close_connections()
+
+@pytest.fixture
+def sheets(camera_db, monkeypatch):
+    """A FakeSheetsServer that the Sheets client talks to"""
+    server = FakeSheetsServer().start()
+    monkeypatch.delenv("GOOGLE_OAUTH_ACCESS_TOKEN", raising=False)
+    monkeypatch.setattr(google_sheets, "SHEETS_API_ENDPOINT", server.url)
+    google_sheets.reset_google_sheets_service()
+    yield server
+    google_sheets.reset_google_sheets_service()
+    server.stop()
@@ -0,0 +1,66 @@
+import json
+import re
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+class FakeSheetsServer:
+    """Local stand-in for the Sheets v4 values.get and values:batchGet calls.
+
+    sheets maps spreadsheet id -> tab name -> rows (header row first), and
+    every request path is appended to requests. Point the client at it with
+    services.google_sheets.SHEETS_API_ENDPOINT = server.url.
+    """
+
+    def __init__(self):
+        self.sheets: Dict[str, Dict[str, List[List[Any]]]] = {}
+        self.requests: List[str] = []
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/"
+
+    def values(self, spreadsheet_id: str, range_name: str) -> List[List[Any]]:
+        tab = range_name.split('!')[0].strip("'")
+        return self.sheets.get(spreadsheet_id, {}).get(tab, [])
+
+    def start(self) -> "FakeSheetsServer":
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urllib.parse.urlparse(self.path)
+                fake.requests.append(url.path)
+                batch = re.match(r".*/v4/spreadsheets/([^/]+)/values:batchGet$", url.path)
+                single = re.match(r".*/v4/spreadsheets/([^/]+)/values/(.+)$", url.path)
+                if batch:
+                    ranges = urllib.parse.parse_qs(url.query).get('ranges', [])
+                    body = {"valueRanges": [
+                        {"range": range_name, "values": fake.values(batch.group(1), range_name)}
+                        for range_name in ranges
+                    ]}
+                elif single:
+                    range_name = urllib.parse.unquote(single.group(2))
+                    body = {"range": range_name, "values": fake.values(single.group(1), range_name)}
+                else:
+                    self.send_error(404)
+                    return
+                encoded = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(encoded)))
+                self.end_headers()
+                self.wfile.write(encoded)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
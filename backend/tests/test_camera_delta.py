@@ -0,0 +1,69 @@
+from database import get_db_connection
+from services.camera_service import get_cameras_delta, sync_cameras_from_sheets
+
+SPREADSHEET = "sheet-1"
+RANGES = ["North!A:E", "South!A:E"]
+HEADER = ["Name", "Latitude", "Longitude", "Status", "Type"]
+
+def row(name, status, offset=0.0):
+    return [name, f"{50 + offset}", f"{30 + offset}", status, "Fixed"]
+
+def camera_ids():
+    with get_db_connection() as conn:
+        return {row[0]: row[1] for row in conn.execute("SELECT name, id FROM cameras").fetchall()}
+
+def names(delta):
+    return sorted(feature['properties']['name'] for feature in delta['features'])
+
+def setup_cameras(sheets):
+    sheets.sheets[SPREADSHEET] = {
+        "North": [HEADER, row("B", "Active"), row("D", "Inactive"), row("A", "Active"), row("C", "Inactive")],
+        "South": [HEADER, row("E", "Active", 1)],
+    }
+    sync_cameras_from_sheets(SPREADSHEET, RANGES)
+    return get_cameras_delta("0")["version"], camera_ids()
+
+def test_filtered_deltas_only_delete_cameras_that_were_in_view(sheets):
+    since, ids = setup_cameras(sheets)
+    # A and C deleted, B filtered out, D changed but never in view, F inserted
+    sheets.sheets[SPREADSHEET]["North"] = [HEADER, row("B", "Inactive"), row("D2", "Inactive")]
+    sheets.sheets[SPREADSHEET]["South"].append(row("F", "Inactive", 2))
+    sync_cameras_from_sheets(SPREADSHEET, RANGES)
+
+    active = get_cameras_delta(str(since), status="Active")
+    assert not active["reset"]
+    assert active["features"] == []
+    assert sorted(active["deleted"]) == sorted([ids["A"], ids["B"]])
+
+    inactive = get_cameras_delta(str(since), status="Inactive")
+    assert not inactive["reset"]
+    assert names(inactive) == ["B", "D2", "F"]
+    assert inactive["deleted"] == [ids["C"]]
+
+    everything = get_cameras_delta(str(since))
+    assert names(everything) == ["B", "D2", "F"]
+    assert sorted(everything["deleted"]) == sorted([ids["A"], ids["C"]])
+
+def test_bbox_deltas_use_the_previous_position(sheets):
+    since, ids = setup_cameras(sheets)
+    # E moves out of the box around its old position
+    sheets.sheets[SPREADSHEET]["South"] = [HEADER, row("E", "Active", 5)]
+    sync_cameras_from_sheets(SPREADSHEET, RANGES)
+
+    around_e = get_cameras_delta(str(since), bbox="30.5,50.5,31.5,51.5")
+    assert (around_e["features"], around_e["deleted"], around_e["reset"]) == ([], [ids["E"]], False)
+    around_north = get_cameras_delta(str(since), bbox="29.5,49.5,30.5,50.5")
+    assert (around_north["features"], around_north["deleted"], around_north["reset"]) == ([], [], False)
+
+def test_unknown_previous_state_resets(sheets):
+    since, ids = setup_cameras(sheets)
+    # B leaves the Active view in two steps: only the last step's old state is logged
+    sheets.sheets[SPREADSHEET]["North"][1] = row("B", "Inactive")
+    sync_cameras_from_sheets(SPREADSHEET, RANGES)
+    sheets.sheets[SPREADSHEET]["North"][1] = row("B2", "Inactive")
+    sync_cameras_from_sheets(SPREADSHEET, RANGES)
+
+    delta = get_cameras_delta(str(since), status="Active")
+    assert delta["reset"]
+    assert delta["deleted"] == []
+    assert names(delta) == ["A", "E"]
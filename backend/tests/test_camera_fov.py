@@ -0,0 +1,102 @@
+import math
+import struct
+
+import numpy as np
+
+from services.camera_fov import METERS_PER_DEGREE, covering_mask, sector_polygons
+from services.camera_service import get_covering_cameras, import_cameras_from_file
+
+def offset(longitude, latitude, bearing, meters):
+    """The point meters away from (longitude, latitude) along a compass bearing"""
+    radians = math.radians(bearing)
+    meters_per_lon = METERS_PER_DEGREE * math.cos(math.radians(latitude))
+    return (
+        longitude + meters * math.sin(radians) / meters_per_lon,
+        latitude + meters * math.cos(radians) / METERS_PER_DEGREE
+    )
+
+def covers(camera, point):
+    mask, _, _ = covering_mask(point[0], point[1], *(np.array([value]) for value in camera))
+    return bool(mask[0])
+
+def decode_ring(wkb):
+    _, _, _, count = struct.unpack_from('<BIII', wkb)
+    return np.frombuffer(wkb, dtype='<f8', count=count * 2, offset=13).reshape(-1, 2)
+
+def inside(ring, point):
+    """Ray casting point-in-polygon"""
+    x, y = point
+    result = False
+    for (x0, y0), (x1, y1) in zip(ring[:-1], ring[1:]):
+        if (y0 > y) != (y1 > y) and x < x0 + (y - y0) * (x1 - x0) / (y1 - y0):
+            result = not result
+    return result
+
+def test_points_are_covered_inside_the_sector_only():
+    camera = (30.0, 50.0, 90.0, 60.0, 100.0)
+
+    assert covers(camera, offset(30.0, 50.0, 90, 50))
+    assert covers(camera, offset(30.0, 50.0, 115, 80))
+    assert not covers(camera, offset(30.0, 50.0, 135, 50))
+    assert not covers(camera, offset(30.0, 50.0, 270, 50))
+    assert not covers(camera, offset(30.0, 50.0, 90, 150))
+
+def test_sectors_facing_north_wrap_around_the_bearing():
+    camera = (30.0, 50.0, 350.0, 40.0, 100.0)
+
+    assert covers(camera, offset(30.0, 50.0, 5, 50))
+    assert covers(camera, offset(30.0, 50.0, 335, 50))
+    assert not covers(camera, offset(30.0, 50.0, 30, 50))
+
+def test_full_circles_cover_every_direction():
+    camera = (30.0, 50.0, 0.0, 360.0, 100.0)
+
+    assert all(covers(camera, offset(30.0, 50.0, bearing, 90)) for bearing in range(0, 360, 45))
+
+def test_sectors_cover_points_across_the_antimeridian():
+    camera = (179.9998, 0.0, 90.0, 60.0, 100.0)
+
+    mask, distance, bearing = covering_mask(-179.9998, 0.0, *(np.array([value]) for value in camera))
+    assert mask[0]
+    assert abs(distance[0] - 0.0004 * METERS_PER_DEGREE) < 0.5
+    assert abs(bearing[0] - 90.0) < 0.01
+
+def test_polygons_contain_the_true_sector():
+    cameras = np.array([
+        (30.0, 50.0, 90.0, 60.0, 100.0),
+        (30.0, 50.0, 350.0, 40.0, 50.0),
+        (30.0, 50.0, 0.0, 360.0, 80.0),
+        (179.9998, 0.0, 90.0, 60.0, 100.0),
+    ])
+    polygons = sector_polygons(*cameras.T)
+
+    for camera, wkb in zip(cameras, polygons):
+        ring = decode_ring(wkb)
+        assert np.array_equal(ring[0], ring[-1])
+        lon, lat, _, _, range_m = camera
+        points = [
+            offset(lon, lat, bearing, range_m * fraction)
+            for bearing in np.arange(1.25, 360, 2.5) for fraction in (0.05, 0.5, 0.99)
+        ]
+        for point in points:
+            if covers(tuple(camera), point):
+                assert inside(ring, point)
+
+    # The antimeridian sector is stored past +180, not wrapped
+    assert decode_ring(polygons[-1])[:, 0].max() > 180.0
+
+def test_covering_cameras_are_found_through_the_index(camera_db):
+    import_cameras_from_file([
+        {"name": "East", "longitude": 30.0, "latitude": 50.0, "direction": 90, "field_of_view": 60},
+        {"name": "West", "longitude": 30.0, "latitude": 50.0, "direction": 270, "field_of_view": 60},
+        {"name": "Far", "longitude": 30.01, "latitude": 50.0, "direction": 270, "field_of_view": 60},
+        {"name": "Dateline", "longitude": 179.9998, "latitude": 0.0, "direction": 90, "field_of_view": 60},
+    ])
+
+    point = offset(30.0, 50.0, 90, 50)
+    features = get_covering_cameras(*point)["features"]
+    assert [feature["properties"]["name"] for feature in features] == ["East"]
+    assert abs(features[0]["properties"]["distance_m"] - 50) < 0.5
+
+    features = get_covering_cameras(-179.9998, 0.0)["features"]
+    assert [feature["properties"]["name"] for feature in features] == ["Dateline"]
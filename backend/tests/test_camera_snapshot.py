@@ -0,0 +1,98 @@
+import random
+
+import pytest
+
+from services.camera_snapshot import CameraSnapshot, write_snapshot
+
+STATUSES = ["Active", "Inactive", "Maintenance"]
+TYPES = ["Fixed", "PTZ", "Dome"]
+
+@pytest.fixture(scope="module")
+def rows():
+    rng = random.Random(11)
+    rows = []
+    for camera_id in rng.sample(range(1, 100_000), 4000):
+        # Most cameras in one city, so that grid cells hold many of them
+        if rng.random() < 0.8:
+            lon, lat = 30.52 + rng.gauss(0, 0.05), 50.45 + rng.gauss(0, 0.05)
+        else:
+            lon, lat = rng.uniform(-180, 180), rng.uniform(-85, 85)
+        rows.append((
+            camera_id,
+            f"Камера {camera_id}",
+            rng.choice(STATUSES),
+            rng.choice(TYPES),
+            rng.choice([None, "", f"Note {camera_id}"]),
+            rng.choice([None, rng.uniform(0, 360)]),
+            rng.choice([None, 90.0]),
+            lon,
+            lat,
+        ))
+    # Exactly on cell edges and on the bbox edges used below
+    rows.append((100_001, "Edge", "Active", "Fixed", None, None, None, 30.5, 50.4))
+    rows.append((100_002, "Corner", "Active", "PTZ", None, None, None, 30.6, 50.5))
+    # No geometry: only found without a bbox
+    rows.append((100_003, "Unplaced", "Active", "Fixed", None, None, None, None, None))
+    return rows
+
+@pytest.fixture(scope="module")
+def snapshot(rows, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("snapshots") / "cameras-7.snap")
+    write_snapshot(rows, 7, path, cell_degrees=0.01)
+    return CameraSnapshot(path)
+
+def expected_ids(rows, bbox=None, status=None, camera_type=None):
+    matches = []
+    for camera_id, _, row_status, row_type, _, _, _, lon, lat in rows:
+        if bbox and (lon is None or not (bbox[0] <= lon <= bbox[2] and bbox[1] <= lat <= bbox[3])):
+            continue
+        if status and row_status != status:
+            continue
+        if camera_type and row_type != camera_type:
+            continue
+        matches.append(camera_id)
+    return sorted(matches)
+
+@pytest.mark.parametrize("bbox, status, camera_type", [
+    (None, None, None),
+    ((30.5, 50.4, 30.6, 50.5), None, None),
+    ((30.5, 50.4, 30.6, 50.5), "Active", None),
+    ((30.5, 50.4, 30.6, 50.5), "Inactive", "PTZ"),
+    ((30.5234, 50.4411, 30.5235, 50.4412), None, None),
+    ((-180, -90, 180, 90), None, "Dome"),
+    ((0, 0, 60, 60), None, None),
+    ((30.6, 50.5, 30.5, 50.4), None, None),
+    (None, "Unknown", None),
+])
+def test_queries_match_a_scan(snapshot, rows, bbox, status, camera_type):
+    positions = snapshot.query(bbox, status, camera_type)
+    assert snapshot.ids[positions].tolist() == expected_ids(rows, bbox, status, camera_type)
+
+def test_features_and_columnar_rows(snapshot, rows):
+    by_id = {row[0]: row for row in rows}
+    positions = snapshot.query(None, "Active")
+    assert len(positions) > 1000
+
+    for feature in snapshot.features(positions):
+        camera_id, name, status, camera_type, description, direction, fov, lon, lat = by_id[feature["properties"]["id"]]
+        assert feature == {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [lon, lat]},
+            "properties": {
+                "id": camera_id,
+                "name": name,
+                "status": status,
+                "camera_type": camera_type,
+                "description": description,
+                "direction": direction,
+                "field_of_view": fov,
+            },
+        }
+
+    for camera_id, lon, lat, direction, fov, status, camera_type in snapshot.columnar_rows(positions):
+        row = by_id[camera_id]
+        assert (lon, lat, direction, fov, status, camera_type) == (row[7], row[8], row[5], row[6], row[2], row[3])
+
+def test_header(snapshot, rows):
+    assert (snapshot.version, snapshot.count, snapshot.cell_degrees) == (7, len(rows), 0.01)
+    assert sorted(snapshot.status_labels) == STATUSES
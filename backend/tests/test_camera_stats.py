@@ -0,0 +1,111 @@
+import sqlite3
+
+import numpy as np
+
+import database
+from database import get_db_writer
+from services import camera_stats
+from services.camera_events import CameraChange, CameraState
+from services.camera_service import get_camera_stats, import_cameras_from_file, sync_cameras_from_sheets
+from services.camera_stats import apply_stats_changes, cell_range, rebuild_camera_stats, select_level
+
+def random_states(rng, count):
+    return [
+        CameraState(
+            float(rng.uniform(-10.0, 40.0)), float(rng.uniform(35.0, 60.0)),
+            str(rng.choice(["Active", "Inactive"])), str(rng.choice(["Fixed", "PTZ", "Dome"])), None, None
+        )
+        for _ in range(count)
+    ]
+
+def stats_table():
+    conn = sqlite3.connect(":memory:")
+    database._migrate_camera_stats(conn.cursor())
+    return conn
+
+def grid_rows(conn):
+    return conn.execute("SELECT * FROM camera_grid_stats ORDER BY level, cell_x, cell_y, status, camera_type").fetchall()
+
+def test_incremental_counts_match_a_full_rebuild():
+    rng = np.random.default_rng(3)
+    conn = stats_table()
+    states = {}
+    next_id = 0
+    for _ in range(5):
+        changes = []
+        for state in random_states(rng, 200):
+            changes.append(CameraChange(next_id, None, state))
+            states[next_id] = state
+            next_id += 1
+        for camera_id in rng.choice(sorted(states), size=60, replace=False).tolist():
+            if rng.random() < 0.5:
+                changes.append(CameraChange(camera_id, states.pop(camera_id), None))
+            else:
+                (new,) = random_states(rng, 1)
+                changes.append(CameraChange(camera_id, states[camera_id], new))
+                states[camera_id] = new
+        apply_stats_changes(conn.cursor(), changes)
+
+    rebuilt = stats_table()
+    apply_stats_changes(rebuilt.cursor(), [CameraChange(i, None, state) for i, state in states.items()])
+
+    assert grid_rows(conn) == grid_rows(rebuilt)
+    assert all(row[-1] > 0 for row in grid_rows(conn))
+    totals = conn.execute("SELECT SUM(count) FROM camera_grid_stats WHERE level = 0").fetchone()[0]
+    assert totals == len(states)
+
+def test_a_round_trip_leaves_no_rows():
+    conn = stats_table()
+    states = random_states(np.random.default_rng(4), 50)
+    apply_stats_changes(conn.cursor(), [CameraChange(i, None, state) for i, state in enumerate(states)])
+    apply_stats_changes(conn.cursor(), [CameraChange(i, state, None) for i, state in enumerate(states)])
+
+    assert grid_rows(conn) == []
+
+def test_levels_are_chosen_by_cell_budget_and_zoom(monkeypatch):
+    monkeypatch.setattr(camera_stats, "STATS_LEVELS", [0, 4, 8, 12])
+    monkeypatch.setattr(camera_stats, "STATS_MAX_CELLS", 64)
+    monkeypatch.setattr(camera_stats, "STATS_DETAIL", 4)
+
+    assert cell_range(0, None) == (0, 0, 0, 0)
+    # The whole world has 256 cells at level 4, more than the budget
+    assert select_level(None, None)[0] == 0
+    city = (30.4, 50.3, 30.7, 50.6)
+    level, (min_x, min_y, max_x, max_y) = select_level(city, None)
+    assert level == 12 and (max_x - min_x + 1) * (max_y - min_y + 1) <= 64
+    assert select_level(city, 5)[0] == 8
+
+def sheet_rows(states):
+    return [["Name", "Latitude", "Longitude", "Status", "Type"]] + [
+        [f"Camera {i}", str(state.latitude), str(state.longitude), state.status, state.camera_type]
+        for i, state in enumerate(states)
+    ]
+
+def test_stats_after_writes_match_a_rebuild(sheets):
+    rng = np.random.default_rng(5)
+    states = random_states(rng, 300)
+    sheets.sheets["sheet-1"] = {"Sheet1": sheet_rows(states)}
+    sync_cameras_from_sheets("sheet-1")
+
+    # Moves, status changes and deletions through the sync, then an import
+    states = [
+        random_states(rng, 1)[0] if i % 5 == 0 else state._replace(status="Inactive") if i % 5 == 1 else state
+        for i, state in enumerate(states[:250])
+    ]
+    sheets.sheets["sheet-1"] = {"Sheet1": sheet_rows(states)}
+    sync_cameras_from_sheets("sheet-1")
+    import_cameras_from_file([
+        {"name": f"Imported {i}", "longitude": state.longitude, "latitude": state.latitude,
+         "status": state.status, "type": state.camera_type}
+        for i, state in enumerate(random_states(rng, 100))
+    ])
+
+    stats = get_camera_stats()
+    with get_db_writer() as conn:
+        incremental = grid_rows(conn)
+        rebuild_camera_stats(conn.cursor())
+        assert grid_rows(conn) == incremental
+        conn.rollback()
+
+    assert stats["total"] == 350
+    assert sum(cell["count"] for cell in stats["cells"]) == 350
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from services.camera_events import CameraChange, CameraState
+from services.cluster_index import ClusterIndex
+
+def random_states(rng, count):
+    return [
+        CameraState(
+            float(rng.uniform(30.0, 31.0)), float(rng.uniform(50.0, 51.0)),
+            str(rng.choice(["Active", "Inactive"])), str(rng.choice(["Fixed", "PTZ"])), None, None
+        )
+        for _ in range(count)
+    ]
+
+def by_cell(clusters):
+    return {tuple(cluster["cell"]): cluster for cluster in clusters}
+
+def assert_same_clusters(actual, expected):
+    actual, expected = by_cell(actual), by_cell(expected)
+    assert actual.keys() == expected.keys()
+    for cell, cluster in expected.items():
+        assert actual[cell]["count"] == cluster["count"]
+        assert actual[cell]["status_counts"] == cluster["status_counts"]
+        assert actual[cell]["camera_type_counts"] == cluster["camera_type_counts"]
+        assert actual[cell]["longitude"] == pytest.approx(cluster["longitude"])
+        assert actual[cell]["latitude"] == pytest.approx(cluster["latitude"])
+
+def test_clusters_aggregate_every_camera():
+    states = random_states(np.random.default_rng(1), 500)
+    index = ClusterIndex()
+    index.build(states)
+
+    for zoom in (0, 5, 10, 15):
+        clusters = index.query(zoom)
+        assert sum(cluster["count"] for cluster in clusters) == 500
+    (world,) = index.query(0)
+    assert world["longitude"] == pytest.approx(np.mean([state.longitude for state in states]))
+    assert world["status_counts"]["Active"] == sum(state.status == "Active" for state in states)
+
+def test_patches_match_a_rebuild():
+    rng = np.random.default_rng(2)
+    states = dict(enumerate(random_states(rng, 300)))
+    index = ClusterIndex()
+    index.build(states.values(), version=1)
+
+    changes = []
+    for camera_id in range(0, 300, 3):
+        changes.append(CameraChange(camera_id, states[camera_id], None))
+        del states[camera_id]
+    for camera_id, new in zip(range(1, 300, 3), random_states(rng, 100)):
+        changes.append(CameraChange(camera_id, states[camera_id], new))
+        states[camera_id] = new
+    for camera_id, new in zip(range(300, 350), random_states(rng, 50)):
+        changes.append(CameraChange(camera_id, None, new))
+        states[camera_id] = new
+    index.apply_changes(changes, version=2)
+
+    rebuilt = ClusterIndex()
+    rebuilt.build(states.values())
+    for zoom in (0, 4, 8, 12, 15):
+        assert_same_clusters(index.query(zoom), rebuilt.query(zoom))
+
+def test_queries_filter_by_bbox_status_and_type():
+    states = [
+        CameraState(30.1, 50.1, "Active", "Fixed", None, None),
+        CameraState(30.1, 50.1, "Inactive", "PTZ", None, None),
+        CameraState(35.0, 45.0, "Active", "Fixed", None, None),
+    ]
+    index = ClusterIndex()
+    index.build(states)
+
+    (cluster,) = index.query(12, bbox=(30.0, 50.0, 30.2, 50.2))
+    assert cluster["count"] == 2
+    assert (cluster["longitude"], cluster["latitude"]) == pytest.approx((30.1, 50.1))
+    (cluster,) = index.query(12, bbox=(30.0, 50.0, 30.2, 50.2), status="Inactive")
+    assert cluster["camera_type_counts"] == {"PTZ": 1}
+    assert sum(cluster["count"] for cluster in index.query(3, camera_type="Fixed")) == 2
+
+def test_a_skipped_version_forces_a_rebuild():
+    state = CameraState(30.0, 50.0, "Active", "Fixed", None, None)
+    index = ClusterIndex()
+    index.build([state], version=5)
+
+    # Already applied: ignored
+    index.apply_changes([CameraChange(1, state, None)], version=5)
+    assert index.built and index.query(0)[0]["count"] == 1
+
+    index.apply_changes([CameraChange(2, None, state)], version=7)
+    assert not index.built
@@ -0,0 +1,52 @@
+import json
+import math
+import struct
+
+import numpy as np
+
+from services.columnar import ALIGNMENT, FORMAT_VERSION, MAGIC, encode_camera_columns
+
+def decode(payload):
+    """Header and arrays of a columnar payload, read the way a browser would"""
+    assert payload[:4] == MAGIC
+    (length,) = struct.unpack('<I', payload[4:8])
+    header = json.loads(payload[8:8 + length])
+    arrays = {}
+    for spec in header["arrays"]:
+        assert spec["offset"] % ALIGNMENT == 0
+        array = np.frombuffer(payload, dtype=np.dtype(spec["dtype"]).newbyteorder('<'),
+                              count=spec["length"], offset=spec["offset"])
+        arrays[spec["name"]] = array.reshape(-1, spec["size"]) if spec["size"] > 1 else array
+    return header, arrays
+
+def test_rows_round_trip():
+    rows = [
+        (3, 30.5, 50.25, 90.0, 60.0, "Active", "Fixed"),
+        (1, -122.4194, 37.7749, None, None, "Inactive", "PTZ"),
+        (2, 0.0, 0.0, 359.5, 120.0, "Active", "Dome"),
+    ]
+
+    header, arrays = decode(encode_camera_columns(rows))
+
+    assert (header["version"], header["count"]) == (FORMAT_VERSION, 3)
+    assert arrays["ids"].tolist() == [3, 1, 2]
+    assert arrays["positions"].tolist() == [[30.5, 50.25], [-122.4194, 37.7749], [0.0, 0.0]]
+    assert arrays["direction"][0] == 90.0 and math.isnan(arrays["direction"][1])
+    assert arrays["field_of_view"].tolist()[2] == 120.0 and math.isnan(arrays["field_of_view"][1])
+    statuses = header["dictionaries"]["status"]
+    types = header["dictionaries"]["camera_type"]
+    assert [statuses[code] for code in arrays["status"]] == ["Active", "Inactive", "Active"]
+    assert [types[code] for code in arrays["camera_type"]] == ["Fixed", "PTZ", "Dome"]
+
+def test_large_dictionaries_widen_the_codes():
+    rows = [(i, 0.0, 0.0, None, None, f"status {i}", "Fixed") for i in range(300)]
+
+    header, arrays = decode(encode_camera_columns(rows))
+
+    assert arrays["status"].dtype == np.uint16
+    assert [header["dictionaries"]["status"][code] for code in arrays["status"]] == [row[5] for row in rows]
+
+def test_empty_payload():
+    header, arrays = decode(encode_camera_columns([]))
+    assert header["count"] == 0
+    assert all(len(array) == 0 for array in arrays.values())
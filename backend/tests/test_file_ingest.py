@@ -0,0 +1,31 @@
+import pandas as pd
+
+from services.file_ingest import iter_camera_frames
+
+def write_csv(path, count):
+    # Every other description spans two lines inside quotes
+    lines = ["Name,Latitude,Longitude,Description"]
+    for i in range(count):
+        description = f'"line one\nline two {i}"' if i % 2 else f"plain {i}"
+        lines.append(f"Camera {i},{50 + i * 0.001},{30 + i * 0.001},{description}")
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+def names(frames):
+    return [name for frame in frames for name in frame["Name"]]
+
+def test_csv_resume_skips_records_not_lines(tmp_path):
+    path = write_csv(tmp_path / "cameras.csv", 10)
+
+    for start_row in (0, 3, 4, 7, 10):
+        assert names(iter_camera_frames(path, chunk_rows=3, start_row=start_row)) == [
+            f"Camera {i}" for i in range(start_row, 10)
+        ]
+
+def test_csv_chunks_are_bounded(tmp_path):
+    path = write_csv(tmp_path / "cameras.csv", 10)
+
+    frames = list(iter_camera_frames(path, chunk_rows=4, start_row=1))
+
+    assert all(isinstance(frame, pd.DataFrame) and len(frame) <= 4 for frame in frames)
+    assert sum(len(frame) for frame in frames) == 9
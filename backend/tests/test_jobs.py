@@ -0,0 +1,132 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from database import get_db_connection, get_db_writer
+from services import jobs
+
+@pytest.fixture
+def runner(camera_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_SPOOL_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(jobs, "JOB_LEASE_SECONDS", 0.4)
+    monkeypatch.setattr(jobs, "JOB_HEARTBEAT_SECONDS", 0.1)
+    ran = []
+    monkeypatch.setitem(jobs.HANDLERS, "sync_sheets", lambda job: ran.append(job.job_id) or {"status": "success"})
+    runner = jobs.JobRunner(workers=1)
+    runner.ran = ran
+    yield runner
+    runner.shutdown()
+
+def insert_running_job(job_id, owner, heartbeat_at):
+    with get_db_writer() as conn:
+        conn.execute("""
+            INSERT INTO jobs (id, kind, status, params, attempts, owner, heartbeat_at)
+            VALUES (?, 'sync_sheets', 'running', ?, 1, ?, ?)
+        """, (job_id, json.dumps({"spreadsheet_ids": ["x"]}), owner, heartbeat_at))
+        conn.commit()
+
+def job_row(job_id):
+    with get_db_connection() as conn:
+        return conn.execute("SELECT status, owner FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+
+def test_only_expired_leases_are_recovered(runner):
+    insert_running_job("live", "other", time.time() + 60)
+    insert_running_job("expired", "other", time.time() - 60)
+    insert_running_job("unleased", None, None)
+
+    runner.start()
+    wait_for(lambda: job_row("expired")[0] == "succeeded" and job_row("unleased")[0] == "succeeded")
+
+    assert sorted(runner.ran) == ["expired", "unleased"]
+    assert tuple(job_row("live")) == ("running", "other")
+
+def test_a_lease_is_taken_over_once_it_expires(runner):
+    insert_running_job("stalled", "other", time.time())
+    runner.start()
+    assert job_row("stalled")[0] == "running"
+
+    # No heartbeat from "other", so the runner's own heartbeat loop takes it over
+    wait_for(lambda: job_row("stalled")[0] == "succeeded")
+    assert runner.ran == ["stalled"]
+
+def test_a_dead_runner_in_the_same_process_loses_its_lease(runner):
+    # A restarted container usually gets the old PID back; its jobs must not
+    # be renewed by the new runner
+    previous = jobs.JobRunner(workers=1)
+    insert_running_job("orphan", previous.owner, time.time())
+    runner.start()
+
+    wait_for(lambda: job_row("orphan")[0] == "succeeded")
+    assert runner.ran == ["orphan"]
+
+def test_a_checkpoint_after_a_takeover_is_rolled_back(runner, monkeypatch):
+    taken_over = threading.Event()
+    lost = []
+
+    def import_chunk(job):
+        with get_db_writer() as conn:
+            conn.execute("UPDATE jobs SET owner = 'other' WHERE id = ?", (job.job_id,))
+            conn.commit()
+        try:
+            job.report(100, 100, 0)
+        except jobs.JobLeaseLost:
+            lost.append(job.job_id)
+        taken_over.set()
+        return {"status": "success"}
+
+    monkeypatch.setitem(jobs.HANDLERS, "import_file", import_chunk)
+    runner.start()
+    job_id = runner.submit("import_file", {"path": ""})
+    taken_over.wait(5)
+
+    assert lost == [job_id]
+    with get_db_connection() as conn:
+        row = conn.execute("SELECT rows_processed, rows_added FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    assert tuple(row) == (0, 0)
+    # The new owner finishes it; this runner's result is dropped
+    assert tuple(job_row(job_id)) == ("running", "other")
+
+def test_running_jobs_keep_their_lease(runner, monkeypatch):
+    release = threading.Event()
+
+    def slow(job):
+        release.wait(5)
+        return {"status": "success"}
+
+    monkeypatch.setitem(jobs.HANDLERS, "import_file", slow)
+    runner.start()
+    job_id = runner.submit("import_file", {"path": ""})
+    wait_for(lambda: job_row(job_id)[0] == "running")
+
+    time.sleep(jobs.JOB_LEASE_SECONDS * 3)
+    assert tuple(job_row(job_id)) == ("running", runner.owner)
+    release.set()
+    wait_for(lambda: job_row(job_id)[0] == "succeeded")
+
+@pytest.mark.parametrize("statuses, job_status, result_status", [
+    (["error", "error"], "failed", "error"),
+    (["success", "error"], "succeeded", "partial"),
+])
+def test_multi_spreadsheet_status_follows_the_syncs(runner, monkeypatch, statuses, job_status, result_status):
+    monkeypatch.setitem(jobs.HANDLERS, "sync_sheets", jobs._run_sync_sheets)
+    monkeypatch.setattr(jobs, "sync_many_spreadsheets", lambda ids, ranges: {
+        spreadsheet_id: {"status": status, "message": "boom"} if status == "error" else {"status": status}
+        for spreadsheet_id, status in zip(ids, statuses)
+    })
+    runner.start()
+    job_id = runner.submit("sync_sheets", {"spreadsheet_ids": ["a", "b"]})
+    wait_for(lambda: job_row(job_id)[0] not in ("queued", "running"))
+
+    assert job_row(job_id)[0] == job_status
+    with get_db_connection() as conn:
+        result = json.loads(conn.execute("SELECT result FROM jobs WHERE id = ?", (job_id,)).fetchone()[0])
+    assert result["status"] == result_status
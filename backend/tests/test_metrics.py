@@ -0,0 +1,26 @@
+import sqlite3
+
+from utils.metrics import SQL_ROWS, TimedConnection, statement_label
+
+SQL = "SELECT value FROM numbers WHERE value < ?"
+
+def recorded_rows():
+    with SQL_ROWS._lock:
+        entry = SQL_ROWS._values.get((statement_label(SQL),))
+        return (entry[1][0], entry[1][1]) if entry else (0.0, 0)
+
+def test_iterated_rows_are_counted():
+    conn = sqlite3.connect(":memory:", factory=TimedConnection)
+    conn.execute("CREATE TABLE numbers (value INTEGER)")
+    conn.executemany("INSERT INTO numbers VALUES (?)", [(i,) for i in range(100)])
+    total, count = recorded_rows()
+
+    assert [row[0] for row in conn.execute(SQL, (40,))] == list(range(40))
+    assert recorded_rows() == (total + 40, count + 1)
+
+    cursor = conn.cursor()
+    cursor.execute(SQL, (10,))
+    assert next(cursor)[0] == 0
+    assert cursor.fetchmany(4) == [(1,), (2,), (3,), (4,)]
+    cursor.close()
+    assert recorded_rows() == (total + 45, count + 2)
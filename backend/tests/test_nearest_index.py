@@ -0,0 +1,104 @@
+import math
+import random
+
+import pytest
+
+from services.camera_events import CameraChange, CameraState
+from services import nearest_index
+from services.nearest_index import EARTH_RADIUS_M, NearestIndex
+
+def haversine(lon1, lat1, lon2, lat2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi, d_lambda = phi2 - phi1, math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+def brute_force(cameras, longitude, latitude, k, status=None, max_distance_m=None):
+    ranked = sorted(
+        (haversine(longitude, latitude, lon, lat), camera_id)
+        for camera_id, (lon, lat, camera_status) in cameras.items()
+        if status is None or camera_status == status
+    )
+    if max_distance_m is not None:
+        ranked = [item for item in ranked if item[0] <= max_distance_m]
+    return ranked[:k]
+
+def assert_same(result, expected):
+    assert [camera_id for camera_id, _ in result] == [camera_id for _, camera_id in expected]
+    for (_, meters), (expected_meters, _) in zip(result, expected):
+        assert meters == pytest.approx(expected_meters, rel=1e-9, abs=1e-3)
+
+def random_cameras(rng, count, start=0):
+    return {
+        camera_id: (rng.uniform(-180, 180), math.degrees(math.asin(rng.uniform(-1, 1))), rng.choice(["Active", "Inactive"]))
+        for camera_id in range(start, start + count)
+    }
+
+QUERIES = [(0.0, 0.0), (179.9, 10.0), (-179.95, -10.0), (12.5, 89.9), (-70.0, -89.5), (30.52, 50.45)]
+
+@pytest.fixture
+def cameras():
+    rng = random.Random(4)
+    cameras = random_cameras(rng, 3000)
+    # A dense cluster, so that neighbours are much closer than a leaf's extent
+    cameras.update({
+        3000 + i: (30.5 + rng.uniform(-0.01, 0.01), 50.45 + rng.uniform(-0.01, 0.01), "Active")
+        for i in range(200)
+    })
+    return cameras
+
+def build(cameras):
+    index = NearestIndex(leaf_size=16)
+    index.build(((camera_id, lon, lat, status) for camera_id, (lon, lat, status) in cameras.items()), version=1)
+    return index
+
+def test_matches_brute_force(cameras):
+    index = build(cameras)
+    for longitude, latitude in QUERIES:
+        assert_same(index.query(longitude, latitude, 10), brute_force(cameras, longitude, latitude, 10))
+        assert_same(
+            index.query(longitude, latitude, 5, status="Inactive"),
+            brute_force(cameras, longitude, latitude, 5, status="Inactive")
+        )
+        assert_same(
+            index.query(longitude, latitude, 50, max_distance_m=500_000),
+            brute_force(cameras, longitude, latitude, 50, max_distance_m=500_000)
+        )
+    assert index.query(0.0, 0.0, 3, status="Unknown") == []
+
+# Patches stay in the side table, or are folded into a rebuilt tree
+@pytest.mark.parametrize("compact_min", [1000, 10])
+def test_matches_brute_force_after_changes(cameras, compact_min, monkeypatch):
+    monkeypatch.setattr(nearest_index, "COMPACT_MIN", compact_min)
+    index = build(cameras)
+    rng = random.Random(9)
+
+    def state(lon, lat, status):
+        return CameraState(lon, lat, status, "Fixed", None, None)
+
+    changes = []
+    for camera_id in rng.sample(sorted(cameras), 300):
+        old = state(*cameras[camera_id])
+        if rng.random() < 0.5:
+            del cameras[camera_id]
+            changes.append(CameraChange(camera_id, old, None))
+        else:
+            cameras[camera_id] = (rng.uniform(-180, 180), rng.uniform(-80, 80), "Inactive")
+            changes.append(CameraChange(camera_id, old, state(*cameras[camera_id])))
+    added = random_cameras(rng, 100, start=10_000)
+    cameras.update(added)
+    changes.extend(CameraChange(camera_id, None, state(*added[camera_id])) for camera_id in added)
+    index.apply_changes(changes, version=2)
+
+    assert index.version == 2
+    for longitude, latitude in QUERIES:
+        assert_same(index.query(longitude, latitude, 20), brute_force(cameras, longitude, latitude, 20))
+        assert_same(
+            index.query(longitude, latitude, 20, status="Inactive"),
+            brute_force(cameras, longitude, latitude, 20, status="Inactive")
+        )
+
+def test_a_version_gap_invalidates_the_index(cameras):
+    index = build(cameras)
+    index.apply_changes([CameraChange(0, None, None)], version=3)
+    assert not index.built
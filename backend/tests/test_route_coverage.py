@@ -0,0 +1,70 @@
+import math
+
+import numpy as np
+import pytest
+
+from services.camera_fov import METERS_PER_DEGREE
+from services.camera_service import import_cameras_from_file
+from services.route_coverage import _distance_to_segments, _probe_windows, analyze_route_coverage, parse_route
+
+def east(longitude, latitude, meters):
+    return longitude + meters / (METERS_PER_DEGREE * math.cos(math.radians(latitude)))
+
+def line(*coordinates):
+    return {"type": "LineString", "coordinates": [list(point) for point in coordinates]}
+
+def test_routes_must_be_line_strings_of_valid_coordinates():
+    assert parse_route({"type": "Feature", "geometry": line((30, 50), (31, 50))}).shape == (2, 2)
+    for route in (
+        {"type": "Point", "coordinates": [30, 50]},
+        line((30, 50)),
+        line((30, 50), (200, 50)),
+        {"type": "LineString", "coordinates": [["a", "b"], [1, 2]]},
+    ):
+        with pytest.raises(ValueError):
+            parse_route(route)
+
+def test_probe_windows_share_their_boundary_points():
+    along = np.arange(0.0, 1234.0, 10.0)
+    points = np.column_stack((along, along))
+
+    windows = _probe_windows(points, along)
+
+    assert windows[0][0] == 0 and windows[-1][-1] == len(points) - 1
+    for previous, window in zip(windows[:-1], windows[1:]):
+        assert previous[-1] == window[0]
+        assert np.array_equal(window, np.arange(window[0], window[-1] + 1))
+
+def test_distances_are_measured_to_the_closest_segment():
+    x_scale = METERS_PER_DEGREE
+    starts = np.array([[0.0, 0.0], [0.001, 0.0]])
+    ends = np.array([[0.001, 0.0], [0.001, 0.001]])
+    points = np.array([[0.0005, 0.0002], [0.0013, 0.0005]])
+
+    distance, along = _distance_to_segments(points, starts, ends, np.array([0.0, 111.32]), x_scale)
+
+    assert np.allclose(distance, [0.0002 * METERS_PER_DEGREE, 0.0003 * METERS_PER_DEGREE])
+    assert np.allclose(along, [0.0005 * METERS_PER_DEGREE, 111.32 + 0.0005 * METERS_PER_DEGREE])
+
+def test_covered_length_follows_the_camera_sector(camera_db):
+    # Facing east along the route: the first 100 m (the default range) past
+    # the camera are covered
+    import_cameras_from_file([
+        {"name": "On route", "longitude": 30.0, "latitude": 50.0, "direction": 90, "field_of_view": 90},
+        {"name": "Far away", "longitude": 30.0, "latitude": 50.01, "direction": 180, "field_of_view": 90},
+    ])
+    route = line((east(30.0, 50.0, -500), 50.0), (east(30.0, 50.0, 500), 50.0))
+
+    result = analyze_route_coverage(route, buffer_m=50)
+
+    assert abs(result["length_m"] - 1000) < 1
+    assert abs(result["covered_length_m"] - 100) <= 10
+    (camera,) = result["cameras"]["features"]
+    assert camera["properties"]["name"] == "On route"
+    assert camera["properties"]["distance_m"] < 1
+    assert abs(camera["properties"]["along_m"] - 500) < 1
+
+    covered = [segment for segment in result["segments"]["features"] if segment["properties"]["covered"]]
+    assert len(covered) == 1
+    assert abs(covered[0]["properties"]["start_m"] - 500) <= 10
+    assert covered[0]["properties"]["camera_ids"] == [camera["properties"]["id"]]
@@ -0,0 +1,112 @@
+from database import get_db_connection
+from services import google_sheets
+from services.camera_service import sync_cameras_from_sheets, sync_many_spreadsheets
+from services.dataset_version import get_dataset_version
+
+SPREADSHEET = "sheet-1"
+HEADER = ["Name", "Latitude", "Longitude", "Status", "Type", "Description", "Direction", "Field of View"]
+
+def camera_rows(count, start=0, status="Active"):
+    return [HEADER] + [
+        [f"Camera {i}", f"{50 + i * 0.001}", f"{30 + i * 0.001}", status, "Fixed", "", "90", "60"]
+        for i in range(start, start + count)
+    ]
+
+def stored_row_ids():
+    with get_db_connection() as conn:
+        rows = conn.execute("SELECT g_sheet_row_id FROM cameras ORDER BY g_sheet_row_id").fetchall()
+    return [row[0] for row in rows]
+
+def test_ranges_are_read_with_one_batch_get(sheets):
+    sheets.sheets[SPREADSHEET] = {"North": camera_rows(3), "South": camera_rows(2, start=10)}
+
+    result = sync_cameras_from_sheets(SPREADSHEET, ["North!A:H", "South!A:H"])
+
+    assert result["added"] == 5
+    assert len(sheets.requests) == 1
+    assert sheets.requests[0].endswith(f"/spreadsheets/{SPREADSHEET}/values:batchGet")
+    assert stored_row_ids() == [
+        "sheet-1:North_2", "sheet-1:North_3", "sheet-1:North_4", "sheet-1:South_2", "sheet-1:South_3"
+    ]
+
+def test_unchanged_rows_are_skipped(sheets):
+    sheets.sheets[SPREADSHEET] = {"Sheet1": camera_rows(4)}
+    sync_cameras_from_sheets(SPREADSHEET)
+    version = get_dataset_version()
+
+    result = sync_cameras_from_sheets(SPREADSHEET)
+    assert (result["added"], result["updated"], result["unchanged"], result["deleted"]) == (0, 0, 4, 0)
+    assert get_dataset_version() == version
+
+    sheets.sheets[SPREADSHEET]["Sheet1"][2][3] = "Inactive"
+    result = sync_cameras_from_sheets(SPREADSHEET)
+    assert (result["added"], result["updated"], result["unchanged"]) == (0, 1, 3)
+    assert get_dataset_version() == version + 1
+    with get_db_connection() as conn:
+        row = conn.execute("SELECT status FROM cameras WHERE g_sheet_row_id = 'sheet-1_3'").fetchone()
+    assert row[0] == "Inactive"
+
+def test_deletes_are_scoped_to_the_synced_ranges(sheets):
+    sheets.sheets[SPREADSHEET] = {
+        "Sheet1": camera_rows(2),
+        "North": camera_rows(3, start=10),
+        "South": camera_rows(2, start=20),
+    }
+    sync_cameras_from_sheets(SPREADSHEET)
+    sync_cameras_from_sheets(SPREADSHEET, ["North!A:H", "South!A:H"])
+    assert len(stored_row_ids()) == 7
+
+    # Syncing North alone only removes the row that left North
+    del sheets.sheets[SPREADSHEET]["North"][-1]
+    result = sync_cameras_from_sheets(SPREADSHEET, ["North!A:H"])
+
+    assert result["deleted"] == 1
+    assert stored_row_ids() == [
+        "sheet-1:North_2", "sheet-1:North_3", "sheet-1:South_2", "sheet-1:South_3", "sheet-1_2", "sheet-1_3"
+    ]
+
+def test_tabs_sharing_a_name_prefix_are_kept_apart(sheets):
+    sheets.sheets[SPREADSHEET] = {"Kyiv": camera_rows(2), "Kyiv_2024": camera_rows(3, start=10)}
+    sync_cameras_from_sheets(SPREADSHEET, ["Kyiv!A:H", "Kyiv_2024!A:H"])
+
+    result = sync_cameras_from_sheets(SPREADSHEET, ["Kyiv!A:H"])
+
+    assert (result["unchanged"], result["deleted"]) == (2, 0)
+    assert len(stored_row_ids()) == 5
+
+def test_any_range_of_the_default_tab_keeps_the_legacy_ids(sheets):
+    sheets.sheets[SPREADSHEET] = {"Sheet1": camera_rows(3)}
+    sync_cameras_from_sheets(SPREADSHEET)
+
+    for range_name in ["Sheet1!A:Z", "'Sheet1'!A:H"]:
+        result = sync_cameras_from_sheets(SPREADSHEET, [range_name])
+        assert (result["added"], result["unchanged"]) == (0, 3)
+    assert stored_row_ids() == ["sheet-1_2", "sheet-1_3", "sheet-1_4"]
+
+def test_an_empty_range_deletes_nothing(sheets):
+    sheets.sheets[SPREADSHEET] = {"North": camera_rows(2), "South": camera_rows(2, start=10)}
+    sync_cameras_from_sheets(SPREADSHEET, ["North!A:H", "South!A:H"])
+
+    sheets.sheets[SPREADSHEET]["South"] = []
+    result = sync_cameras_from_sheets(SPREADSHEET, ["North!A:H", "South!A:H"])
+
+    assert result["deleted"] == 0
+    assert len(stored_row_ids()) == 4
+
+def test_multi_spreadsheet_syncs_reuse_worker_services(sheets, monkeypatch):
+    from googleapiclient import discovery
+    builds = []
+    build = discovery.build
+    monkeypatch.setattr(discovery, "build", lambda *args, **kwargs: builds.append(1) or build(*args, **kwargs))
+    sheets.sheets["sheet-a"] = {"Sheet1": camera_rows(2)}
+    sheets.sheets["sheet-b"] = {"Sheet1": camera_rows(2, start=10)}
+
+    sync_many_spreadsheets(["sheet-a", "sheet-b"])
+    built = len(builds)
+    sync_many_spreadsheets(["sheet-a", "sheet-b"])
+    assert len(builds) == built
+
+    # A reset reaches the pool's threads, not just the caller's
+    google_sheets.reset_google_sheets_service()
+    sync_many_spreadsheets(["sheet-a", "sheet-b"])
+    assert len(builds) > built
@@ -0,0 +1,134 @@
+import struct
+
+import numpy as np
+
+from services.vector_tiles import (
+    EXTENT, encode_point_layer, lonlat_to_unit, point_tile_codes, tile_bounds
+)
+
+def read_varint(data, position):
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, position
+
+def read_fields(data):
+    """(field number, value) pairs of a protobuf message; bytes for length-delimited"""
+    fields, position = [], 0
+    while position < len(data):
+        key, position = read_varint(data, position)
+        number, wire_type = key >> 3, key & 0x7
+        if wire_type == 0:
+            value, position = read_varint(data, position)
+        elif wire_type == 1:
+            value, position = data[position:position + 8], position + 8
+        elif wire_type == 2:
+            length, position = read_varint(data, position)
+            value, position = data[position:position + length], position + length
+        else:
+            raise AssertionError(f"unexpected wire type {wire_type}")
+        fields.append((number, value))
+    return fields
+
+def unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+def packed(data):
+    values, position = [], 0
+    while position < len(data):
+        value, position = read_varint(data, position)
+        values.append(value)
+    return values
+
+def decode_value(data):
+    (number, value), = read_fields(data)
+    if number == 1:
+        return value.decode('utf-8')
+    if number == 3:
+        return struct.unpack('<d', value)[0]
+    if number == 6:
+        return unzigzag(value)
+    if number == 7:
+        return bool(value)
+    raise AssertionError(f"unexpected value field {number}")
+
+def decode_tile(data):
+    """{layer name: {"version", "extent", "features": [(id, properties, (x, y))]}}"""
+    layers = {}
+    for number, layer_data in read_fields(data):
+        assert number == 3
+        fields = read_fields(layer_data)
+        keys = [value.decode('utf-8') for number, value in fields if number == 3]
+        values = [decode_value(value) for number, value in fields if number == 4]
+        features = []
+        for number, feature_data in fields:
+            if number != 2:
+                continue
+            feature = dict(read_fields(feature_data))
+            assert feature[3] == 1  # POINT
+            tags = packed(feature[2])
+            command, x, y = packed(feature[4])
+            assert command == (1 | (1 << 3))  # MoveTo, one point
+            properties = {keys[tags[i]]: values[tags[i + 1]] for i in range(0, len(tags), 2)}
+            features.append((feature[1], properties, (unzigzag(x), unzigzag(y))))
+        layer = dict((number, value) for number, value in fields if number in (1, 5, 15))
+        layers[layer[1].decode('utf-8')] = {"version": layer[15], "extent": layer[5], "features": features}
+    return layers
+
+def tile_position(z, x, y, longitude, latitude):
+    u, v = lonlat_to_unit(longitude, latitude)
+    return round((u * 2 ** z - x) * EXTENT), round((v * 2 ** z - y) * EXTENT)
+
+def test_points_round_trip():
+    z, x, y = 12, 2392, 1382
+    min_lon, min_lat, max_lon, max_lat = tile_bounds(z, x, y)
+    features = [
+        {
+            "id": 7,
+            "longitude": min_lon + (max_lon - min_lon) * 0.25,
+            "latitude": min_lat + (max_lat - min_lat) * 0.75,
+            "properties": {"status": "Active", "direction": 90.5, "count": -3, "online": True, "note": None},
+        },
+        {
+            "id": 8,
+            "longitude": max_lon - 1e-9,
+            "latitude": max_lat - 1e-9,
+            "properties": {"status": "Active"},
+        },
+    ]
+
+    layers = decode_tile(encode_point_layer("cameras", z, x, y, features))
+
+    assert list(layers) == ["cameras"]
+    layer = layers["cameras"]
+    assert (layer["version"], layer["extent"]) == (2, EXTENT)
+    assert layer["features"] == [
+        (7, {"status": "Active", "direction": 90.5, "count": -3, "online": True},
+         tile_position(z, x, y, features[0]["longitude"], features[0]["latitude"])),
+        (8, {"status": "Active"}, tile_position(z, x, y, features[1]["longitude"], features[1]["latitude"])),
+    ]
+
+def test_points_outside_the_buffer_are_dropped():
+    z, x, y = 10, 600, 340
+    min_lon, min_lat, max_lon, max_lat = tile_bounds(z, x, y)
+    pad = (max_lon - min_lon) * 32 / EXTENT
+    inside = {"id": 1, "longitude": max_lon + pad, "latitude": (min_lat + max_lat) / 2, "properties": {}}
+    outside = {"id": 2, "longitude": max_lon + 4 * pad, "latitude": (min_lat + max_lat) / 2, "properties": {}}
+
+    (feature,) = decode_tile(encode_point_layer("cameras", z, x, y, [inside, outside]))["cameras"]["features"]
+    assert feature[0] == 1 and feature[2][0] > EXTENT
+    assert encode_point_layer("cameras", z, x, y, [outside]) == b''
+
+def test_point_tiles_include_buffered_neighbours():
+    z = 8
+    min_lon, min_lat, max_lon, max_lat = tile_bounds(z, 140, 90)
+    longitude = np.array([(min_lon + max_lon) / 2, max_lon - 1e-7])
+    latitude = np.array([(min_lat + max_lat) / 2, (min_lat + max_lat) / 2])
+
+    codes = set(point_tile_codes(longitude, latitude, z).tolist())
+    assert codes == {140 * 2 ** z + 90, 141 * 2 ** z + 90}
+    assert set(point_tile_codes(longitude[:1], latitude[:1], z).tolist()) == {140 * 2 ** z + 90}
@@ -1,9 +1,13 @@
-from passlib.context import CryptContext
-from jose import jwt, JWTError
+# passlib, jose and qrcode are imported on first use: most workers and
+# requests never hash a password or draw a QR code
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+import asyncio
+import multiprocessing
+import os
 import secrets
+import threading
 import pyotp
-import qrcode
 import io
 import base64
 
@@ -11,15 +15,89 @@ SECRET_KEY = secrets.token_urlsafe(32)
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt cost factor (log2 rounds) for new hashes; existing hashes keep theirs
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Worker processes dedicated to password hashing, and how many more calls may
+# wait for one before new requests are turned away
+AUTH_POOL_SIZE = int(os.getenv("AUTH_POOL_SIZE", str(max(1, (os.cpu_count() or 2) // 2))))
+AUTH_QUEUE_DEPTH = int(os.getenv("AUTH_QUEUE_DEPTH", "16"))
+
+_pwd_context = None
+_pwd_context_lock = threading.Lock()
+
+def get_pwd_context():
+    """The bcrypt CryptContext, created on first use"""
+    global _pwd_context
+    if _pwd_context is None:
+        with _pwd_context_lock:
+            if _pwd_context is None:
+                from passlib.context import CryptContext
+                _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+    return _pwd_context
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+class AuthPoolBusy(Exception):
+    """Raised when the password pool already has AUTH_QUEUE_DEPTH calls waiting"""
+
+class PasswordPool:
+    """Process pool for bcrypt with bounded admission.
+
+    At most size + queue_depth calls are in flight; beyond that run() fails
+    immediately with AuthPoolBusy instead of letting latency grow without
+    bound. Processes keep bcrypt off the API worker's cores and GIL. They
+    are spawned rather than forked, because the server process already runs
+    threads (and holds their locks) when the pool starts.
+    """
+
+    def __init__(self, size: int = AUTH_POOL_SIZE, queue_depth: int = AUTH_QUEUE_DEPTH):
+        self.size = size
+        self.queue_depth = queue_depth
+        self._slots = threading.BoundedSemaphore(size + queue_depth)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.size, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    async def run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise AuthPoolBusy()
+        try:
+            future = self._get_executor().submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # Released when the work actually ends: a cancelled request leaves a
+        # running hash behind, and it keeps counting against the limit
+        future.add_done_callback(lambda _: self._slots.release())
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+password_pool = PasswordPool()
+
+async def hash_password_async(password: str) -> str:
+    return await password_pool.run(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_pool.run(verify_password, plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
+    from jose import jwt
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -30,6 +108,7 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     return encoded_jwt
 
 def verify_token(token: str):
+    from jose import jwt, JWTError
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return payload
@@ -49,6 +128,7 @@ def generate_qr_code(secret: str, username: str, issuer: str = "CameraGIS") -> s
         issuer_name=issuer
     )
     
+    import qrcode
     qr = qrcode.QRCode(version=1, box_size=10, border=5)
     qr.add_data(totp_uri)
     qr.make(fit=True)
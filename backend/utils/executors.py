@@ -0,0 +1,48 @@
+import json
+import os
+from functools import partial
+from typing import Any, Callable, Dict, TypeVar
+
+from anyio import CapacityLimiter, to_thread
+
+from database import POOL_SIZE
+
+T = TypeVar("T")
+
+# Maximum number of worker threads per category of blocking work
+CONCURRENCY = {
+    # SQLite reads/writes; more than the pool size would only queue in the pool
+    "db": int(os.getenv("CAMERA_DB_CONCURRENCY", str(POOL_SIZE))),
+    # Password hashing, QR codes, file parsing
+    "cpu": int(os.getenv("CAMERA_CPU_CONCURRENCY", str(os.cpu_count() or 2))),
+    # Whole imports and syncs, which hold the single writer connection anyway
+    "import": int(os.getenv("CAMERA_IMPORT_CONCURRENCY", "2")),
+}
+
+_limiters: Dict[str, CapacityLimiter] = {}
+
+def _limiter(category: str) -> CapacityLimiter:
+    # Created on first use and shared by the whole process, not per event loop
+    limiter = _limiters.get(category)
+    if limiter is None:
+        limiter = _limiters[category] = CapacityLimiter(CONCURRENCY[category])
+    return limiter
+
+async def run_in_pool(category: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run blocking func in a worker thread, bounded by the category's limit"""
+    return await to_thread.run_sync(partial(func, *args, **kwargs), limiter=_limiter(category))
+
+async def run_db(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    return await run_in_pool("db", func, *args, **kwargs)
+
+async def run_cpu(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    return await run_in_pool("cpu", func, *args, **kwargs)
+
+async def run_import(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    return await run_in_pool("import", func, *args, **kwargs)
+
+def encode_json(content: Any) -> bytes:
+    """The body JSONResponse would render, for encoding off the event loop"""
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
@@ -0,0 +1,304 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Bearer token a scraper must send to read /api/metrics; unset disables the endpoint
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+# Request and SQL timing; by default only collected when it can be scraped
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1" if METRICS_TOKEN else "0") != "0"
+# Statements slower than this are printed with their SQL; 0 disables the log
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Histogram:
+    """Prometheus-style cumulative histogram keyed by label values"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # labels -> (per-bucket counts with a trailing +Inf slot, [sum, count])
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0, 0])
+            entry[0][index] += 1
+            entry[1][0] += value
+            entry[1][1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            values = [(labels, list(counts), list(totals)) for labels, (counts, totals) in self._values.items()]
+        for labels, counts, (total, count) in sorted(values):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                bucket_labels = _format_labels(self.labelnames, labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {int(count)}")
+        return lines
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        lines.extend(f"{self.name}{_format_labels(self.labelnames, labels)} {value}" for labels, value in values)
+        return lines
+
+class Gauge:
+    """Value read from a callback at scrape time"""
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], float]):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+
+    def render(self) -> List[str]:
+        try:
+            value = self.read()
+        except Exception as e:
+            print(f"Error reading gauge {self.name}: {e}")
+            return []
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge", f"{self.name} {value}"]
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time from request start to the last response byte",
+    ("method", "route", "status")
+)
+SQL_SECONDS = Histogram(
+    "db_statement_duration_seconds", "Time spent executing and fetching one SQL statement",
+    ("statement",)
+)
+SQL_ROWS = Histogram(
+    "db_statement_rows", "Rows fetched (SELECT) or changed by one SQL statement",
+    ("statement",), buckets=ROW_BUCKETS
+)
+SLOW_QUERIES = Counter("db_slow_statements_total", "Statements slower than SLOW_QUERY_MS", ("statement",))
+SPAN_SECONDS = Histogram("span_duration_seconds", "Time spent in named code phases", ("span",))
+
+_metrics: List = [REQUEST_SECONDS, SPAN_SECONDS, SQL_SECONDS, SQL_ROWS, SLOW_QUERIES]
+
+def register_gauge(name: str, documentation: str, read: Callable[[], float]) -> None:
+    _metrics.append(Gauge(name, documentation, read))
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a named phase of a request or job"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        SPAN_SECONDS.observe(time.perf_counter() - started, name)
+
+# "SELECT ... FROM cameras" -> "select cameras"; keeps the label set small
+_STATEMENT_TABLE = re.compile(
+    r"\b(?:FROM|INTO|UPDATE|TABLE|ON)\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?([A-Za-z_][A-Za-z0-9_]*)",
+    re.IGNORECASE
+)
+
+_statement_labels: Dict[str, str] = {}
+
+def statement_label(sql: str) -> str:
+    label = _statement_labels.get(sql)
+    if label is None:
+        words = sql.split(None, 1)
+        verb = words[0].lower() if words else ""
+        match = _STATEMENT_TABLE.search(sql)
+        label = f"{verb} {match.group(1)}" if match else verb
+        if len(_statement_labels) < 10000:
+            _statement_labels[sql] = label
+    return label
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor recording each statement's execute + fetch time and row count.
+
+    Rows are counted whether they are fetched or iterated. A statement is
+    recorded once its rows are exhausted, or when the cursor runs the next
+    statement, is closed or collected, or its connection is released.
+    """
+
+    _sql: Optional[str] = None
+    _elapsed = 0.0
+    _rows = 0
+
+    def _start(self, sql: str, elapsed: float, rows: int) -> None:
+        self._sql, self._elapsed, self._rows = sql, elapsed, rows
+        self.connection._pending.add(self)
+
+    def finish(self) -> None:
+        sql = self._sql
+        if sql is None:
+            return
+        self._sql = None
+        self.connection._pending.discard(self)
+        label = statement_label(sql)
+        SQL_SECONDS.observe(self._elapsed, label)
+        SQL_ROWS.observe(self._rows, label)
+        if SLOW_QUERY_MS and self._elapsed * 1000 >= SLOW_QUERY_MS:
+            SLOW_QUERIES.inc(label)
+            print(f"Slow query ({self._elapsed * 1000:.1f} ms, {self._rows} rows): {' '.join(sql.split())}")
+
+    def execute(self, sql, parameters=()):
+        self.finish()
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            # DML reports its changed rows; SELECT rows are counted as fetched
+            self._start(sql, time.perf_counter() - started, max(self.rowcount, 0))
+
+    def executemany(self, sql, seq_of_parameters):
+        self.finish()
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._start(sql, time.perf_counter() - started, max(self.rowcount, 0))
+            self.finish()
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._elapsed += time.perf_counter() - started
+        if row is None:
+            self.finish()
+        else:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._elapsed += time.perf_counter() - started
+        self._rows += len(rows)
+        if not rows:
+            self.finish()
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._elapsed += time.perf_counter() - started
+        self._rows += len(rows)
+        self.finish()
+        return rows
+
+    def __next__(self):
+        # for row in cursor: the inherited __iter__ returns the cursor itself
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._elapsed += time.perf_counter() - started
+            self.finish()
+            raise
+        self._elapsed += time.perf_counter() - started
+        self._rows += 1
+        return row
+
+    def close(self):
+        self.finish()
+        super().close()
+
+    def __del__(self):
+        self.finish()
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors (including execute() shortcuts) are TimedCursors"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Weak, so finished-with cursors still reset their statements when collected
+        self._pending = weakref.WeakSet()
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def flush_metrics(self) -> None:
+        """Record statements whose rows were never fully fetched"""
+        for cursor in list(self._pending):
+            cursor.finish()
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency histograms.
+
+    Routes are labelled with their path template (/api/jobs/{job_id}), so
+    ids do not create new series; unmatched paths share one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                scope["method"], getattr(route, "path", "unmatched"), str(status[0])
+            )
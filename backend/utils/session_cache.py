@@ -0,0 +1,86 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+# Bounds how long another worker process keeps accepting a revoked token;
+# 0 turns the cache off
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "5"))
+
+class SessionCache:
+    """Bounded LRU of validated session tokens with a per-entry TTL.
+
+    An entry never outlives its session: the deadline is the earlier of the
+    TTL and the session's expires_at. Logout and 2FA changes must call
+    invalidate() explicitly.
+
+    The cache is per process and invalidate() only reaches the worker that
+    handled the logout. Under several uvicorn/gunicorn workers the others
+    keep accepting a revoked token for up to ttl seconds, so keep the TTL
+    short there (or 0 to disable the cache).
+    """
+
+    def __init__(self, max_entries: int = SESSION_CACHE_SIZE, ttl: float = SESSION_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            deadline, user = entry
+            if deadline <= now:
+                del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return user
+
+    def put(self, token: str, user: Dict[str, Any], expires_at: datetime) -> None:
+        if self.ttl <= 0:
+            return
+        deadline = min(time.time() + self.ttl, expires_at.timestamp())
+        with self._lock:
+            self._entries[token] = (deadline, user)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, token: str) -> None:
+        with self._lock:
+            if self._entries.pop(token, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+session_cache = SessionCache()
@@ -156,6 +156,24 @@ function MapView({ token, onLogout }) {
     })
   }
 
+  // Sync and upload run as background jobs; poll until the job finishes
+  const waitForJob = async (jobId) => {
+    while (true) {
+      const response = await fetch(`/api/jobs/${jobId}`, {
+        headers: {
+          'Authorization': `Bearer ${token}`
+        }
+      })
+      if (!response.ok) throw new Error('Failed to fetch job status')
+
+      const job = await response.json()
+      if (job.status !== 'queued' && job.status !== 'running') return job
+
+      setUploadMessage(`Processing... ${job.rows_processed} rows`)
+      await new Promise((resolve) => setTimeout(resolve, 1000))
+    }
+  }
+
   const handleSyncSheets = async () => {
     if (!spreadsheetId) return
 
@@ -167,8 +185,13 @@ function MapView({ token, onLogout }) {
           'Authorization': `Bearer ${token}`
         }
       })
+      if (!response.ok) throw new Error('Failed to start job')
 
-      const data = await response.json()
+      const { job_id } = await response.json()
+      const job = await waitForJob(job_id)
+      if (job.status !== 'succeeded') throw new Error(job.error || job.status)
+
+      const data = job.result
       setUploadMessage(`Synced! Added: ${data.added}, Updated: ${data.updated}, Errors: ${data.errors}`)
       loadCameras()
       
@@ -194,9 +217,13 @@ function MapView({ token, onLogout }) {
         },
         body: formData
       })
+      if (!response.ok) throw new Error('Failed to start job')
 
-      const data = await response.json()
-      setUploadMessage(`Uploaded! Added: ${data.added}, Errors: ${data.errors}`)
+      const { job_id } = await response.json()
+      const job = await waitForJob(job_id)
+      if (job.status !== 'succeeded') throw new Error(job.error || job.status)
+
+      setUploadMessage(`Uploaded! Added: ${job.rows_added}, Errors: ${job.errors}`)
       loadCameras()
       
       setTimeout(() => setUploadMessage(''), 5000)